@@ -0,0 +1,637 @@
+import os
+import mmap
+import pickle
+import struct
+import zlib
+import logging
+import numpy as np
+import Serialization
+
+#A keyed store of pickled records in one append-only data file
+#
+#   name           data: MAGIC, generation, then records of RECORD header, key, pickle
+#   name.idx       open-addressing hash table of (key hash, record offset), memory-mapped
+#   name.sec       secondary indexes {field: {value: record offsets}}, see Serialization
+#
+#A newer record for a key supersedes the older one and a tombstone deletes it;
+#compact() rewrites the data file without the superseded records.
+MAGIC = b"RECSTOR\n"
+DATA_HEADER = struct.Struct("<8sQ")  # magic, generation
+RECORD = struct.Struct("<IHB")  # pickle length, key length, flags
+TOMBSTONE = 1
+INDEX_MAGIC = int.from_bytes(b"RECIDX01", "little")
+INDEX_WORDS = 8  # magic, generation, capacity, used slots, live keys, synced data length, garbage bytes, spare
+HEADER_FIELDS = {"used": 3, "live": 4, "synced": 5, "garbage": 6}
+MIN_CAPACITY = 1024
+MAX_LOAD = 0.5
+DELETED = -1  # locate() result for a key that is not in the store
+
+
+def key_hash(key):
+    """Stable 64-bit hash of a key with CRC-32 in the low bits that pick the slot; never 0, which marks an empty slot.
+
+    Equal hashes are always confirmed against the stored key, so this only
+    needs to spread keys well, not resist collisions.
+    """
+    data = key.encode("utf-8")
+    return (zlib.adler32(data) << 32 | zlib.crc32(data)) or 1
+
+
+def capacity_for(count):
+    """Smallest power of two table size that holds count keys under MAX_LOAD."""
+    capacity = MIN_CAPACITY
+    while count > capacity * MAX_LOAD:
+        capacity *= 2
+    return capacity
+
+
+class HashIndex:
+    """Open-addressing table from key hash to record offset, kept in a memory-mapped file.
+
+    Opening it costs nothing however many keys it holds. A deleted key
+    keeps its slot and hash so probing continues past it, with the offset
+    of its tombstone stored negated. Equal hashes are confirmed against the
+    stored key by the caller.
+    """
+
+    def __init__(self, path, generation):
+        self.path = path
+        self.words = None
+        try:
+            words = np.memmap(path, dtype=np.uint64, mode="r+")
+            if len(words) >= INDEX_WORDS and words[0] == INDEX_MAGIC and words[1] == generation \
+                    and len(words) == INDEX_WORDS + 2 * int(words[2]):
+                self.map(words)
+        except (FileNotFoundError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logging.warning(f"Ignoring unreadable index {path}: {e}")
+        self.valid = self.words is not None
+        if not self.valid:
+            self.create(MIN_CAPACITY, generation)
+
+
+    def map(self, words):
+        self.words = words
+        self.capacity = int(words[2])
+        self.mask = self.capacity - 1
+        self.hashes = words[INDEX_WORDS:INDEX_WORDS + self.capacity]
+        self.offsets = words[INDEX_WORDS + self.capacity:].view(np.int64)
+
+
+    def create(self, capacity, generation, hashes=None, offsets=None):
+        """Build a table of the given capacity holding hashes/offsets and swap it in for the old one.
+
+        The live, synced and garbage counters carry over from the old table.
+        """
+        temp_path = f"{self.path}.tmp"
+        words = np.memmap(temp_path, dtype=np.uint64, mode="w+", shape=(INDEX_WORDS + 2 * capacity,))
+        words[:INDEX_WORDS] = [INDEX_MAGIC, generation, capacity, 0, 0, 0, 0, 0]
+        if self.words is not None:
+            words[4:7] = self.words[4:7]
+        self.map(words)
+        if hashes is not None and len(hashes):
+            self.insert_many(hashes, offsets)
+        words.flush()
+        os.replace(temp_path, self.path)
+
+
+    def header(self, field):
+        return int(self.words[HEADER_FIELDS[field]])
+
+
+    def set_header(self, **fields):
+        for field, value in fields.items():
+            self.words[HEADER_FIELDS[field]] = value
+
+
+    def probe(self, h):
+        """Yield (slot, offset) for every slot holding hash h, stopping at the first empty slot."""
+        slot = h & self.mask
+        hashes = self.hashes
+        while True:
+            stored = int(hashes[slot])
+            if stored == h:
+                yield slot, int(self.offsets[slot])
+            elif not stored:
+                return
+            slot = (slot + 1) & self.mask
+
+
+    def empty_slot(self, h):
+        slot = h & self.mask
+        while self.hashes[slot]:
+            slot = (slot + 1) & self.mask
+        return slot
+
+
+    def find_many(self, hashes):
+        """Slot of the first entry with each hash, or -1; probes all keys one step at a time."""
+        result = np.full(len(hashes), -1, dtype=np.int64)
+        pending = np.arange(len(hashes))
+        slots = hashes & np.uint64(self.mask)
+        while pending.size:
+            probed = slots[pending].astype(np.int64)
+            stored = self.hashes[probed]
+            hit = stored == hashes[pending]
+            result[pending[hit]] = probed[hit]
+            pending = pending[~hit & (stored != 0)]
+            slots[pending] = (slots[pending] + np.uint64(1)) & np.uint64(self.mask)
+        return result
+
+
+    def insert_many(self, hashes, offsets):
+        """Insert unique hashes that are not in the table yet, in rounds of one probe step each."""
+        pending = np.arange(len(hashes))
+        slots = hashes & np.uint64(self.mask)
+        while pending.size:
+            probed = slots[pending].astype(np.int64)
+            free = self.hashes[probed] == 0
+            #Of several keys landing on the same free slot only the first takes it this round
+            taken, first = np.unique(probed[free], return_index=True)
+            winners = pending[free][first]
+            self.hashes[taken] = hashes[winners]
+            self.offsets[taken] = offsets[winners]
+            placed = np.zeros(len(hashes), dtype=bool)
+            placed[winners] = True
+            pending = pending[~placed[pending]]
+            slots[pending] = (slots[pending] + np.uint64(1)) & np.uint64(self.mask)
+        self.set_header(used=self.header("used") + len(hashes))
+
+
+    def live_entries(self):
+        live = (self.hashes != 0) & (self.offsets >= 0)
+        return self.hashes[live].copy(), self.offsets[live].copy()
+
+
+    def ensure(self, extra, generation):
+        """Grow (and drop deleted slots) so that extra more keys keep the load under MAX_LOAD."""
+        needed = self.header("used") + extra
+        if needed <= self.capacity * MAX_LOAD:
+            return
+        self.create(max(self.capacity, capacity_for(self.header("live") + extra)), generation, *self.live_entries())
+
+
+    def flush(self):
+        self.words.flush()
+
+
+    def close(self):
+        self.words.flush()
+        self.words = self.hashes = self.offsets = None
+
+
+class RecordStore:
+    """Records keyed by a field (ID by default) in a single append-only file with a persistent hash index.
+
+    get() finds the offset in the memory-mapped hash index and unpickles
+    just that record. Fields listed in indexes get secondary indexes so
+    find(field, value) reads only the matching records. Writes are appended
+    and the indexes are updated in place; flush() persists them, and records
+    appended after the last flush are replayed into the indexes on open.
+    compact() rewrites the file without superseded and deleted records.
+    """
+
+    def __init__(self, path, key_field="ID", indexes=()):
+        self.path = path
+        self.key_field = key_field
+        self.fields = tuple(indexes)
+        if not os.path.exists(path) or not os.path.getsize(path):
+            self.generation = int.from_bytes(os.urandom(8), "little") >> 1
+            with open(path, "wb") as f:
+                f.write(DATA_HEADER.pack(MAGIC, self.generation))
+        with open(path, "rb") as f:
+            magic, self.generation = DATA_HEADER.unpack(f.read(DATA_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a record store")
+        self.writer = open(path, "ab")
+        self.reader = open(path, "rb")
+        self.end = self.writer.tell()
+        self.index = HashIndex(f"{path}.idx", self.generation)
+        self.secondary = self.load_secondary()
+
+        synced = self.index.header("synced")
+        if not self.index.valid or synced > self.end or self.secondary is None:
+            if self.end > DATA_HEADER.size:
+                logging.info(f"Rebuilding indexes for {path}")
+            self.rebuild()
+        elif synced < self.end:
+            self.replay(max(synced, DATA_HEADER.size))
+
+
+    def __len__(self):
+        return self.index.header("live")
+
+
+    def __contains__(self, key):
+        return self.locate(key)[1] != DELETED
+
+
+    def __getitem__(self, key):
+        slot, offset = self.locate(key)
+        if offset == DELETED:
+            raise KeyError(key)
+        return self.read(offset)[1]
+
+
+    def __iter__(self):
+        return self.keys()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+    def read(self, offset, with_value=True):
+        """Return (key, record) stored at offset; the record is only unpickled if with_value."""
+        self.reader.seek(offset)
+        length, key_length, flags = RECORD.unpack(self.reader.read(RECORD.size))
+        data = self.reader.read(key_length + (length if with_value else 0))
+        key = data[:key_length].decode("utf-8")
+        return key, (pickle.loads(data[key_length:]) if with_value and not flags & TOMBSTONE else None)
+
+
+    def locate(self, key):
+        """Return (slot, offset) of key, (free slot, DELETED) if absent."""
+        h = key_hash(key)
+        for slot, offset in self.index.probe(h):
+            #A deleted slot points at its tombstone, so the key that left it can take it back
+            if self.read(abs(offset), with_value=False)[0] == key:
+                return slot, max(offset, DELETED)
+        return self.index.empty_slot(h), DELETED
+
+
+    def key_of(self, record, key):
+        if key is not None:
+            return str(key)
+        try:
+            return str(record[self.key_field])
+        except (KeyError, TypeError):
+            raise ValueError(f"Record has no {self.key_field!r} field and no key was given")
+
+
+    def append(self, key, record, flags=0):
+        encoded = key.encode("utf-8")
+        payload = b"" if flags & TOMBSTONE else pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        offset = self.end
+        self.writer.write(RECORD.pack(len(payload), len(encoded), flags) + encoded + payload)
+        self.end += RECORD.size + len(encoded) + len(payload)
+        return offset
+
+
+    def record_size(self, offset):
+        self.reader.seek(offset)
+        length, key_length, _ = RECORD.unpack(self.reader.read(RECORD.size))
+        return RECORD.size + key_length + length
+
+
+    def put(self, record, key=None):
+        """Store a record under key, or under its key field; returns the key."""
+        key = self.key_of(record, key)
+        self.index.ensure(1, self.generation)
+        slot, old = self.locate(key)
+        offset = self.append(key, record)
+        self.writer.flush()
+        self.apply(slot, key_hash(key), offset, old, record)
+        return key
+
+
+    def apply(self, slot, h, offset, old, record):
+        """Point slot at the record at offset and move it between secondary index entries."""
+        index = self.index
+        if old == DELETED:
+            index.set_header(live=index.header("live") + 1)
+        else:
+            index.set_header(garbage=index.header("garbage") + self.record_size(old))
+            if self.fields:
+                self.unindex(old, self.read(old)[1])
+        if not index.hashes[slot]:
+            index.hashes[slot] = h
+            index.set_header(used=index.header("used") + 1)
+        index.offsets[slot] = offset
+        self.index_record(offset, record)
+
+
+    def put_many(self, records, keys=None):
+        """Store many records with one write and one vectorized index update; returns the count.
+
+        Later records win over earlier ones with the same key.
+        """
+        keys = [self.key_of(record, None if keys is None else keys[i]) for i, record in enumerate(records)]
+        latest = {key: i for i, key in enumerate(keys)}
+        order = list(latest.values())
+        hashes = np.fromiter((key_hash(keys[i]) for i in order), dtype=np.uint64, count=len(order))
+        self.index.ensure(len(order), self.generation)
+
+        #Keys whose hash is already in the table go through put() so their key is checked
+        known = self.index.find_many(hashes) >= 0
+        new = [i for i, seen in zip(order, known) if not seen]
+        offsets = np.empty(len(new), dtype=np.int64)
+        parts = []
+        offset = self.end
+        for j, i in enumerate(new):
+            encoded = keys[i].encode("utf-8")
+            payload = pickle.dumps(records[i], protocol=pickle.HIGHEST_PROTOCOL)
+            parts += (RECORD.pack(len(payload), len(encoded), 0), encoded, payload)
+            offsets[j] = offset
+            offset += RECORD.size + len(encoded) + len(payload)
+        self.writer.writelines(parts)
+        self.writer.flush()
+        self.end = offset
+        self.index.insert_many(hashes[~known], offsets)
+        self.index.set_header(live=self.index.header("live") + len(new))
+        for i, offset in zip(new, offsets.tolist()):
+            self.index_record(offset, records[i])
+        for i in (i for i, seen in zip(order, known) if seen):
+            self.put(records[i], keys[i])
+        return len(order)
+
+
+    def delete(self, key):
+        slot, offset = self.locate(key)
+        if offset == DELETED:
+            raise KeyError(key)
+        if self.fields:
+            self.unindex(offset, self.read(offset)[1])
+        tombstone = self.append(key, None, TOMBSTONE)
+        self.writer.flush()
+        index = self.index
+        index.offsets[slot] = -tombstone
+        index.set_header(live=index.header("live") - 1,
+                         garbage=index.header("garbage") + self.record_size(offset) + self.record_size(tombstone))
+
+
+    def keys(self):
+        for offset in np.sort(self.index.live_entries()[1]).tolist():
+            yield self.read(offset, with_value=False)[0]
+
+
+    def items(self):
+        """Yield (key, record) pairs in file order, reading one record at a time."""
+        for offset in np.sort(self.index.live_entries()[1]).tolist():
+            yield self.read(offset)
+
+
+    def find(self, field, value):
+        """Yield the records whose field equals value, using the secondary index."""
+        for offset in sorted(self.offsets_for(field, value)):
+            yield self.read(offset)[1]
+
+
+    def count(self, field, value):
+        return len(self.offsets_for(field, value))
+
+
+    def values(self, field):
+        """Distinct values of an indexed field with their record counts."""
+        return {value: len(offsets) for value, offsets in self.secondary_for(field).items() if offsets}
+
+
+    def secondary_for(self, field):
+        if field not in self.secondary:
+            raise KeyError(f"{field!r} is not indexed; open the store with indexes=[{field!r}, ...]")
+        return self.secondary[field]
+
+
+    def offsets_for(self, field, value):
+        return self.secondary_for(field).get(value, ())
+
+
+    def index_record(self, offset, record):
+        for field in self.fields:
+            value = record.get(field) if isinstance(record, dict) else None
+            if value is not None:
+                try:
+                    self.secondary[field].setdefault(value, set()).add(offset)
+                except TypeError:  # unhashable values are not indexed
+                    pass
+
+
+    def unindex(self, offset, record):
+        for field in self.fields:
+            value = record.get(field) if isinstance(record, dict) else None
+            try:
+                self.secondary[field].get(value, set()).discard(offset)
+            except TypeError:
+                pass
+
+
+    def load_secondary(self):
+        """Read the secondary indexes; None if they are missing, stale or for other fields."""
+        if not self.fields:
+            return {}
+        try:
+            #Copied rather than mapped: the offsets become sets right away and save_secondary replaces the file
+            saved = Serialization.load(f"{self.path}.sec", copy=True)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError) as e:
+            logging.warning(f"Ignoring unreadable secondary index for {self.path}: {e}")
+            return None
+        if saved.get("generation") != self.generation or saved.get("synced") != self.index.header("synced") \
+                or set(saved.get("fields", ())) != set(self.fields):
+            return None
+        return {field: {value: set(offsets.tolist()) for value, offsets in values.items()}
+                for field, values in saved["indexes"].items()}
+
+
+    def save_secondary(self):
+        if not self.fields:
+            return
+        indexes = {field: {value: np.fromiter(offsets, dtype=np.int64, count=len(offsets))
+                           for value, offsets in values.items() if offsets}
+                   for field, values in self.secondary.items()}
+        Serialization.dump({"generation": self.generation, "synced": self.end, "fields": self.fields,
+                            "indexes": indexes}, f"{self.path}.sec")
+
+
+    def scan(self, start):
+        """Yield (offset, key, flags, payload) for every record from start to the end of the file."""
+        if self.end <= start:
+            return
+        with open(self.path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with data:
+            position = start
+            while position + RECORD.size <= self.end:
+                length, key_length, flags = RECORD.unpack_from(data, position)
+                body = position + RECORD.size
+                if body + key_length + length > self.end:
+                    break
+                yield position, data[body:body + key_length].decode("utf-8"), flags, \
+                    data[body + key_length:body + key_length + length]
+                position = body + key_length + length
+        if position != self.end:
+            #A torn write at the end of the file: drop it so the next append starts clean
+            logging.warning(f"Truncating {self.end - position} bytes of incomplete record in {self.path}")
+            self.writer.truncate(position)
+            self.writer.seek(position)
+            self.end = position
+
+
+    def replay(self, start):
+        """Apply records appended after the indexes were last flushed.
+
+        The hash index is memory-mapped, so after a crash its slots usually
+        point at these records already; a record is skipped when its key's
+        slot holds it or a later one, so nothing is applied twice. The live
+        and garbage counters are then recounted from the live records, and the
+        secondary indexes, which only flush() writes, are rebuilt from them.
+        """
+        index = self.index
+        for offset, key, flags, payload in self.scan(start):
+            slot, old = self.locate(key)
+            if index.hashes[slot] and abs(int(index.offsets[slot])) >= offset:
+                continue
+            if flags & TOMBSTONE:
+                if old != DELETED:
+                    index.offsets[slot] = -offset
+            else:
+                index.ensure(1, self.generation)
+                slot, old = self.locate(key)
+                if not index.hashes[slot]:
+                    index.hashes[slot] = key_hash(key)
+                    index.set_header(used=index.header("used") + 1)
+                index.offsets[slot] = offset
+        offsets = np.sort(index.live_entries()[1]).tolist()
+        live_bytes = sum(self.record_size(offset) for offset in offsets)
+        index.set_header(live=len(offsets), garbage=self.end - DATA_HEADER.size - live_bytes)
+        self.rebuild_secondary()
+        self.flush()
+
+
+    def rebuild(self):
+        """Recreate both indexes from the data file."""
+        latest = {}
+        garbage = 0
+        for offset, key, flags, payload in self.scan(DATA_HEADER.size):
+            previous = latest.pop(key, None)
+            size = RECORD.size + len(key.encode("utf-8")) + len(payload)
+            if previous is not None:
+                garbage += previous[1]
+            if flags & TOMBSTONE:
+                garbage += size
+            else:
+                latest[key] = (offset, size)
+        hashes = np.fromiter((key_hash(key) for key in latest), dtype=np.uint64, count=len(latest))
+        offsets = np.fromiter((offset for offset, _ in latest.values()), dtype=np.int64, count=len(latest))
+        self.index.create(capacity_for(len(latest)), self.generation, hashes, offsets)
+        self.index.set_header(used=len(latest), live=len(latest), garbage=garbage)
+        self.rebuild_secondary()
+        self.flush()
+
+
+    def rebuild_secondary(self):
+        """Recreate the secondary indexes from the live records in the hash index."""
+        self.secondary = {field: {} for field in self.fields}
+        if self.fields:
+            for offset in np.sort(self.index.live_entries()[1]).tolist():
+                self.index_record(offset, self.read(offset)[1])
+
+
+    def flush(self):
+        """Make the appended records and both indexes durable up to the current end of the file."""
+        self.writer.flush()
+        os.fsync(self.writer.fileno())
+        self.save_secondary()
+        self.index.set_header(synced=self.end)
+        self.index.flush()
+
+
+    def garbage_ratio(self):
+        return self.index.header("garbage") / max(self.end - DATA_HEADER.size, 1)
+
+
+    def compact(self):
+        """Rewrite the data file with only the live records, in their current order."""
+        hashes, offsets = self.index.live_entries()
+        order = np.argsort(offsets)
+        hashes, offsets = hashes[order], offsets[order]
+        generation = int.from_bytes(os.urandom(8), "little") >> 1
+        temp_path = f"{self.path}.tmp"
+        self.writer.flush()
+        with open(self.path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with data, open(temp_path, "wb") as out:
+            sizes = np.fromiter((RECORD.size + sum(RECORD.unpack_from(data, offset)[:2]) for offset in offsets.tolist()),
+                                dtype=np.int64, count=len(offsets))
+            new_offsets = DATA_HEADER.size + np.cumsum(sizes) - sizes
+            out.write(DATA_HEADER.pack(MAGIC, generation))
+            if len(offsets):
+                #Live records that were already adjacent are copied as one run
+                breaks = np.flatnonzero(offsets[1:] != offsets[:-1] + sizes[:-1]) + 1
+                firsts = np.concatenate(([0], breaks))
+                lasts = np.concatenate((breaks, [len(offsets)])) - 1
+                view = memoryview(data)
+                for start, end in zip(offsets[firsts].tolist(), (offsets[lasts] + sizes[lasts]).tolist()):
+                    out.write(view[start:end])
+                view.release()
+            out.flush()
+            os.fsync(out.fileno())
+
+        self.writer.close()
+        self.reader.close()
+        os.replace(temp_path, self.path)
+        self.generation = generation
+        self.writer = open(self.path, "ab")
+        self.reader = open(self.path, "rb")
+        self.end = self.writer.tell()
+        self.index.create(capacity_for(len(offsets)), generation, hashes, new_offsets)
+        self.index.set_header(used=len(offsets), live=len(offsets), garbage=0)
+        for values in self.secondary.values():
+            for value, old in values.items():
+                #Offsets that are not live any more have no new place; searchsorted would land them on a neighbour
+                old = np.fromiter(old, dtype=np.int64, count=len(old))
+                positions = np.minimum(np.searchsorted(offsets, old), max(len(offsets) - 1, 0))
+                live = offsets[positions] == old if len(offsets) else np.zeros(len(old), dtype=bool)
+                values[value] = set(new_offsets[positions[live]].tolist())
+        self.flush()
+
+
+    def import_pickles(self, paths):
+        """Bulk import pickled records; each file holds one record or a list of them.
+
+        Records without the key field are stored under the file name without
+        its extension. Returns the number of records imported.
+        """
+        records, keys = [], []
+        for path in paths:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+            stem = os.path.splitext(os.path.basename(path))[0]
+            for i, record in enumerate(data if isinstance(data, list) else [data]):
+                records.append(record)
+                has_key = isinstance(record, dict) and self.key_field in record
+                keys.append(str(record[self.key_field]) if has_key else (stem if i == 0 else f"{stem}:{i}"))
+        count = self.put_many(records, keys)
+        self.flush()
+        return count
+
+
+    def close(self):
+        self.flush()
+        self.index.close()
+        self.writer.close()
+        self.reader.close()
+
+
+if __name__ == "__main__":
+    import sys
+    import glob
+    logging.basicConfig(level=logging.INFO)
+    folder = os.path.dirname(os.path.abspath(__file__))
+    with RecordStore(os.path.join(folder, "students.rst"), indexes=["Major"]) as store:
+        count = store.import_pickles(sys.argv[1:] or sorted(glob.glob(os.path.join(folder, "*.pkl"))))
+        print(f"Imported {count} records, {len(store)} in the store")
+        for key in store:
+            print(key, store[key])
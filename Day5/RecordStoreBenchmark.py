@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+import random
+import pickle
+import tempfile
+from RecordStore import RecordStore
+
+#Point lookups and secondary index queries against a store of student records
+MAJORS = ["Information and Communication Engineering", "Computer Science and Technology", "Numerical Computing",
+          "Hydraulic Engineering", "Civil Engineering", "Mathematics", "Physics", "Economics"]
+LOOKUPS = 100_000
+
+
+def make_records(count, seed=7):
+    rng = random.Random(seed)
+    return [{"ID": f"LX{20240000000 + i}", "Name": f"Student {i}", "Major": rng.choice(MAJORS),
+             "School": "Hohai University", "Course": "Numerical Computing."} for i in range(count)]
+
+
+def timed(label, func, count=1):
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    per_item = f"   {seconds / count * 1e6:8.2f} us/op" if count > 1 else ""
+    print(f"{label:<40} {seconds * 1000:10.1f} ms{per_item}")
+    return result
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    records = make_records(count)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "students.rst")
+        with RecordStore(path, indexes=["Major"]) as store:
+            timed(f"put_many {count:,} records", lambda: store.put_many(records), count)
+            timed("flush", store.flush)
+        print(f"data {os.path.getsize(path) / 1e6:.1f} MB, index {os.path.getsize(path + '.idx') / 1e6:.1f} MB, "
+              f"secondary {os.path.getsize(path + '.sec') / 1e6:.1f} MB")
+
+        store = timed("open", lambda: RecordStore(path, indexes=["Major"]))
+        keys = [records[i]["ID"] for i in random.Random(1).choices(range(count), k=LOOKUPS)]
+        timed(f"{LOOKUPS:,} random point lookups", lambda: [store[key] for key in keys], LOOKUPS)
+        timed(f"{LOOKUPS:,} missing keys", lambda: [key + "x" in store for key in keys], LOOKUPS)
+        latencies = []
+        for key in keys[:10_000]:
+            start = time.perf_counter()
+            store[key]
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(f"lookup p50 {latencies[len(latencies) // 2] * 1e6:.1f} us, p99 {latencies[len(latencies) * 99 // 100] * 1e6:.1f} us, "
+              f"max {latencies[-1] * 1e6:.1f} us")
+        timed("count by Major", lambda: store.count("Major", MAJORS[0]))
+        timed("first 1,000 records of one Major", lambda: [record for _, record in zip(range(1000), store.find("Major", MAJORS[1]))], 1000)
+
+        timed(f"update {LOOKUPS:,} records one by one", lambda: [store.put(records[i]) for i in range(LOOKUPS)], LOOKUPS)
+        timed(f"delete {LOOKUPS // 10:,} records", lambda: [store.delete(records[i]["ID"]) for i in range(LOOKUPS // 10)], LOOKUPS // 10)
+        print(f"garbage {store.garbage_ratio():.1%}")
+        timed("compact", store.compact)
+        store.close()
+
+        #The same lookups against one pickle file per record, as the .pkl files are stored today
+        files = os.path.join(folder, "files")
+        os.makedirs(files)
+        sample = records[:10_000]
+        for record in sample:
+            with open(os.path.join(files, f"{record['ID']}.pkl"), "wb") as f:
+                pickle.dump(record, f)
+
+        def scan_files(major):
+            found = []
+            for name in os.listdir(files):
+                with open(os.path.join(files, name), "rb") as f:
+                    record = pickle.load(f)
+                if record.get("Major") == major:
+                    found.append(record)
+            return found
+        timed(f"find by Major over {len(sample):,} .pkl files", lambda: scan_files(MAJORS[0]))
@@ -0,0 +1,180 @@
+import os
+import mmap
+import zlib
+import struct
+import pickle
+import numpy as np
+
+try:
+    import lz4.frame
+except ImportError:  # lz4 is optional; without it only zlib compression is available
+    lz4 = None
+try:
+    import zstandard
+except ImportError:  # zstandard is optional as well
+    zstandard = None
+
+#Pickle protocol 5 files whose large buffers are stored as separate aligned segments
+#
+#   header   MAGIC, version, segment count, pickle length
+#   table    one SEGMENT entry per out-of-band buffer
+#   pickle   the protocol 5 stream with small objects in-band
+#   segments each starting on an ALIGNMENT boundary, raw or compressed
+MAGIC = b"PK5SEG\r\n"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQ")
+SEGMENT = struct.Struct("<QQQB7x")  # offset, stored length, raw length, codec id
+ALIGNMENT = 64
+OUT_OF_BAND_MIN = 64 * 1024  # smaller buffers stay inside the pickle stream
+MIN_SAVING = 0.9  # a compressed segment is kept only if it is below this fraction of the raw size
+
+CODEC_IDS = {None: 0, "zlib": 1, "lz4": 2, "zstd": 3}
+CODECS = {"zlib": (lambda data, level: zlib.compress(data, 1 if level is None else level), zlib.decompress)}
+if lz4 is not None:
+    CODECS["lz4"] = (lambda data, level: lz4.frame.compress(data, compression_level=level or 0), lz4.frame.decompress)
+if zstandard is not None:
+    CODECS["zstd"] = (lambda data, level: zstandard.ZstdCompressor(level=3 if level is None else level).compress(data),
+                      lambda data: zstandard.ZstdDecompressor().decompress(data))
+
+
+def register_codec(name, codec_id, compress, decompress):
+    """Add a compression codec; compress(data, level) -> bytes and decompress(data) -> bytes-like.
+
+    The id is what the file records, so it must stay the same for as long as files written with it exist.
+    """
+    if CODEC_IDS.get(name, codec_id) != codec_id or any(i == codec_id for n, i in CODEC_IDS.items() if n != name):
+        raise ValueError(f"Codec {name!r} or id {codec_id} is already registered differently")
+    CODEC_IDS[name] = codec_id
+    CODECS[name] = (compress, decompress)
+
+
+def align(position):
+    return -(-position // ALIGNMENT) * ALIGNMENT
+
+
+def aligned_buffer(size):
+    """Writable memory of size bytes starting on an ALIGNMENT boundary."""
+    block = bytearray(size + ALIGNMENT)
+    address = np.frombuffer(block, dtype=np.uint8).ctypes.data if size else 0
+    start = -address % ALIGNMENT
+    return memoryview(block)[start:start + size]
+
+
+def dump(obj, path, compression=None, level=None, threshold=OUT_OF_BAND_MIN):
+    """Pickle obj to path with every contiguous buffer of at least threshold bytes stored out-of-band.
+
+    NumPy arrays, bytearrays and other objects that support protocol 5
+    buffers are written straight from their memory. With compression set to
+    a name in CODECS each large buffer is compressed on its own, and kept raw
+    if that does not save at least 10%. The file is written to a temporary
+    name and then moved into place. Returns the number of bytes written.
+    """
+    if compression is not None and compression not in CODECS:
+        raise ValueError(f"Compression {compression!r} is not available; choose from {sorted(CODECS)}")
+    buffers = []
+
+    def collect(buffer):
+        view = buffer.raw()
+        if view.nbytes < threshold:
+            return True  # serialize in-band
+        buffers.append(view)
+        return False
+    stream = pickle.dumps(obj, protocol=5, buffer_callback=collect)
+
+    segments = []
+    for view in buffers:
+        codec, data = None, view
+        if compression is not None:
+            packed = CODECS[compression][0](view, level)
+            if len(packed) < view.nbytes * MIN_SAVING:
+                codec, data = compression, packed
+        segments.append((codec, data, view.nbytes))
+
+    offset = align(HEADER.size + SEGMENT.size * len(segments) + len(stream))
+    table = []
+    for codec, data, raw_length in segments:
+        table.append(SEGMENT.pack(offset, len(data), raw_length, CODEC_IDS[codec]))
+        offset = align(offset + len(data))
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(segments), len(stream)))
+        f.write(b"".join(table))
+        f.write(stream)
+        for (_, data, _), entry in zip(segments, table):
+            f.write(b"\0" * (SEGMENT.unpack(entry)[0] - f.tell()))
+            f.write(data)
+        size = f.tell()
+    os.replace(temp_path, path)
+    return size
+
+
+def load(path, writable=False, copy=False):
+    """Load an object written by dump(), mapping raw segments instead of reading them.
+
+    Arrays backed by raw segments are views of a read-only mapping of the
+    file and are only paged in when touched; the mapping stays open until
+    the last of them is gone. With writable=True the mapping is copy-on-write,
+    so the arrays can be modified without changing the file. With copy=True
+    raw segments are read into new memory too, so nothing keeps the file open
+    (Windows cannot replace a file that is still mapped). Compressed segments
+    are always decompressed into new memory. Whenever no array uses the
+    mapping it is closed before load returns.
+    """
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY if writable else mmap.ACCESS_READ)
+    view = memoryview(mapping)
+    buffers = []
+    raw = mapped = False
+    try:
+        try:
+            magic, version, count, stream_length = HEADER.unpack_from(view)
+        except struct.error:
+            raise ValueError(f"{path} is too short to be a serialized file")
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a serialized file")
+        if version != VERSION:
+            raise ValueError(f"{path} has unsupported version {version}")
+
+        codec_names = {codec_id: name for name, codec_id in CODEC_IDS.items()}
+        for i in range(count):
+            offset, length, raw_length, codec_id = SEGMENT.unpack_from(view, HEADER.size + i * SEGMENT.size)
+            if offset + length > len(view):
+                raise ValueError(f"{path} is truncated")
+            if codec_id:
+                name = codec_names.get(codec_id)
+                if name not in CODECS:
+                    raise ValueError(f"{path} needs the {name or codec_id} codec, which is not available")
+                with view[offset:offset + length] as packed:
+                    unpacked = CODECS[name][1](packed)
+                if len(unpacked) != raw_length:
+                    raise ValueError(f"{path} has a corrupt segment {i}")
+                data = aligned_buffer(raw_length)
+                data[:] = unpacked
+            elif copy:
+                data = aligned_buffer(length)
+                data[:] = view[offset:offset + length]
+            else:
+                data = view[offset:offset + length]
+                raw = True
+            buffers.append(data)
+        start = HEADER.size + count * SEGMENT.size
+        with view[start:start + stream_length] as stream:
+            obj = pickle.loads(stream, buffers=buffers)
+        mapped = raw
+        return obj
+    finally:
+        if not mapped:
+            close_mapping(mapping, view, buffers)
+
+
+def close_mapping(mapping, view, buffers):
+    """Release the views of a mapping and close it, unless something still holds one."""
+    try:
+        for buffer in buffers:
+            if buffer.obj is mapping:
+                buffer.release()
+        view.release()
+        mapping.close()
+    except BufferError:
+        pass  # a partly loaded object still uses the mapping; it is closed once that is collected
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import pickle
+import tempfile
+import numpy as np
+import Serialization
+
+#Plain pickle against protocol 5 segment files for size, dump time and load time
+REPEAT = 3
+
+
+def make_payloads():
+    rng = np.random.default_rng(7)
+    records = 2_000_000
+    return {
+        "small dict": {'a': [1, 2.0, 4+6j], 'b': ("string", "unicode string"), 'c': None},
+        "arrays": {
+            "id": np.arange(records, dtype=np.int64),
+            "score": rng.normal(70, 12, records),
+            "major": rng.integers(0, 40, records, dtype=np.int32),
+            "grades": np.round(rng.uniform(0, 100, (records, 4)), 1),
+            "a": [1, 2.0, 4+6j] * 1000,
+        },
+        "records": [{"ID": f"LX{i:011d}", "score": float(i % 100), "tags": [i, i * 2]} for i in range(200_000)],
+    }
+
+
+def touch(obj):
+    """Read every array so that lazily mapped loads pay for their page faults too."""
+    if isinstance(obj, np.ndarray):
+        return float(obj.sum())
+    if isinstance(obj, dict):
+        return sum(touch(value) for value in obj.values())
+    return 0.0
+
+
+def best_of(func):
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def report(name, size, dump_time, load_time, touch_time):
+    print(f"  {name:<22} {size / 1e6:10.2f} MB {dump_time * 1000:10.1f} ms {load_time * 1000:10.2f} ms {touch_time * 1000:10.1f} ms")
+
+
+def run(label, payload, folder):
+    print(f"{label}:")
+    print(f"  {'format':<22} {'size':>13} {'dump':>13} {'load':>13} {'load+touch':>13}")
+    path = os.path.join(folder, "payload.pkl")
+
+    def pickle_dump():
+        with open(path, "wb") as f:
+            pickle.dump(payload, f)
+
+    def pickle_load():
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    dump_time, _ = best_of(pickle_dump)
+    load_time, _ = best_of(pickle_load)
+    touch_time, _ = best_of(lambda: touch(pickle_load()))
+    report(f"pickle (protocol {pickle.DEFAULT_PROTOCOL})", os.path.getsize(path), dump_time, load_time, touch_time)
+
+    for compression in [None, *Serialization.CODECS]:
+        dump_time, size = best_of(lambda: Serialization.dump(payload, path, compression))
+        load_time, _ = best_of(lambda: Serialization.load(path))
+        touch_time, _ = best_of(lambda: touch(Serialization.load(path)))
+        report(f"protocol 5 {compression or 'raw'}", size, dump_time, load_time, touch_time)
+    print()
+
+
+if __name__ == "__main__":
+    payloads = make_payloads()
+    names = sys.argv[1:] or list(payloads)
+    with tempfile.TemporaryDirectory() as folder:
+        for name in names:
+            run(name, payloads[name], folder)
@@ -0,0 +1,451 @@
+import math
+from collections import deque
+import numpy as np
+
+#Technical indicators over daily bars with a batch path and an incremental path
+#
+#Every indicator has batch(values), which continues from the bars it has
+#already seen, and update(value) for one new bar. Both do the same floating
+#point operations in the same order, so running batch() over a history and
+#update() over the bars that follow gives exactly the arrays batch() would
+#have given over everything. The exception is the exponential averages (EMA,
+#and the Wilder averages inside ATR and RSI): their batch() evaluates the
+#recurrence in blocks and agrees with update() to within rounding, under
+#1e-13 relative. Values are NaN until a full window has been seen.
+INDICATOR_DTYPE = np.dtype([("sma", np.float64), ("ema", np.float64), ("bb_mid", np.float64),
+                            ("bb_upper", np.float64), ("bb_lower", np.float64), ("atr", np.float64),
+                            ("rsi", np.float64), ("low_min", np.float64), ("high_max", np.float64)])
+REBASE_BARS = 4096  # window sums restart their running totals from a new shift this often
+EMA_BLOCK = 64  # bars per block of the vectorized exponential average
+
+
+class WindowSums:
+    """Sums (and sums of squares) over the last period values, kept as differences of running totals.
+
+    The running totals are taken relative to a shift value so they stay
+    small for prices that wander around a level. Every REBASE_BARS values
+    the shift moves to the latest value and the totals still needed are
+    recomputed from the raw values, so neither the totals nor the distance
+    from the shift can grow over a long history. Restarts happen at the same
+    bar counts in both paths and np.cumsum adds in order, so the batch
+    totals are the same floats update() produces.
+    """
+
+    def __init__(self, period, squares=False):
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.period = period
+        self.squares = squares
+        self.rebase = max(REBASE_BARS, period)
+        self.count = 0
+        self.shift = None
+        self.recent = deque(maxlen=period)  # raw values, to recompute the totals on a restart
+        #Running totals after each of the last period values, starting with the empty total
+        self.totals = deque([0.0], maxlen=period)
+        self.square_totals = deque([0.0], maxlen=period)
+
+
+    def update(self, value):
+        """Add a value; returns (sum, sum of squares, shift) of the shifted window or None before it is full."""
+        if self.shift is None:
+            self.shift = value
+        shifted = value - self.shift
+        total = self.totals[-1] + shifted
+        square_total = self.square_totals[-1] + shifted * shifted if self.squares else 0.0
+        full = len(self.totals) == self.period
+        window = (total - self.totals[0], square_total - self.square_totals[0], self.shift) if full else None
+        self.totals.append(total)
+        self.square_totals.append(square_total)
+        self.recent.append(value)
+        self.count += 1
+        if self.count % self.rebase == 0:
+            self.restart()
+        return window
+
+
+    def restart(self):
+        """Shift to the latest value and recompute the totals that windows still need."""
+        self.shift = self.recent[-1]
+        #Totals before the restart point are minus the sum from there to it, added back to front
+        shifted = np.array(self.recent)[1:] - self.shift
+        self.totals = deque(np.append(-np.cumsum(shifted[::-1])[::-1], 0.0).tolist(), maxlen=self.period)
+        squares = -np.cumsum((shifted * shifted)[::-1])[::-1] if self.squares else np.zeros(len(shifted))
+        self.square_totals = deque(np.append(squares, 0.0).tolist(), maxlen=self.period)
+
+
+    def batch(self, values):
+        """update() for every value at once; returns (sums, sums of squares, full, shifts) arrays."""
+        values = np.asarray(values, dtype=np.float64)
+        sums, square_sums, shifts = np.empty(len(values)), np.zeros(len(values)), np.empty(len(values))
+        full = np.zeros(len(values), dtype=bool)
+        if len(values) and self.shift is None:
+            self.shift = float(values[0])
+        position = 0
+        while position < len(values):
+            #Up to and including the next restart everything is relative to the same shift
+            stop = min(len(values), position + self.rebase - self.count % self.rebase)
+            part = slice(position, stop)
+            shifted = values[part] - self.shift
+            shifts[part] = self.shift
+            sums[part], full[part] = self.windows(self.totals, shifted)
+            if self.squares:
+                square_sums[part], _ = self.windows(self.square_totals, shifted * shifted)
+            else:
+                self.square_totals.extend([0.0] * (stop - position))
+            self.recent.extend(values[max(position, stop - self.period):stop].tolist())
+            self.count += stop - position
+            if self.count % self.rebase == 0:
+                self.restart()
+            position = stop
+        return sums, square_sums, full, shifts
+
+
+    def windows(self, stored, added):
+        """Window sums for added values continuing the stored running totals, which are extended in place."""
+        known = len(stored)
+        stored_array = np.array(stored)
+        totals = np.concatenate((stored_array[:-1], np.cumsum(np.concatenate((stored_array[-1:], added)))))
+        #Value j (at position known + j) closes the window that starts after position known + j - period
+        ends = np.arange(known, known + len(added))
+        starts = ends - self.period
+        full = starts >= 0
+        starts = np.maximum(starts, 0)
+        stored.extend(totals[known:].tolist())
+        return totals[ends] - totals[starts], full
+
+
+class SMA:
+    """Simple moving average."""
+
+    def __init__(self, period):
+        self.period = period
+        self.sums = WindowSums(period)
+
+
+    def update(self, value):
+        window = self.sums.update(value)
+        return window[0] / self.period + window[2] if window else math.nan
+
+
+    def batch(self, values):
+        sums, _, full, shifts = self.sums.batch(values)
+        return np.where(full, sums / self.period + shifts, np.nan)
+
+
+class Bollinger:
+    """Moving average with bands num_std population standard deviations above and below it."""
+
+    def __init__(self, period=20, num_std=2.0):
+        self.period = period
+        self.num_std = num_std
+        self.sums = WindowSums(period, squares=True)
+
+
+    def update(self, value):
+        """Returns (middle, upper, lower)."""
+        window = self.sums.update(value)
+        if window is None:
+            return math.nan, math.nan, math.nan
+        total, square_total, shift = window
+        mean = total / self.period
+        std = math.sqrt(max((square_total - total * mean) / self.period, 0.0))
+        middle = mean + shift
+        return middle, middle + self.num_std * std, middle - self.num_std * std
+
+
+    def batch(self, values):
+        sums, square_sums, full, shifts = self.sums.batch(values)
+        mean = sums / self.period
+        std = np.sqrt(np.maximum((square_sums - sums * mean) / self.period, 0.0))
+        middle = np.where(full, mean + shifts, np.nan)
+        return middle, middle + self.num_std * std, middle - self.num_std * std
+
+
+class EMA:
+    """Exponential moving average seeded with the simple average of the first period values.
+
+    update() is the reference recurrence. batch() runs it for the seed
+    values, then unrolls it over blocks of EMA_BLOCK values: within a block
+    each output is a fixed weighted sum of the block's inputs (one matrix
+    product for all blocks) plus the decayed value from before the block,
+    which leaves a scalar loop over blocks only. Inputs with NaN or inf go
+    through update(), since a zero weight times NaN would spread it.
+    """
+
+    def __init__(self, period, alpha=None):
+        self.period = period
+        self.alpha = 2.0 / (period + 1) if alpha is None else alpha
+        self.count = 0
+        self.value = 0.0
+
+
+    def update(self, value):
+        self.count += 1
+        if self.count <= self.period:
+            self.value += value
+            if self.count < self.period:
+                return math.nan
+            self.value /= self.period
+            return self.value
+        self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+    def batch(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        result = np.empty(len(values))
+        seed = min(len(values), max(0, self.period - self.count))
+        result[:seed] = [self.update(value) for value in values[:seed].tolist()]
+        rest = values[seed:]
+        if not len(rest):
+            return result
+        if not np.isfinite(rest).all():
+            result[seed:] = [self.update(value) for value in rest.tolist()]
+            return result
+        result[seed:] = self.blocks(rest)
+        self.value = float(result[-1])
+        self.count += len(rest)
+        return result
+
+
+    def blocks(self, values):
+        """The recurrence from self.value over values, evaluated block by block."""
+        decay = 1.0 - self.alpha
+        steps = np.arange(EMA_BLOCK)
+        lag = steps[:, None] - steps[None, :]
+        #weights[k, j]: share of input j in output k of a block that starts from zero
+        weights = np.where(lag >= 0, self.alpha * decay ** np.maximum(lag, 0), 0.0)
+        carried = decay ** (steps + 1)  # share of the value before the block in each output
+        count = len(values)
+        padded = np.zeros(-(-count // EMA_BLOCK) * EMA_BLOCK)
+        padded[:count] = values
+        local = padded.reshape(-1, EMA_BLOCK) @ weights.T
+        before = np.empty(len(local))
+        value = self.value
+        for i, last in enumerate(local[:, -1].tolist()):
+            before[i] = value
+            value = last + carried[-1] * value
+        return (local + before[:, None] * carried).ravel()[:count]
+
+
+class WilderAverage(EMA):
+    """Wilder's smoothing, an EMA with alpha = 1 / period, as used by ATR and RSI."""
+
+    def __init__(self, period):
+        super().__init__(period, alpha=1.0 / period)
+
+
+class ATR:
+    """Average true range with Wilder smoothing; the first bar's true range is its high - low."""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.average = WilderAverage(period)
+        self.previous_close = None
+
+
+    def update(self, high, low, close):
+        true_range = high - low
+        if self.previous_close is not None:
+            true_range = max(true_range, abs(high - self.previous_close), abs(low - self.previous_close))
+        self.previous_close = close
+        return self.average.update(true_range)
+
+
+    def batch(self, high, low, close):
+        high, low, close = (np.asarray(column, dtype=np.float64) for column in (high, low, close))
+        if not len(close):
+            return np.empty(0)
+        previous = np.concatenate(([math.nan if self.previous_close is None else self.previous_close], close[:-1]))
+        #fmax skips the NaN previous close of the very first bar
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+        self.previous_close = float(close[-1])
+        return self.average.batch(true_range)
+
+
+class RSI:
+    """Relative strength index with Wilder-smoothed average gains and losses."""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.gains = WilderAverage(period)
+        self.losses = WilderAverage(period)
+        self.previous = None
+
+
+    @staticmethod
+    def index(gain, loss):
+        if math.isnan(gain):
+            return math.nan
+        if loss == 0:
+            return 100.0 if gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+    def update(self, close):
+        previous, self.previous = self.previous, close
+        if previous is None:
+            return math.nan
+        change = close - previous
+        return self.index(self.gains.update(change if change > 0 else 0.0),
+                          self.losses.update(-change if change < 0 else 0.0))
+
+
+    def batch(self, close):
+        close = np.asarray(close, dtype=np.float64)
+        if not len(close):
+            return np.empty(0)
+        start = 1 if self.previous is None else 0
+        changes = np.diff(close) if start else np.diff(np.concatenate(([self.previous], close)))
+        gains = self.gains.batch(np.where(changes > 0, changes, 0.0))
+        losses = self.losses.batch(np.where(changes < 0, -changes, 0.0))
+        self.previous = float(close[-1])
+        #index() applied elementwise; NaN gains during warm-up stay NaN
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = 100.0 - 100.0 / (1.0 + gains / losses)
+        values = np.where(losses == 0, np.where(gains > 0, 100.0, 50.0), values)
+        result = np.full(len(close), math.nan)
+        result[start:] = np.where(np.isnan(gains), math.nan, values)
+        return result
+
+
+class RollingExtreme:
+    """Rolling maximum (or minimum) over the last period values.
+
+    batch() uses the van Herk/Gil-Werman block scan: prefix and suffix
+    maxima within blocks of period values combine into every window's
+    maximum in O(n) array operations. update() keeps a monotonic deque, so
+    each value is pushed and popped at most once. Both return exact inputs.
+    """
+
+    def __init__(self, period, largest=True):
+        self.period = period
+        self.largest = largest
+        self.count = 0
+        self.candidates = deque()  # (position, value), values strictly decreasing (increasing for minima)
+        self.recent = deque(maxlen=period - 1)  # what batch() needs to finish windows that started earlier
+
+
+    def update(self, value):
+        position = self.count
+        self.count += 1
+        if self.largest:
+            while self.candidates and self.candidates[-1][1] <= value:
+                self.candidates.pop()
+        else:
+            while self.candidates and self.candidates[-1][1] >= value:
+                self.candidates.pop()
+        self.candidates.append((position, value))
+        if self.candidates[0][0] <= position - self.period:
+            self.candidates.popleft()
+        if self.period > 1:
+            self.recent.append(value)
+        return self.candidates[0][1] if self.count >= self.period else math.nan
+
+
+    def batch(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        period = self.period
+        known = len(self.recent)
+        series = np.concatenate((list(self.recent), values))
+        result = np.full(len(values), math.nan)
+        if len(series) >= period:
+            accumulate = np.maximum.accumulate if self.largest else np.minimum.accumulate
+            combine = np.maximum if self.largest else np.minimum
+            padding = np.full(-len(series) % period, -math.inf if self.largest else math.inf)
+            blocks = np.concatenate((series, padding)).reshape(-1, period)
+            prefix = accumulate(blocks, axis=1).ravel()
+            suffix = accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+            #The window ending at position e covers e - period + 1 .. e
+            windows = combine(suffix[:len(series) - period + 1], prefix[period - 1:len(series)])
+            first = max(period - 1 - known, 0)
+            result[first:] = windows[known + first - period + 1:]
+
+        #Rebuild the incremental state from the values that can still be in a window
+        self.count += len(values)
+        self.candidates.clear()
+        tail = series[-period:].tolist()
+        start = self.count - len(tail)
+        for offset, value in enumerate(tail):
+            if self.largest:
+                while self.candidates and self.candidates[-1][1] <= value:
+                    self.candidates.pop()
+            else:
+                while self.candidates and self.candidates[-1][1] >= value:
+                    self.candidates.pop()
+            self.candidates.append((start + offset, value))
+        if period > 1:
+            self.recent.extend(values[-(period - 1):].tolist())
+        return result
+
+
+class IndicatorEngine:
+    """All indicators for one price series, extended with whole histories or single new bars.
+
+    extend() takes a structured array of bars such as OhlcLoader.load_ohlc
+    returns and computes the indicators for them in batch; append() adds one
+    bar in O(1). Either way the results accumulate in values, one
+    INDICATOR_DTYPE row per bar seen.
+    """
+
+    def __init__(self, period=20, num_std=2.0, atr_period=14, rsi_period=14):
+        self.sma = SMA(period)
+        self.ema = EMA(period)
+        self.bollinger = Bollinger(period, num_std)
+        self.atr = ATR(atr_period)
+        self.rsi = RSI(rsi_period)
+        self.low_min = RollingExtreme(period, largest=False)
+        self.high_max = RollingExtreme(period, largest=True)
+        self.rows = np.empty(0, dtype=INDICATOR_DTYPE)
+        self.count = 0
+
+
+    @property
+    def values(self):
+        return self.rows[:self.count]
+
+
+    def reserve(self, extra):
+        if self.count + extra > len(self.rows):
+            rows = np.empty(max(self.count + extra, 2 * len(self.rows), 1024), dtype=INDICATOR_DTYPE)
+            rows[:self.count] = self.values
+            self.rows = rows
+
+
+    def extend(self, bars):
+        """Compute the indicators for a block of bars in order; returns their rows."""
+        close = bars["close"]
+        rows = np.empty(len(bars), dtype=INDICATOR_DTYPE)
+        rows["sma"] = self.sma.batch(close)
+        rows["ema"] = self.ema.batch(close)
+        rows["bb_mid"], rows["bb_upper"], rows["bb_lower"] = self.bollinger.batch(close)
+        rows["atr"] = self.atr.batch(bars["high"], bars["low"], close)
+        rows["rsi"] = self.rsi.batch(close)
+        rows["low_min"] = self.low_min.batch(bars["low"])
+        rows["high_max"] = self.high_max.batch(bars["high"])
+        self.reserve(len(rows))
+        self.rows[self.count:self.count + len(rows)] = rows
+        self.count += len(rows)
+        return rows
+
+
+    def append(self, high, low, close):
+        """Add one bar; returns its row."""
+        self.reserve(1)
+        self.rows[self.count] = (self.sma.update(close), self.ema.update(close), *self.bollinger.update(close),
+                                 self.atr.update(high, low, close), self.rsi.update(close),
+                                 self.low_min.update(low), self.high_max.update(high))
+        self.count += 1
+        return self.rows[self.count - 1]
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    from OhlcLoader import load_ohlc
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "data1.csv")
+    bars, _ = load_ohlc(path)
+    engine = IndicatorEngine(period=5, atr_period=5, rsi_period=5)
+    engine.extend(bars)
+    for bar, row in zip(bars[-5:], engine.values[-5:]):
+        print(bar["date"], f"close {bar['close']:.2f}", ", ".join(f"{name} {row[name]:.2f}" for name in INDICATOR_DTYPE.names))
@@ -0,0 +1,71 @@
+import os
+import sys
+import csv
+import time
+import tempfile
+import datetime
+import numpy as np
+from OhlcLoader import load_ohlc, OHLC_DTYPE
+
+#load_ohlc against the csv module with time.strptime per row, as in FormatTime.py
+ROWS = [100_000, 1_000_000, 5_000_000]
+
+
+def write_bars(path, rows, seed=7):
+    """Write a Nasdaq-style newest-first daily bar file with rows bars ending on 06/13/2025.
+
+    Past 300k rows several bars share each date, as in a file with many symbols.
+    """
+    rng = np.random.default_rng(seed)
+    dates = np.datetime64("2025-06-13") - np.arange(rows) // -(-rows // 300_000)
+    close = 19000 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    open_ = close * (1 + rng.normal(0, 0.003, rows))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, rows))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, rows))
+    with open(path, "w") as f:
+        f.write("Date,Close/Last,Open,High,Low\n")
+        for start in range(0, rows, 1_000_000):
+            block = slice(start, start + 1_000_000)
+            text = [date.strftime("%m/%d/%Y") for date in dates[block].astype(datetime.date)]
+            f.writelines(f"{d},{c:.2f},{o:.2f},{h:.2f},{l:.2f}\n"
+                         for d, c, o, h, l in zip(text, close[block], open_[block], high[block], low[block]))
+
+
+def load_with_csv(path):
+    rows = []
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader)
+        for date, close, open_, high, low in reader:
+            day = time.strptime(date, "%m/%d/%Y")
+            rows.append((datetime.date(day.tm_year, day.tm_mon, day.tm_mday),
+                         float(open_), float(high), float(low), float(close)))
+    rows.reverse()
+    return np.array(rows, dtype=OHLC_DTYPE)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or ROWS
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "bars.csv")
+        for rows in sizes:
+            write_bars(path, rows)
+            megabytes = os.path.getsize(path) / 1e6
+            fast_time, (bars, rejected) = timed(lambda: load_ohlc(path))
+            mapped_time, (mapped, _) = timed(lambda: load_ohlc(path, os.path.join(folder, "bars.npy")))
+            assert rejected == 0 and np.array_equal(bars, mapped)
+            print(f"{rows:>10,} rows {megabytes:8.1f} MB")
+            print(f"  load_ohlc               {fast_time:8.2f} s {rows / fast_time / 1e6:8.2f} M rows/s")
+            print(f"  load_ohlc to .npy       {mapped_time:8.2f} s {rows / mapped_time / 1e6:8.2f} M rows/s")
+            if rows <= 1_000_000:
+                slow_time, expected = timed(lambda: load_with_csv(path))
+                assert np.array_equal(bars, expected)
+                print(f"  csv + time.strptime     {slow_time:8.2f} s {rows / slow_time / 1e6:8.2f} M rows/s"
+                      f"   ({slow_time / fast_time:.1f}x slower)")
+            del bars, mapped
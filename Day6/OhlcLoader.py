@@ -0,0 +1,255 @@
+import os
+import numpy as np
+
+#Daily bars from Nasdaq historical CSV files (Date,Close/Last,Open,High,Low[,Volume])
+COLUMNS = {"date": "date", "close/last": "close", "close": "close", "open": "open", "high": "high", "low": "low",
+           "volume": "volume"}
+PRICE_FIELDS = ("open", "high", "low", "close")
+OHLC_DTYPE = np.dtype([("date", "datetime64[D]"), ("open", np.float64), ("high", np.float64),
+                       ("low", np.float64), ("close", np.float64)])
+OHLCV_DTYPE = np.dtype(OHLC_DTYPE.descr + [("volume", np.int64)])
+CHUNK_BYTES = 1024 * 1024  # small enough for the per-chunk arrays to stay in cache
+DATE_WIDTH = len("MM/DD/YYYY")
+MAX_DIGITS = 15  # integers of up to 15 digits are exact in a float64
+POWERS_OF_TEN = 10.0 ** np.arange(MAX_DIGITS + 1)
+
+
+def read_header(path):
+    """Return (field for each column or None, bar dtype, bytes taken by the header line)."""
+    with open(path, "rb") as f:
+        line = f.readline()
+    names = [name.strip().strip('"').lower() for name in line.decode("utf-8-sig").split(",")]
+    fields = [COLUMNS.get(name) for name in names]
+    missing = [field for field in ("date",) + PRICE_FIELDS if field not in fields]
+    if missing:
+        raise ValueError(f"{path} has no {', '.join(missing)} column")
+    return fields, OHLCV_DTYPE if "volume" in fields else OHLC_DTYPE, len(line)
+
+
+def byte_columns(texts):
+    """Return byte strings as a (width, count) uint8 array, one row per character position, NUL padded."""
+    texts = np.ascontiguousarray(texts, dtype=f"S{max(np.asarray(texts).dtype.itemsize, 1)}")
+    return np.ascontiguousarray(texts.view(np.uint8).reshape(len(texts), texts.dtype.itemsize).T)
+
+
+def column_texts(chars):
+    """Inverse of byte_columns."""
+    return np.ascontiguousarray(chars.T).view(f"S{len(chars)}").ravel()
+
+
+def field_columns(buffer, starts, ends):
+    """Gather the fields buffer[starts[i]:ends[i]] into byte_columns layout without making Python strings."""
+    width = max(int((ends - starts).max(initial=0)), 1)
+    chars = np.empty((width, len(starts)), dtype=np.uint8)
+    last = len(buffer) - 1
+    for position in range(width):
+        positions = starts + position
+        np.take(buffer, np.minimum(positions, last), out=chars[position])
+        chars[position][positions >= ends] = 0
+    return chars
+
+
+def parse_dates(texts):
+    """Parse MM/DD/YYYY byte strings into datetime64[D]; returns (dates, valid)."""
+    return dates_from_columns(byte_columns(texts))
+
+
+def parse_numbers(texts, dtype=np.float64):
+    """Convert byte strings like " -1234.56" to dtype; returns (values, valid) with unparsable ones as 0."""
+    return numbers_from_columns(byte_columns(texts), dtype)
+
+
+def dates_from_columns(chars):
+    """parse_dates on byte_columns; fixed-width dates need no Python loop, others (M/D/YYYY) go row by row."""
+    width, count = chars.shape
+    if width >= DATE_WIDTH and count and chars[DATE_WIDTH - 1].all() and not chars[DATE_WIDTH:].any():
+        digits = chars[:DATE_WIDTH] - np.uint8(ord("0"))  # non-digits wrap around to values above 9
+        valid = (chars[2] == ord("/")) & (chars[5] == ord("/")) & (digits[[0, 1, 3, 4, 6, 7, 8, 9]] <= 9).all(axis=0)
+        digits = digits.astype(np.int64)
+        months = digits[0] * 10 + digits[1]
+        days = digits[3] * 10 + digits[4]
+        years = digits[6] * 1000 + digits[7] * 100 + digits[8] * 10 + digits[9]
+    else:
+        months, days, years = (np.zeros(count, dtype=np.int64) for _ in range(3))
+        valid = np.zeros(count, dtype=bool)
+        for i, text in enumerate(column_texts(chars).tolist()):
+            try:
+                months[i], days[i], years[i] = (int(part) for part in text.strip().split(b"/"))
+                valid[i] = True
+            except ValueError:
+                pass
+    valid &= (months >= 1) & (months <= 12) & (days >= 1) & (days <= 31)
+    months = np.where(valid, months, 1)
+    first = ((years - 1970) * 12 + months - 1).astype("datetime64[M]")
+    dates = first.astype("datetime64[D]") + np.where(valid, days - 1, 0)
+    #Days past the end of the month roll into the next one
+    valid &= dates.astype("datetime64[M]") == first
+    return dates, valid
+
+
+def numbers_from_columns(chars, dtype=np.float64):
+    """parse_numbers on byte_columns.
+
+    Plain decimals of up to MAX_DIGITS digits are read one character
+    position at a time with Horner's rule; dividing the exact integer by an
+    exact power of ten rounds once, so the result equals float(text).
+    Anything else (exponents, longer numbers, garbage) is converted row by row.
+    """
+    width, count = chars.shape
+    mantissa = np.zeros(count, dtype=np.int64)
+    decimals = np.zeros(count, dtype=np.int64)
+    digits = np.zeros(count, dtype=np.int64)
+    dots = np.zeros(count, dtype=np.int64)
+    negative = np.zeros(count, dtype=bool)
+    started = np.zeros(count, dtype=bool)
+    ended = np.zeros(count, dtype=bool)
+    bad = np.zeros(count, dtype=bool)
+    for column in chars:
+        value = column - np.uint8(ord("0"))
+        digit = value <= 9
+        dot = column == ord(".")
+        minus = column == ord("-")
+        blank = (column == ord(" ")) | (column == 0)
+        #Only blanks may follow the number, and a minus sign has to come first
+        bad |= ~(digit | dot | minus | blank) | (ended & ~blank) | (minus & started)
+        started |= ~blank
+        ended |= started & blank
+        negative |= minus
+        np.multiply(mantissa, 10, out=mantissa, where=digit)
+        np.add(mantissa, value, out=mantissa, where=digit, casting="unsafe")
+        decimals += digit & (dots > 0)
+        digits += digit
+        dots += dot
+    simple = ~bad & (dots <= 1) & (digits > 0) & (digits <= MAX_DIGITS)
+    if np.issubdtype(dtype, np.integer):
+        simple &= decimals == 0
+        values = mantissa.astype(dtype)
+        convert = int
+    else:
+        values = (mantissa / POWERS_OF_TEN[np.minimum(decimals, MAX_DIGITS)]).astype(dtype)
+        convert = float
+    np.negative(values, out=values, where=negative)
+
+    valid = simple.copy()
+    rest = np.flatnonzero(~simple)
+    for i, text in zip(rest.tolist(), column_texts(chars[:, rest]).tolist()):
+        try:
+            values[i] = convert(text)
+            valid[i] = True
+        except (ValueError, OverflowError):
+            values[i] = 0
+    return values, valid
+
+
+def parse_chunk(data, fields, dtype):
+    """Parse whole CSV lines into bars in file order; returns (bars, rejected line count)."""
+    data = data.replace(b"\r", b"").replace(b"$", b"").replace(b'"', b"")
+    if not data.endswith(b"\n"):
+        data += b"\n"
+    columns = len(fields)
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero((buffer == ord(",")) | (buffer == ord("\n")))
+    line_ends = buffer[ends] == ord("\n")
+    rows = len(ends) // columns
+    if len(ends) == rows * columns and line_ends.sum() == rows and line_ends[columns - 1::columns].all():
+        #Every line has the expected number of fields, so the field bounds form a rows x columns grid
+        starts = np.concatenate(([0], ends[:-1] + 1)).reshape(rows, columns)
+        ends = ends.reshape(rows, columns)
+        table = [field_columns(buffer, starts[:, column], ends[:, column]) for column in range(columns)]
+        rejected = 0
+    else:
+        lines = [line for line in data.split(b"\n") if line]
+        split = [row for row in (line.split(b",") for line in lines) if len(row) == columns]
+        table = [byte_columns(np.array([row[column] for row in split], dtype=bytes)) for column in range(columns)]
+        rows, rejected = len(split), len(lines) - len(split)
+
+    bars = np.empty(rows, dtype=dtype)
+    valid = np.ones(rows, dtype=bool)
+    for chars, field in zip(table, fields):
+        if field is None or field not in dtype.names:
+            continue
+        if field == "date":
+            bars["date"], ok = dates_from_columns(chars)
+        else:
+            bars[field], ok = numbers_from_columns(chars, dtype[field])
+        valid &= ok
+    return bars[valid], rejected + int(len(valid) - valid.sum())
+
+
+def iter_chunks(path, chunk_bytes=CHUNK_BYTES):
+    """Yield (bars, rejected) for consecutive blocks of whole lines, in file order."""
+    fields, dtype, start = read_header(path)
+    with open(path, "rb") as f:
+        f.seek(start)
+        tail = b""
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            block = tail + block
+            cut = block.rfind(b"\n") + 1
+            block, tail = block[:cut], block[cut:]
+            if block:
+                yield parse_chunk(block, fields, dtype)
+        if tail.strip():
+            yield parse_chunk(tail, fields, dtype)
+
+
+def count_lines(path, chunk_bytes=CHUNK_BYTES):
+    with open(path, "rb") as f:
+        count = sum(block.count(b"\n") for block in iter(lambda: f.read(chunk_bytes), b""))
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            count += f.read(1) != b"\n"
+    return count
+
+
+def load_ohlc(path, out_path=None, chunk_bytes=CHUNK_BYTES):
+    """Load a daily bar CSV into a structured array sorted oldest first; returns (bars, rejected).
+
+    The file is parsed chunk_bytes at a time. Rows are counted first so the
+    result can be allocated once and each chunk copied straight into its
+    final place, from the back when the file is newest first as Nasdaq
+    exports are. With out_path the result is a memory-mapped .npy file, so
+    files larger than memory need only one chunk of working memory.
+    Malformed rows are skipped and counted in rejected; in an out_path file
+    the rows they would have taken stay unused, outside the returned view.
+    """
+    _, dtype, _ = read_header(path)
+    capacity = max(count_lines(path, chunk_bytes) - 1, 0)
+    if out_path is None:
+        bars = np.empty(capacity, dtype=dtype)
+    else:
+        bars = np.lib.format.open_memmap(out_path, mode="w+", dtype=dtype, shape=(capacity,))
+    front, back = 0, capacity  # rows [0, front) and [back, capacity) are filled
+    newest_first = None
+    rejected = 0
+    for chunk, bad in iter_chunks(path, chunk_bytes):
+        rejected += bad
+        if not len(chunk):
+            continue
+        if newest_first is None:
+            newest_first = chunk["date"][0] > chunk["date"][-1]
+        if newest_first:
+            bars[back - len(chunk):back] = chunk[::-1]
+            back -= len(chunk)
+        else:
+            bars[front:front + len(chunk)] = chunk
+            front += len(chunk)
+
+    if newest_first:
+        bars = bars[back:]
+    else:
+        bars = bars[:front]
+    dates = bars["date"]
+    if len(dates) > 1 and (dates[1:] < dates[:-1]).any():
+        bars[:] = bars[np.argsort(dates, kind="stable")]
+    return bars, rejected
+
+
+if __name__ == "__main__":
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "data1.csv")
+    bars, rejected = load_ohlc(path)
+    print(f"{len(bars)} bars from {bars['date'][0]} to {bars['date'][-1]}, {rejected} rows skipped")
+    print(bars[:5])
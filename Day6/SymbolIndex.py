@@ -0,0 +1,255 @@
+import csv
+import numpy as np
+
+#In-memory index over Nasdaq symbol directory files such as symbols_valid_meta.csv
+SYMBOL_COLUMN = "Symbol"
+NAME_COLUMN = "Security Name"
+KEY_BYTES = 16  # autocomplete keys are compared on this many UTF-8 bytes, longer prefixes are checked in full
+SEARCH_BLOCK = 64
+MAX_CATEGORY_SHARE = 0.5  # columns with more distinct values than this share of rows are stored as packed strings
+
+
+class Categorical:
+    """A column of repeated strings stored once each, with the smallest integer code per row."""
+
+    def __init__(self, values, categories=None):
+        """categories: the distinct values in order of first appearance, when the caller has them already."""
+        self.categories = list(dict.fromkeys(values)) if categories is None else categories
+        self.lookup = {value: code for code, value in enumerate(self.categories)}
+        dtype = np.uint8 if len(self.categories) <= 1 << 8 else np.uint16 if len(self.categories) <= 1 << 16 else np.uint32
+        self.codes = np.fromiter(map(self.lookup.__getitem__, values), dtype, len(values))
+
+
+    def __len__(self):
+        return len(self.codes)
+
+
+    def __getitem__(self, row):
+        return self.categories[self.codes[row]]
+
+
+    def nbytes(self):
+        return self.codes.nbytes + sum(len(value) for value in self.categories)
+
+
+class PackedStrings:
+    """A column of mostly distinct strings stored as one UTF-8 buffer and row offsets into it."""
+
+    def __init__(self, values):
+        encoded = list(map(str.encode, values))
+        self.offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), np.int64, len(encoded)), out=self.offsets[1:])
+        self.data = b"".join(encoded)
+
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+    def __getitem__(self, row):
+        return self.data[self.offsets[row]:self.offsets[row + 1]].decode("utf-8")
+
+
+    def nbytes(self):
+        return self.offsets.nbytes + len(self.data)
+
+
+class PrefixIndex:
+    """Sorted fixed-width byte keys with their rows; a prefix is a range found by binary search.
+
+    Keys are the KEY_BYTES bytes of casefolded text from each start offset,
+    gathered straight from the packed buffer, so a million keys take 28 MB
+    and no Python objects. Lookups with longer prefixes use the first
+    KEY_BYTES to find candidates and compare the rest in the buffer.
+    """
+
+    def __init__(self, texts, starts, rows):
+        """texts: PackedStrings of casefolded text; starts: byte offsets into texts.data; rows: the text each is in."""
+        buffer = np.frombuffer(texts.data + b"\0", dtype=np.uint8)
+        starts = np.asarray(starts, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.int32)
+        lengths = texts.offsets[rows + 1] - starts
+        keys = np.zeros((len(starts), KEY_BYTES), dtype=np.uint8)
+        for position in range(KEY_BYTES):
+            #Past the end of its text a key is NUL padded, which sorts before any character
+            inside = lengths > position
+            keys[inside, position] = buffer[starts[inside] + position]
+        keys = keys.view(f"S{KEY_BYTES}").ravel()
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.starts = starts[order]
+        self.rows = rows[order]
+        self.texts = texts
+
+
+    def search(self, prefix, limit=10):
+        """Return up to limit distinct rows with a key starting with prefix, in key order."""
+        wanted = prefix.casefold().encode("utf-8")
+        key = wanted[:KEY_BYTES]
+        start = np.searchsorted(self.keys, key, side="left")
+        #Every key with this prefix sorts before prefix + 0xff
+        stop = np.searchsorted(self.keys, key + b"\xff", side="left")
+        found = []
+        seen = set()
+        #Short prefixes match a large part of the index, so only convert as many rows as needed
+        for block in range(start, stop, SEARCH_BLOCK):
+            block_stop = min(block + SEARCH_BLOCK, stop)
+            for row, offset in zip(self.rows[block:block_stop].tolist(), self.starts[block:block_stop].tolist()):
+                if row in seen:
+                    continue
+                if len(wanted) > KEY_BYTES and self.texts.data[offset:offset + len(wanted)] != wanted:
+                    continue
+                seen.add(row)
+                found.append(row)
+                if len(found) >= limit:
+                    return found
+        return found
+
+
+class SymbolIndex:
+    """Symbol directory with exact lookup, prefix autocomplete and bitmap filters.
+
+    Repeated values are stored as Categorical columns and mostly distinct
+    ones (symbols, names) as PackedStrings. Each (column, value) filter is a
+    bitmap held in a Python int with bit i set for row i, built on first
+    use from the column's codes, so a query such as ETF=Y AND Listing
+    Exchange=N AND NOT Test Issue=Y is a few ANDs over packed bits:
+
+        index.rows(index.match({"ETF": "Y", "Listing Exchange": "N"}, exclude={"Test Issue": "Y"}))
+    """
+
+    def __init__(self, columns, values):
+        """columns: header names; values: one list of strings per column, all of the same length."""
+        self.names = list(columns)
+        self.count = len(values[0]) if values else 0
+        self.columns = {}
+        for name, column in zip(self.names, values):
+            if name in (SYMBOL_COLUMN, NAME_COLUMN):
+                self.columns[name] = PackedStrings(column)
+                continue
+            categories = list(dict.fromkeys(column))
+            if len(categories) > max(self.count * MAX_CATEGORY_SHARE, 256):
+                self.columns[name] = PackedStrings(column)
+            else:
+                self.columns[name] = Categorical(column, categories)
+        self.all_rows = (1 << self.count) - 1
+        self.bitmaps = {}
+
+        symbols = values[self.names.index(SYMBOL_COLUMN)]
+        self.symbol_rows = {symbol: row for row, symbol in enumerate(symbols)}
+        folded = PackedStrings(map(str.casefold, symbols))
+        self.symbol_prefixes = PrefixIndex(folded, folded.offsets[:-1], np.arange(self.count))
+        #Names can be completed from the start of any word, e.g. "tech" finds "Agilent Technologies"
+        folded = PackedStrings(map(str.casefold, values[self.names.index(NAME_COLUMN)]))
+        buffer = np.frombuffer(folded.data, dtype=np.uint8)
+        starts = np.sort(np.concatenate((folded.offsets[:-1], np.flatnonzero(buffer == ord(" ")) + 1)))
+        rows = np.searchsorted(folded.offsets, starts, side="right") - 1
+        nonempty = starts < folded.offsets[np.minimum(rows + 1, self.count)]
+        self.name_prefixes = PrefixIndex(folded, starts[nonempty], rows[nonempty])
+
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            columns = next(reader)
+            values = [[] for _ in columns]
+            appends = [column.append for column in values]
+            for record in reader:
+                if len(record) != len(columns):
+                    continue
+                for append, value in zip(appends, record):
+                    append(value)
+        return cls(columns, values)
+
+
+    def __len__(self):
+        return self.count
+
+
+    def __contains__(self, symbol):
+        return symbol in self.symbol_rows
+
+
+    def record(self, row):
+        return {name: self.columns[name][row] for name in self.names}
+
+
+    def lookup(self, symbol):
+        """Return the record for an exact symbol, or None."""
+        row = self.symbol_rows.get(symbol)
+        return None if row is None else self.record(row)
+
+
+    def complete_symbol(self, prefix, limit=10):
+        """Symbols starting with prefix (ignoring case), shortest-first within each branch."""
+        symbols = self.columns[SYMBOL_COLUMN]
+        return [symbols[row] for row in self.symbol_prefixes.search(prefix, limit)]
+
+
+    def complete_name(self, prefix, limit=10):
+        """(symbol, name) for securities with a word in their name starting with prefix."""
+        symbols, names = self.columns[SYMBOL_COLUMN], self.columns[NAME_COLUMN]
+        return [(symbols[row], names[row]) for row in self.name_prefixes.search(prefix, limit)]
+
+
+    def bitmap(self, column, value):
+        """Bitmap of the rows where column equals value; a tuple or list of values ORs them."""
+        if isinstance(value, (tuple, list, set, frozenset)):
+            result = 0
+            for item in value:
+                result |= self.bitmap(column, item)
+            return result
+        key = (column, value)
+        if key not in self.bitmaps:
+            data = self.columns[column]
+            if not isinstance(data, Categorical):
+                raise ValueError(f"{column!r} has mostly distinct values; look rows up instead of filtering")
+            code = data.lookup.get(value)
+            bits = 0
+            if code is not None:
+                bits = int.from_bytes(np.packbits(data.codes == code, bitorder="little").tobytes(), "little")
+            self.bitmaps[key] = bits
+        return self.bitmaps[key]
+
+
+    def match(self, conditions, exclude=None):
+        """AND of bitmap(column, value) for every condition, minus rows matching any exclude condition."""
+        result = self.all_rows
+        for column, value in conditions.items():
+            result &= self.bitmap(column, value)
+        for column, value in (exclude or {}).items():
+            result &= ~self.bitmap(column, value)
+        return result
+
+
+    def rows(self, bitmap):
+        """Row numbers set in a bitmap, in order."""
+        if not bitmap:
+            return np.empty(0, dtype=np.int64)
+        data = np.frombuffer(bitmap.to_bytes((self.count + 7) // 8, "little"), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(data, bitorder="little")[:self.count])
+
+
+    def symbols(self, bitmap):
+        symbols = self.columns[SYMBOL_COLUMN]
+        return [symbols[row] for row in self.rows(bitmap).tolist()]
+
+
+    def nbytes(self):
+        """Approximate memory held by the columns and bitmaps, not counting the lookup dict and prefix indexes."""
+        return sum(column.nbytes() for column in self.columns.values()) + \
+            sum((bits.bit_length() + 7) // 8 for bits in self.bitmaps.values())
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "symbols_valid_meta.csv")
+    index = SymbolIndex.from_csv(path)
+    print(f"{len(index)} symbols, {index.nbytes() / 1e6:.2f} MB of columns")
+    print(index.lookup("AAPL"))
+    print(index.complete_symbol("AA"))
+    print(index.complete_name("tech", 5))
+    etfs = index.match({"ETF": "Y", "Listing Exchange": ("N", "P")}, exclude={"Test Issue": "Y"})
+    print(f"{etfs.bit_count()} NYSE and NYSE Arca ETFs that are not test issues, e.g. {index.symbols(etfs)[:5]}")
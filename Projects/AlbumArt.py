@@ -0,0 +1,132 @@
+import io
+import os
+import base64
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import tkinter as tk
+import mutagen
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it only PNG/GIF covers can be shown
+    Image = None
+
+FRONT_COVER = 3
+TK_FORMATS = (b"\x89PNG", b"GIF8")
+
+
+def extract_cover(file_path):
+    """Return the embedded cover image bytes of a track, preferring the front cover."""
+    try:
+        audio = mutagen.File(file_path)
+    except Exception as e:
+        logging.warning(f"Could not read cover from {file_path}: {e}")
+        return None
+    if audio is None or audio.tags is None or not hasattr(audio.tags, "getall"):
+        return None
+    pictures = audio.tags.getall("APIC")
+    if not pictures:
+        return None
+    pictures.sort(key=lambda picture: picture.type != FRONT_COVER)
+    return pictures[0].data
+
+
+def make_thumbnail(data, size):
+    """Downscale cover bytes to fit size and return them as PNG, or None if unusable."""
+    if Image is None:
+        return data if data.startswith(TK_FORMATS) else None
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.thumbnail(size)
+        output = io.BytesIO()
+        image.convert("RGBA").save(output, format="PNG")
+        return output.getvalue()
+    except Exception as e:
+        logging.warning(f"Could not decode cover image: {e}")
+        return None
+
+
+class AlbumArtCache:
+    """Two-tier cover cache: an LRU of Tk images in memory and PNG thumbnails on disk.
+
+    Extraction and scaling run on an executor; only the cheap PhotoImage
+    creation from ready-made PNG bytes happens on the Tk thread.
+    """
+
+    def __init__(self, cache_dir, size, executor, capacity=64):
+        self.cache_dir = cache_dir
+        self.size = size
+        self.executor = executor
+        self.capacity = capacity
+        self.images = OrderedDict()
+        self.pending = {}
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+
+    def key(self, file_path):
+        """Return a key for the file's current contents, or None if it is unreadable."""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        ident = f"{file_path}|{stat.st_size}|{stat.st_mtime_ns}|{self.size[0]}x{self.size[1]}"
+        return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+
+    def load_thumbnail(self, file_path, key):
+        """Return thumbnail PNG bytes from disk, extracting and scaling them on a miss."""
+        thumb_file = os.path.join(self.cache_dir, f"{key}.png")
+        no_art_file = os.path.join(self.cache_dir, f"{key}.none")
+        if os.path.exists(thumb_file):
+            with open(thumb_file, "rb") as f:
+                return f.read()
+        if os.path.exists(no_art_file):
+            return None
+        cover = extract_cover(file_path)
+        thumbnail = make_thumbnail(cover, self.size) if cover else None
+        try:
+            if thumbnail is None:
+                open(no_art_file, "wb").close()
+            else:
+                with open(f"{thumb_file}.tmp", "wb") as f:
+                    f.write(thumbnail)
+                os.replace(f"{thumb_file}.tmp", thumb_file)
+        except OSError as e:
+            logging.warning(f"Could not write cover thumbnail: {e}")
+        return thumbnail
+
+
+    def get(self, file_path):
+        """Return (found, image) from memory; image is None for tracks without art."""
+        key = self.key(file_path)
+        if key in self.images:
+            self.images.move_to_end(key)
+            return True, self.images[key]
+        return False, None
+
+
+    def request(self, file_path):
+        """Start loading a track's thumbnail; returns (key, Future of PNG bytes) or None."""
+        key = self.key(file_path)
+        if key is None or key in self.images:
+            return None
+        with self.lock:
+            future = self.pending.get(key)
+            if future is None:
+                future = self.pending[key] = self.executor.submit(self.load_thumbnail, file_path, key)
+                future.add_done_callback(lambda f: self.pending.pop(key, None))
+        return key, future
+
+
+    def store(self, key, thumbnail):
+        """Turn thumbnail bytes into a Tk image on the Tk thread and keep it in the LRU."""
+        if key in self.images:
+            return self.images[key]
+        image = tk.PhotoImage(data=base64.b64encode(thumbnail)) if thumbnail else None
+        self.images[key] = image
+        while len(self.images) > self.capacity:
+            self.images.popitem(last=False)
+        return image
@@ -0,0 +1,237 @@
+import os
+import io
+import json
+import mmap
+import struct
+import hashlib
+import tempfile
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+
+
+class DecodeCache:
+    """Size-capped LRU of tracks decoded to raw PCM files on local disk.
+
+    PCM is stored in the mixer's own format, so a cached track needs no decoding
+    at all: it is played by streaming a WAV view over a memory-mapped file.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir, max_bytes, workers=2):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.frequency, size, self.channels = pygame.mixer.get_init()
+        self.sample_width = abs(size) // 8
+        self.entries = OrderedDict()
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # one writer of the index temp file at a time
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.load_index()
+
+
+    def load_index(self):
+        """Load the LRU order and drop entries whose PCM file is gone."""
+        try:
+            with open(os.path.join(self.cache_dir, self.INDEX_FILE), "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, size in entries:
+            if os.path.exists(self.pcm_path(key)):
+                self.entries[key] = size
+
+
+    def save_index(self):
+        """Atomically write the LRU order to disk; concurrent saves run one at a time."""
+        index_file = os.path.join(self.cache_dir, self.INDEX_FILE)
+        with self.save_lock:
+            with self.lock:
+                data = json.dumps(list(self.entries.items()))
+            try:
+                with open(f"{index_file}.tmp", "w", encoding="utf-8") as f:
+                    f.write(data)
+                os.replace(f"{index_file}.tmp", index_file)
+            except OSError as e:
+                logging.error(f"Failed to save decode cache index: {e}")
+
+
+    def key(self, file_path):
+        """Return the cache key for the file's current contents, or None if unreadable."""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        ident = f"{file_path}|{stat.st_size}|{stat.st_mtime_ns}|{self.frequency}|{self.channels}|{self.sample_width}"
+        return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+
+    def pcm_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pcm")
+
+
+    def lookup(self, file_path):
+        """Return the PCM file for a track if it is cached, marking it recently used."""
+        key = self.key(file_path)
+        with self.lock:
+            if key is None or not self.entries.get(key):
+                return None
+            self.entries.move_to_end(key)
+        return self.pcm_path(key)
+
+
+    def prefetch(self, file_paths):
+        """Decode tracks that are not cached yet on the background workers."""
+        for file_path in file_paths:
+            key = self.key(file_path)
+            with self.lock:
+                if key is None or key in self.entries or key in self.pending:
+                    continue
+                self.pending.add(key)
+            self.executor.submit(self.decode, file_path, key)
+
+
+    def decode(self, file_path, key):
+        """Decode one track to PCM, then evict least recently used tracks over the cap."""
+        try:
+            raw = pygame.mixer.Sound(file_path).get_raw()
+            if not raw or len(raw) > self.max_bytes:
+                return
+            fd, tmp_file = tempfile.mkstemp(suffix=".tmp", prefix=key, dir=self.cache_dir)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(raw)
+                os.replace(tmp_file, self.pcm_path(key))
+            except OSError:
+                os.remove(tmp_file)
+                raise
+            with self.lock:
+                self.entries[key] = len(raw)
+                evicted = self.evict()
+            for old_key in evicted:
+                try:
+                    os.remove(self.pcm_path(old_key))
+                except OSError:
+                    pass
+            self.save_index()
+            logging.info(f"Decoded {file_path} to PCM cache ({len(raw) / (1024 * 1024):.1f}MB)")
+        except (pygame.error, OSError) as e:
+            logging.warning(f"Decode cache failed for {file_path}: {e}")
+        finally:
+            with self.lock:
+                self.pending.discard(key)
+
+
+    def evict(self):
+        """Drop the oldest entries until the cache fits; caller holds the lock."""
+        evicted = []
+        total = sum(self.entries.values())
+        while total > self.max_bytes and len(self.entries) > 1:
+            key, size = self.entries.popitem(last=False)
+            total -= size
+            evicted.append(key)
+        return evicted
+
+
+    def open(self, pcm_file, position=0.0):
+        """Return a WAV file object over the cached PCM starting at position seconds."""
+        frame_bytes = self.channels * self.sample_width
+        return PcmSource(pcm_file, self.frequency, self.channels, self.sample_width,
+                         int(position * self.frequency) * frame_bytes)
+
+
+    def shutdown(self):
+        """Stop the workers and persist the LRU order."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.save_index()
+
+
+class PcmSource(io.RawIOBase):
+    """Read-only WAV stream made of a generated header plus a memory-mapped PCM file.
+
+    readinto() copies straight from the mapping into the caller's buffer.
+    read() returns one slice of the mapping as bytes, because pygame only
+    accepts bytes from a file object's read().
+    """
+
+    def __init__(self, pcm_file, frequency, channels, sample_width, offset=0):
+        self.map = None
+        with open(pcm_file, "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        #An empty PCM file cannot be mapped; it plays as a WAV with no samples
+        self.data = memoryview(self.map) if self.map is not None else memoryview(b"")
+        self.offset = min(offset, len(self.data))
+        data_size = len(self.data) - self.offset
+        block_align = channels * sample_width
+        self.header = struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + data_size, b"WAVE",
+                                  b"fmt ", 16, 1, channels, frequency, frequency * block_align,
+                                  block_align, sample_width * 8, b"data", data_size)
+        self.size = len(self.header) + data_size
+        self.pos = 0
+
+
+    def readable(self):
+        return True
+
+
+    def seekable(self):
+        return True
+
+
+    def slices(self, size):
+        """Return memoryviews of the header and PCM bytes for the next size bytes and advance."""
+        if size is None or size < 0:
+            size = self.size - self.pos
+        end = min(self.size, self.pos + size)
+        header_size = len(self.header)
+        parts = []
+        if self.pos < header_size:
+            parts.append(memoryview(self.header)[self.pos:min(end, header_size)])
+        if end > header_size:
+            start = self.offset + max(self.pos, header_size) - header_size
+            parts.append(self.data[start:self.offset + end - header_size])
+        self.pos = max(self.pos, end)
+        return parts
+
+
+    def read(self, size=-1):
+        parts = self.slices(size)
+        if len(parts) == 1:
+            return parts[0].tobytes()
+        return b"".join(parts)
+
+
+    def readinto(self, buffer):
+        target = memoryview(buffer).cast("B")
+        filled = 0
+        for part in self.slices(len(target)):
+            target[filled:filled + len(part)] = part
+            filled += len(part)
+        return filled
+
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.pos
+        elif whence == os.SEEK_END:
+            offset += self.size
+        self.pos = max(0, min(offset, self.size))
+        return self.pos
+
+
+    def tell(self):
+        return self.pos
+
+
+    def close(self):
+        if not self.closed:
+            self.data.release()
+            if self.map is not None:
+                self.map.close()
+        super().close()
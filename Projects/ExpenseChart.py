@@ -0,0 +1,110 @@
+import time
+import logging
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+OTHER_LABEL = "Other"
+POLL_MS = 30
+
+
+def fold_categories(totals, max_bars):
+    """Sort {label: value} descending and fold everything past max_bars - 1 into "Other"."""
+    items = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    if len(items) > max_bars:
+        rest = sum(value for _, value in items[max_bars - 1:])
+        items = items[:max_bars - 1] + [(OTHER_LABEL, rest)]
+    return [label for label, _ in items], [value for _, value in items]
+
+
+class ExpenseChart:
+    """One bar chart figure and Tk canvas that is updated in place.
+
+    request() takes a function that returns {label: value}; it runs on the
+    executor, never on the Tk thread. Requests that arrive while one is being
+    computed, or sooner than min_interval_ms after the last redraw, are merged
+    so only the newest one is drawn. When the number of bars stays the same
+    only their heights and labels change; otherwise the bars are replaced on
+    the same axes. The figure is created once and never through pyplot, so
+    nothing accumulates between updates.
+    """
+
+    def __init__(self, master, executor, max_bars=8, min_interval_ms=250, title="Expenses by Category"):
+        self.executor = executor
+        self.max_bars = max_bars
+        self.min_interval_ms = min_interval_ms
+        self.figure = Figure(figsize=(5, 4), dpi=100)
+        self.axes = self.figure.add_subplot()
+        self.axes.set_title(title)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.widget = self.canvas.get_tk_widget()
+        self.bars = None
+        self.pending = None
+        self.future = None
+        self.job = None
+        self.last_draw = 0.0
+
+
+    def grid(self, **options):
+        self.widget.grid(**options)
+
+
+    def request(self, compute):
+        """Redraw with the result of compute() as soon as the throttle allows."""
+        self.pending = compute
+        self.schedule()
+
+
+    def schedule(self):
+        if self.job is not None or self.future is not None:
+            return
+        elapsed_ms = (time.monotonic() - self.last_draw) * 1000
+        self.job = self.widget.after(int(max(0, self.min_interval_ms - elapsed_ms)), self.start)
+
+
+    def start(self):
+        self.job = None
+        compute, self.pending = self.pending, None
+        if compute is None:
+            return
+        self.future = self.executor.submit(lambda: fold_categories(compute(), self.max_bars))
+        self.poll()
+
+
+    def poll(self):
+        if not self.future.done():
+            self.widget.after(POLL_MS, self.poll)
+            return
+        future, self.future = self.future, None
+        try:
+            labels, values = future.result()
+        except Exception as e:
+            logging.error(f"Chart update failed: {e}")
+        else:
+            self.draw(labels, values)
+        if self.pending is not None:
+            self.schedule()
+
+
+    def draw(self, labels, values):
+        """Update the bars in place, or replace them if their number changed."""
+        positions = range(len(values))
+        if self.bars is not None and len(self.bars) == len(values):
+            for bar, value in zip(self.bars, values):
+                bar.set_height(value)
+        else:
+            if self.bars is not None:
+                self.bars.remove()
+            self.bars = self.axes.bar(positions, values)
+        self.axes.set_xticks(positions, labels, rotation=30 if len(labels) > 4 else 0, ha="right" if len(labels) > 4 else "center")
+        self.axes.relim()
+        self.axes.autoscale_view()
+        self.canvas.draw_idle()
+        self.last_draw = time.monotonic()
+
+
+    def close(self):
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+            self.job = None
+        self.pending = None
+        self.figure.clear()
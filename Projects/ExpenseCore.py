@@ -0,0 +1,129 @@
+import os
+import time
+import threading
+import numpy as np
+from ExpenseLedger import ExpenseLedger, valid_timestamps
+from ExpenseRollups import ExpenseRollups
+from ExpenseImporter import parse_dates
+from Money import Money, parse_amounts
+
+
+class ExpenseCore:
+    """Expense tracker state and queries without any UI.
+
+    Owns the ledger and its rollups and serializes access to them with a
+    lock, so the Tk app, the HTTP server and tests can all drive the same
+    core from different threads.
+    """
+
+    def __init__(self, folder, currency="USD"):
+        self.currency = currency
+        self.ledger = ExpenseLedger(folder)
+        self.rollups = ExpenseRollups(self.ledger, os.path.join(folder, "rollups.npz"))
+        self.lock = threading.RLock()
+
+
+    def __len__(self):
+        return len(self.ledger)
+
+
+    def add(self, amount, category, ts=None):
+        """Record one expense given as text or Money; returns the parsed Money."""
+        if not isinstance(amount, Money):
+            amount = Money.parse(amount, self.currency)
+        category = category.strip()
+        if not category:
+            raise ValueError("Category is empty")
+        ts = int(time.time()) if ts is None else int(ts)
+        if not -2 ** 63 <= ts < 2 ** 63 or not valid_timestamps(ts):
+            raise ValueError(f"Timestamp out of range: {ts}")
+        with self.lock:
+            self.ledger.append(ts, amount.minor, category)
+            self.ledger.flush()
+            self.rollups.sync()
+        return amount
+
+
+    def add_records(self, records, flush=True):
+        """Record a batch of {"amount", "category", optional "date" (YYYY-MM-DD) or "ts"} dicts.
+
+        Amounts and dates are validated for the whole batch at once; times
+        before 1970 or more than a year ahead are invalid. Returns
+        (accepted, rejected) where rejected lists the indices of invalid records.
+        With flush=False the caller is responsible for calling flush() later.
+        """
+        count = len(records)
+        if not count:
+            return 0, []
+        amounts, valid = parse_amounts([str(record.get("amount", "")) for record in records], self.currency)
+        categories = [str(record.get("category", "")).strip() for record in records]
+        valid &= np.fromiter((bool(name) for name in categories), dtype=bool, count=count)
+
+        ts = np.full(count, int(time.time()), dtype=np.int64)
+        dated = [i for i, record in enumerate(records) if "date" in record]
+        if dated:
+            seconds, dates_valid = parse_dates([str(records[i]["date"]) for i in dated], "%Y-%m-%d")
+            ts[dated] = seconds
+            valid[dated] &= dates_valid
+        for i, record in enumerate(records):
+            if "ts" in record:
+                try:
+                    ts[i] = int(record["ts"])
+                except (TypeError, ValueError, OverflowError):
+                    valid[i] = False
+        valid &= valid_timestamps(ts)
+
+        keep = np.flatnonzero(valid)
+        with self.lock:
+            codes = np.array([self.ledger.category_code(categories[i]) for i in keep], dtype=np.int32)
+            self.ledger.append_many(ts[keep], amounts[keep], codes)
+            if flush:
+                self.ledger.flush()
+            self.rollups.sync()
+        return len(keep), np.flatnonzero(~valid).tolist()
+
+
+    def poll_import(self, importer):
+        """Move finished import batches into the ledger; returns the importer's (progress, finished)."""
+        with self.lock:
+            progress, finished = importer.poll(self.ledger)
+            self.rollups.sync()
+            if finished:
+                self.ledger.flush()
+        return progress, finished
+
+
+    def flush(self):
+        with self.lock:
+            self.ledger.flush()
+
+
+    def totals(self, start=None, end=None):
+        """{category: minor units} for whole days from start to before end (epoch seconds)."""
+        with self.lock:
+            return self.rollups.totals(start, end)
+
+
+    def top_categories(self, count, start=None, end=None):
+        with self.lock:
+            return self.rollups.top_categories(count, start, end)
+
+
+    def series(self, granularity, start, end, category=None):
+        with self.lock:
+            return self.rollups.series(granularity, start, end, category)
+
+
+    def month_over_month(self, months=12, category=None):
+        with self.lock:
+            return self.rollups.month_over_month(months, category)
+
+
+    def format(self, minor):
+        return str(Money(minor, self.currency))
+
+
+    def close(self):
+        with self.lock:
+            self.ledger.flush()
+            self.rollups.save()
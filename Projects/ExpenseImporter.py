@@ -0,0 +1,261 @@
+import os
+import io
+import csv
+import queue
+import logging
+import threading
+from datetime import datetime, date
+from itertools import islice
+import numpy as np
+from Money import parse_amounts
+from ExpenseRollups import SECONDS_PER_DAY, utc_seconds
+from ExpenseLedger import valid_timestamps
+
+CHUNK_ROWS = 50_000
+QUEUE_BATCHES = 4  # parsed batches waiting for the ledger; bounds memory use
+MAX_ERRORS = 20
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+#Positions of year, month and day digits in the supported fixed-layout date formats
+DATE_LAYOUTS = {
+    "%Y-%m-%d": (slice(0, 4), slice(5, 7), slice(8, 10)),
+    "%m/%d/%Y": (slice(6, 10), slice(0, 2), slice(3, 5)),
+    "%d/%m/%Y": (slice(6, 10), slice(3, 5), slice(0, 2)),
+    "%d.%m.%Y": (slice(6, 10), slice(3, 5), slice(0, 2)),
+}
+
+
+class ImportSchema:
+    """Which statement columns hold the amount, category and date, and how to read them.
+
+    Column names are matched case-insensitively against the header row.
+    Without a category column every row gets default_category. Statements
+    that list spending as negative numbers can set negate=True.
+    """
+
+    def __init__(self, amount="Amount", date="Date", category="Category", date_format="%Y-%m-%d",
+                 delimiter=None, currency="USD", default_category="Uncategorized", negate=False, encoding="utf-8-sig"):
+        if date_format not in DATE_LAYOUTS:
+            raise ValueError(f"Unsupported date format: {date_format}")
+        self.amount = amount
+        self.date = date
+        self.category = category
+        self.date_format = date_format
+        self.delimiter = delimiter
+        self.currency = currency
+        self.default_category = default_category
+        self.negate = negate
+        self.encoding = encoding
+
+
+    def delimiter_for(self, file_path):
+        if self.delimiter:
+            return self.delimiter
+        return "\t" if file_path.lower().endswith((".tsv", ".tab")) else ","
+
+
+    def column_indices(self, header):
+        """Return (amount, date, category) positions in a header row; category may be None."""
+        names = [name.strip().lower() for name in header]
+
+        def find(name, required=True):
+            if name and name.lower() in names:
+                return names.index(name.lower())
+            if required:
+                raise ValueError(f"Column '{name}' not found in header: {', '.join(header)}")
+            return None
+        return find(self.amount), find(self.date), find(self.category, required=False)
+
+
+def days_from_civil(year, month, day):
+    """Days since 1970-01-01 for arrays of proleptic Gregorian dates."""
+    year = year - (month <= 2)
+    era = np.floor_divide(year, 400)
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def parse_dates(texts, date_format):
+    """Parse date strings into epoch seconds at local midnight.
+
+    Returns (seconds, valid). Zero-padded dates are read as a byte matrix
+    with NumPy; anything else (1/5/2024, stray text, non-ASCII characters)
+    is retried one by one with datetime.strptime, and rows that still fail
+    are invalid.
+    """
+    count = len(texts)
+    days = np.zeros(count, dtype=np.int64)
+    valid = np.zeros(count, dtype=bool)
+    if not count:
+        return days, valid
+    try:
+        raw = np.char.strip(np.asarray(texts, dtype="S"))
+    except UnicodeEncodeError:
+        raw = np.char.strip(np.array([str(text).encode("ascii", "replace") for text in texts], dtype="S"))
+    if raw.dtype.itemsize >= 10:
+        chars = np.frombuffer(raw.astype("S10").tobytes(), dtype=np.uint8).reshape(count, 10).astype(np.int64) - ord("0")
+
+        def number(part):
+            digits = chars[:, part]
+            value = np.zeros(count, dtype=np.int64)
+            for column in digits.T:
+                value = value * 10 + column
+            return value, ((digits >= 0) & (digits <= 9)).all(axis=1)
+
+        years, months, month_days = (number(part) for part in DATE_LAYOUTS[date_format])
+        year, month, day = years[0], months[0], month_days[0]
+        month_lengths = np.array([31, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+        leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+        valid = (years[1] & months[1] & month_days[1] & (np.char.str_len(raw) == 10)
+                 & (month >= 1) & (month <= 12) & (day >= 1)
+                 & (day <= month_lengths[np.clip(month, 0, 12)] + (leap & (month == 2))))
+        days = np.where(valid, days_from_civil(year, month, day), 0)
+
+    for i in np.flatnonzero(~valid):
+        try:
+            parsed = datetime.strptime(str(texts[i]).strip(), date_format)
+        except ValueError:
+            continue
+        days[i] = parsed.toordinal() - EPOCH_ORDINAL
+        valid[i] = True
+    return np.where(valid, utc_seconds(days * SECONDS_PER_DAY), 0), valid
+
+
+class ExpenseImporter:
+    """Streams a CSV/TSV statement into batches of ledger columns on a background thread.
+
+    The worker reads CHUNK_ROWS rows at a time, validates and converts each
+    chunk with NumPy and puts it on a small bounded queue, so at most a few
+    chunks are in memory however large the file is. The Tk thread calls
+    poll() to take the finished batches, append them to the ledger and learn
+    the progress; the ledger itself is only touched on that thread.
+    """
+
+    def __init__(self, file_path, schema, chunk_rows=CHUNK_ROWS):
+        self.file_path = file_path
+        self.schema = schema
+        self.chunk_rows = chunk_rows
+        self.batches = queue.Queue(maxsize=QUEUE_BATCHES)
+        self.size = max(1, os.path.getsize(file_path))
+        self.done = threading.Event()
+        self.cancelled = threading.Event()
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name="expense-import", daemon=True)
+
+
+    def start(self):
+        self.thread.start()
+        return self
+
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+    def run(self):
+        try:
+            with open(self.file_path, "rb") as raw:
+                text = io.TextIOWrapper(raw, encoding=self.schema.encoding, newline="")
+                reader = csv.reader(text, delimiter=self.schema.delimiter_for(self.file_path))
+                header = next(reader, None)
+                if header is None:
+                    return
+                columns = self.schema.column_indices(header)
+                line = 2
+                while not self.cancelled.is_set():
+                    rows = list(islice(reader, self.chunk_rows))
+                    if not rows:
+                        break
+                    batch = self.convert(rows, columns, line)
+                    line += len(rows)
+                    batch["progress"] = raw.tell() / self.size
+                    self.put(batch)
+        except (OSError, ValueError, csv.Error, UnicodeDecodeError) as e:
+            self.error = e
+            logging.error(f"Import of {self.file_path} failed: {e}")
+        finally:
+            self.done.set()
+
+
+    def put(self, batch):
+        """Hand a batch to the Tk thread, waiting while the queue is full unless cancelled."""
+        while not self.cancelled.is_set():
+            try:
+                self.batches.put(batch, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+    def convert(self, rows, columns, first_line):
+        """Validate one chunk of rows and turn it into column arrays."""
+        amount_index, date_index, category_index = columns
+        needed = max(index for index in columns if index is not None) + 1
+        complete = np.fromiter((len(row) >= needed for row in rows), dtype=bool, count=len(rows))
+        if not complete.all():
+            kept = np.flatnonzero(complete)
+            rows = [rows[i] for i in kept]
+        else:
+            kept = None
+
+        amounts, amounts_valid = parse_amounts([row[amount_index] for row in rows], self.schema.currency)
+        if self.schema.negate:
+            amounts = -amounts
+        ts, dates_valid = parse_dates([row[date_index] for row in rows], self.schema.date_format)
+        dates_valid &= valid_timestamps(ts)
+        valid = amounts_valid & dates_valid
+        accepted = np.flatnonzero(valid)
+        #Only accepted rows name categories, so rejected ones never register a category
+        if not len(accepted):
+            names, codes = [], np.zeros(0, dtype=np.int32)
+        elif category_index is None:
+            names, codes = [self.schema.default_category], np.zeros(len(accepted), dtype=np.int32)
+        else:
+            categories = np.array([rows[i][category_index].strip() or self.schema.default_category for i in accepted])
+            names, codes = np.unique(categories, return_inverse=True)
+
+        if not valid.all() or kept is not None:
+            self.note_errors(first_line, complete, kept, amounts_valid, dates_valid)
+        return {
+            "ts": ts[valid],
+            "amount": amounts[valid],
+            "codes": codes.astype(np.int32),
+            "names": [str(name) for name in names],
+        }
+
+
+    def note_errors(self, first_line, complete, kept, amounts_valid, dates_valid):
+        """Count rejected rows and remember the first few for the report."""
+        lines = first_line + (np.arange(len(complete)) if kept is None else kept)
+        short = first_line + np.flatnonzero(~complete)
+        bad_amounts = lines[~amounts_valid]
+        bad_dates = lines[amounts_valid & ~dates_valid]
+        self.rejected += len(short) + len(bad_amounts) + len(bad_dates)
+        for label, bad in (("missing columns", short), ("invalid amount", bad_amounts), ("invalid date", bad_dates)):
+            for line in bad[:max(0, MAX_ERRORS - len(self.errors))]:
+                self.errors.append(f"line {line}: {label}")
+
+
+    def poll(self, ledger):
+        """Append every finished batch to the ledger; returns (progress, finished).
+
+        Call this on the thread that owns the ledger.
+        """
+        progress = None
+        while True:
+            try:
+                batch = self.batches.get_nowait()
+            except queue.Empty:
+                break
+            lookup = np.array([ledger.category_code(name) for name in batch["names"]], dtype=np.int32)
+            codes = lookup[batch["codes"]] if len(lookup) else batch["codes"]
+            ledger.append_many(batch["ts"], batch["amount"], codes)
+            self.imported += len(batch["ts"])
+            progress = batch["progress"]
+        finished = self.done.is_set() and self.batches.empty()
+        return (1.0 if finished else progress), finished
@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import logging
+import threading
+import numpy as np
+from Money import INT64_MAX, group_sums, sum_minor
+from ExpenseRollups import local_seconds, utc_seconds
+
+CHUNK_ROWS = 1 << 16
+COLUMNS = {"ts": np.int64, "amount": np.int64, "category": np.int32}
+MIN_TS = 0  # 1970-01-01
+FUTURE_LIMIT_S = 366 * 86400  # expenses may be dated up to a year ahead
+
+
+def valid_timestamps(ts):
+    """True where epoch seconds fall between 1970 and a year from now."""
+    ts = np.asarray(ts, dtype=np.int64)
+    return (ts >= MIN_TS) & (ts <= int(time.time()) + FUTURE_LIMIT_S)
+
+
+class ExpenseLedger:
+    """Append-only expense ledger stored as memory-mapped typed columns.
+
+    Each column (timestamp in epoch seconds, amount in integer minor units,
+    category code) is a flat binary file that grows in chunks of CHUNK_ROWS,
+    so opening the ledger maps the files instead of reading them. Category
+    names and the row count live in a small JSON file that is replaced
+    atomically on flush; rows past the stored count are ignored on open,
+    which makes an interrupted append harmless.
+
+    Aggregations are NumPy operations over the mapped columns. While rows
+    arrive in time order (the usual case) date ranges are found by binary
+    search instead of a full mask.
+    """
+
+    VERSION = 1
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.meta_file = os.path.join(folder, "ledger.json")
+        self.count = 0
+        self.capacity = 0
+        self.categories = []
+        self.codes = {}
+        self.in_order = True
+        self.columns = {}
+        self.save_lock = threading.Lock()  # one writer of the temp file at a time
+        os.makedirs(folder, exist_ok=True)
+        self.load()
+
+
+    def __len__(self):
+        return self.count
+
+
+    def column_file(self, name):
+        return os.path.join(self.folder, f"{name}.bin")
+
+
+    def load(self):
+        """Read the row count and categories, then map the columns."""
+        try:
+            with open(self.meta_file, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") == self.VERSION:
+                self.count = meta["count"]
+                self.categories = meta["categories"]
+                self.in_order = meta["in_order"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable ledger metadata: {e}")
+        self.codes = {name: code for code, name in enumerate(self.categories)}
+        self.map_columns(max(self.count, CHUNK_ROWS))
+
+
+    def map_columns(self, rows):
+        """Grow every column file to hold at least rows entries and map it."""
+        capacity = -(-rows // CHUNK_ROWS) * CHUNK_ROWS
+        for name, dtype in COLUMNS.items():
+            path = self.column_file(name)
+            size = capacity * np.dtype(dtype).itemsize
+            column = self.columns.pop(name, None)
+            if column is not None:
+                column.flush()
+                del column
+            with open(path, "ab") as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            self.columns[name] = np.memmap(path, dtype=dtype, mode="r+", shape=(capacity,))
+        self.capacity = capacity
+
+
+    def flush(self):
+        """Write mapped pages and then the row count, so the count never covers unwritten rows."""
+        with self.save_lock:
+            for column in self.columns.values():
+                column.flush()
+            meta = {"version": self.VERSION, "count": self.count, "categories": list(self.categories), "in_order": self.in_order}
+            try:
+                with open(f"{self.meta_file}.tmp", "w", encoding="utf-8") as f:
+                    json.dump(meta, f)
+                os.replace(f"{self.meta_file}.tmp", self.meta_file)
+            except OSError as e:
+                logging.error(f"Failed to save ledger metadata: {e}")
+
+
+    def category_code(self, name):
+        """Return the code of a category, registering it if it is new."""
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.categories)
+            self.categories.append(name)
+        return code
+
+
+    def append(self, ts, amount, category):
+        """Add one expense: epoch seconds, integer minor units and a category name."""
+        #Convert first so a value that does not fit int64 fails before the category is registered
+        ts, amount = np.array([ts], dtype=np.int64), np.array([amount], dtype=np.int64)
+        self.append_many(ts, amount, [self.category_code(category)])
+
+
+    def append_many(self, ts, amounts, codes):
+        """Add a batch of expenses given as arrays of timestamps, amounts and category codes."""
+        ts = np.asarray(ts, dtype=np.int64)
+        if not len(ts):
+            return
+        start, end = self.count, self.count + len(ts)
+        if end > self.capacity:
+            self.map_columns(max(end, self.capacity * 2))
+        if self.in_order:
+            previous = self.columns["ts"][start - 1] if start else ts[0]
+            self.in_order = bool(ts[0] >= previous and (len(ts) == 1 or (np.diff(ts) >= 0).all()))
+        self.columns["ts"][start:end] = ts
+        self.columns["amount"][start:end] = amounts
+        self.columns["category"][start:end] = codes
+        self.count = end
+
+
+    def view(self):
+        """Return (ts, amount, category) arrays over the stored rows."""
+        return tuple(self.columns[name][:self.count] for name in COLUMNS)
+
+
+    def select(self, start=None, end=None):
+        """Return the columns restricted to start <= ts < end (epoch seconds, None for open)."""
+        ts, amount, category = self.view()
+        if start is None and end is None:
+            return ts, amount, category
+        if self.in_order:
+            first = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+            last = len(ts) if end is None else int(np.searchsorted(ts, end, side="left"))
+            return ts[first:last], amount[first:last], category[first:last]
+        mask = np.ones(len(ts), dtype=bool)
+        if start is not None:
+            mask &= ts >= start
+        if end is not None:
+            mask &= ts < end
+        return ts[mask], amount[mask], category[mask]
+
+
+    def total(self, start=None, end=None, category=None):
+        """Sum of amounts in minor units, optionally for one category and a date range."""
+        ts, amount, codes = self.select(start, end)
+        if category is not None:
+            code = self.codes.get(category)
+            if code is None:
+                return 0
+            amount = amount[codes == code]
+        return sum_minor(amount)
+
+
+    def totals_by_category(self, start=None, end=None):
+        """Return {category: total minor units} over a date range."""
+        ts, amount, codes = self.select(start, end)
+        totals = group_sums(codes, amount, len(self.categories))
+        return {name: int(totals[code]) for code, name in enumerate(self.categories) if totals[code]}
+
+
+    def totals_by_month(self, start=None, end=None, category=None):
+        """Return {"YYYY-MM": total minor units} by local calendar month over a date range."""
+        ts, amount, codes = self.select(start, end)
+        if category is not None:
+            mask = codes == self.codes.get(category, -1)
+            ts, amount = ts[mask], amount[mask]
+        if not len(ts):
+            return {}
+        if self.in_order:
+            #Sorted rows: cut at the instants local months start and difference a running sum
+            months = np.arange(np.datetime64(int(local_seconds(ts[0])), "s").astype("datetime64[M]"),
+                               np.datetime64(int(local_seconds(ts[-1])), "s").astype("datetime64[M]") + 2)
+            cuts = np.searchsorted(ts, utc_seconds(months.astype("datetime64[s]").astype(np.int64)))
+            largest = max(abs(int(amount.min())), abs(int(amount.max())))
+            dtype = np.int64 if largest * len(amount) <= INT64_MAX else object  # exact past int64
+            running = np.concatenate(([0], np.cumsum(amount.astype(dtype), dtype=dtype)))
+            totals = running[cuts[1:]] - running[cuts[:-1]]
+            first = months[0]
+        else:
+            months = local_seconds(ts).astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+            first = months.min()
+            totals = group_sums(months - first, amount, int(months.max() - first) + 1)
+            first = np.datetime64(int(first), "M")
+        return {str(first + offset): int(total) for offset, total in enumerate(totals) if total}
@@ -0,0 +1,334 @@
+import os
+import time
+import logging
+import threading
+import numpy as np
+from Money import INT64_MAX, sum_minor
+
+SECONDS_PER_DAY = 86400
+#Timestamps are clamped to this span before bucketing, which bounds the dense tables
+FIRST_TS = 0  # 1970-01-01
+LAST_TS = 4102444800  # 2100-01-01
+GRANULARITIES = ("day", "week", "month")
+
+
+def offset_at(ts):
+    """The system time zone's UTC offset in seconds at one epoch time."""
+    try:
+        return time.localtime(ts).tm_gmtoff
+    except (OverflowError, OSError, ValueError):
+        return -time.timezone
+
+
+def utc_offsets(ts):
+    """Local UTC offsets for an array of epoch seconds.
+
+    Offsets are looked up once at the start and end of every distinct UTC
+    day; only the timestamps of days where the two differ (a DST change)
+    are looked up one by one.
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    flat = ts.ravel()
+    days, inverse = np.unique(np.floor_divide(flat, SECONDS_PER_DAY), return_inverse=True)
+    starts = np.array([offset_at(int(day) * SECONDS_PER_DAY) for day in days], dtype=np.int64)
+    ends = np.array([offset_at(int(day) * SECONDS_PER_DAY + SECONDS_PER_DAY - 1) for day in days], dtype=np.int64)
+    index = inverse.ravel()
+    offsets = starts[index]
+    for i in np.flatnonzero(offsets != ends[index]):
+        offsets[i] = offset_at(int(flat[i]))
+    return offsets.reshape(ts.shape)
+
+
+def local_seconds(ts):
+    """Shift epoch seconds to local wall-clock seconds since 1970-01-01."""
+    ts = np.asarray(ts, dtype=np.int64)
+    return ts + utc_offsets(ts)
+
+
+def utc_seconds(local):
+    """Epoch seconds of local wall-clock times; the inverse of local_seconds."""
+    local = np.asarray(local, dtype=np.int64)
+    return local - utc_offsets(local - utc_offsets(local))
+
+
+def bucket_ids(ts, granularity):
+    """Map epoch seconds to local day, Monday-based week or calendar month numbers.
+
+    Times outside FIRST_TS..LAST_TS count in the first or last bucket.
+    """
+    days = np.floor_divide(local_seconds(np.clip(ts, FIRST_TS, LAST_TS)), SECONDS_PER_DAY)
+    if granularity == "day":
+        return days
+    if granularity == "week":
+        return np.floor_divide(days + 3, 7)  # 1970-01-01 was a Thursday
+    if granularity == "month":
+        return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def bucket_start(bucket, granularity):
+    """Return the first local day of a bucket as a numpy datetime64[D]."""
+    if granularity == "day":
+        return np.datetime64(int(bucket), "D")
+    if granularity == "week":
+        return np.datetime64(int(bucket) * 7 - 3, "D")
+    return np.datetime64(int(bucket), "M").astype("datetime64[D]")
+
+
+class RollupTable:
+    """Per-bucket, per-category totals for one granularity, with lazy prefix sums.
+
+    cells[i, c] holds the total of category c in bucket origin + i. The
+    cumulative sums over buckets are recomputed only from the first bucket
+    that changed since the last query, so an update is O(1) and a range total
+    is two row lookups.
+
+    No cell, prefix sum or range total can exceed the sum of the absolute
+    amounts added, so the table stays int64 while that magnitude fits and
+    switches to exact Python ints (object arrays) once it would not.
+    """
+
+    def __init__(self, granularity):
+        self.granularity = granularity
+        self.origin = 0
+        self.magnitude = 0  # sum of |amount| over everything added
+        self.cells = np.zeros((0, 0), dtype=np.int64)
+        self.prefix = np.zeros((1, 0), dtype=np.int64)
+        self.prefix_valid = 1  # prefix rows [0, prefix_valid) are up to date
+
+
+    def ensure(self, first, last, categories):
+        """Grow the table to cover buckets first..last and the given number of categories."""
+        rows, columns = self.cells.shape
+        if rows and first >= self.origin and last < self.origin + rows and categories <= columns:
+            return
+        new_origin = first if not rows else min(first, self.origin)
+        new_end = last + 1 if not rows else max(last + 1, self.origin + rows)
+        #Leave room on both sides so that appends in time order rarely copy
+        spare = max(16, (new_end - new_origin) // 2)
+        if rows and new_origin < self.origin:
+            new_origin -= spare
+        if not rows or new_end > self.origin + rows:
+            new_end += spare
+        cells = np.zeros((new_end - new_origin, max(categories, columns)), dtype=self.cells.dtype)
+        if rows:
+            start = self.origin - new_origin
+            cells[start:start + rows, :columns] = self.cells
+        self.origin = new_origin
+        self.cells = cells
+        self.prefix_valid = 1
+
+
+    @property
+    def exact(self):
+        return self.cells.dtype == object
+
+
+    def grow_magnitude(self, added):
+        """Account for added absolute minor units, moving to exact ints before int64 could overflow."""
+        self.magnitude += added
+        if self.magnitude > INT64_MAX and not self.exact:
+            self.cells = self.cells.astype(object)
+            self.prefix = self.prefix.astype(object)
+            self.prefix_valid = 1
+
+
+    def add(self, ts, amount, code):
+        bucket = int(bucket_ids(ts, self.granularity))
+        self.ensure(bucket, bucket, code + 1)
+        self.grow_magnitude(abs(int(amount)))
+        self.cells[bucket - self.origin, code] += int(amount) if self.exact else amount
+        self.prefix_valid = min(self.prefix_valid, bucket - self.origin + 1)
+
+
+    def add_many(self, ts, amounts, codes):
+        if not len(ts):
+            return
+        buckets = bucket_ids(ts, self.granularity)
+        first = int(buckets.min())
+        self.ensure(first, int(buckets.max()), int(codes.max()) + 1)
+        self.grow_magnitude(sum_minor(np.abs(amounts)))
+        np.add.at(self.cells, (buckets - self.origin, codes), amounts.astype(object) if self.exact else amounts)
+        self.prefix_valid = min(self.prefix_valid, first - self.origin + 1)
+
+
+    def prefix_sums(self):
+        """Return cumulative totals with prefix[i] = sum of cells[:i], refreshing only stale rows."""
+        rows, columns = self.cells.shape
+        if self.prefix.shape != (rows + 1, columns) or self.prefix.dtype != self.cells.dtype:
+            prefix = np.zeros((rows + 1, columns), dtype=self.cells.dtype)
+            self.prefix = prefix
+            self.prefix_valid = 1
+        if self.prefix_valid <= rows:
+            start = self.prefix_valid
+            np.cumsum(self.cells[start - 1:], axis=0, out=self.prefix[start:])
+            self.prefix[start:] += self.prefix[start - 1]
+            self.prefix_valid = rows + 1
+        return self.prefix
+
+
+    def range_totals(self, first=None, last=None):
+        """Per-category totals over buckets first..last inclusive (None for open ends)."""
+        prefix = self.prefix_sums()
+        rows = len(prefix) - 1
+        lo = 0 if first is None else min(max(first - self.origin, 0), rows)
+        hi = rows if last is None else min(max(last - self.origin + 1, 0), rows)
+        return prefix[max(lo, hi)] - prefix[lo]
+
+
+    def series(self, first, last, code=None):
+        """Bucket totals for first..last inclusive, for one category or summed over all."""
+        if last < first:
+            return np.zeros(0, dtype=self.cells.dtype)
+        values = np.zeros(last - first + 1, dtype=self.cells.dtype)
+        lo, hi = max(first, self.origin), min(last, self.origin + len(self.cells) - 1)
+        if lo <= hi:
+            block = self.cells[lo - self.origin:hi - self.origin + 1]
+            values[lo - first:hi - first + 1] = block.sum(axis=1) if code is None else (
+                block[:, code] if code < block.shape[1] else 0)
+        return values
+
+
+class ExpenseRollups:
+    """Day/week/month by category rollups that follow an ExpenseLedger.
+
+    The ledger is the source of truth and is append-only, so the rollups only
+    remember how many of its rows they include: sync() folds in the rows added
+    since, which costs O(1) per expense. Saved rollups are reused when they
+    match the ledger; if the ledger shrank or its categories no longer match
+    (for example after being replaced on disk) they are rebuilt on the next
+    query instead. Buckets are local calendar days, so rollups saved under
+    another time zone are rebuilt too.
+    """
+
+    VERSION = 3
+
+    def __init__(self, ledger, rollup_file=None):
+        self.ledger = ledger
+        self.rollup_file = rollup_file
+        self.save_lock = threading.Lock()  # one writer of the temp file at a time
+        self.reset()
+        if rollup_file:
+            self.load()
+
+
+    def reset(self):
+        self.rows = 0
+        self.categories = 0
+        self.last_row = None
+        self.tables = {granularity: RollupTable(granularity) for granularity in GRANULARITIES}
+
+
+    def ledger_row(self, index):
+        return tuple(int(column[index]) for column in self.ledger.view())
+
+
+    def is_stale(self):
+        """True if the ledger no longer starts with the rows these rollups were built from."""
+        if self.rows > len(self.ledger) or self.categories > len(self.ledger.categories):
+            return True
+        return self.rows > 0 and self.ledger_row(self.rows - 1) != self.last_row
+
+
+    def sync(self):
+        """Bring the rollups up to date with the ledger, rebuilding them if they are stale."""
+        if self.is_stale():
+            logging.info("Expense rollups are stale, rebuilding")
+            self.reset()
+        if self.rows == len(self.ledger):
+            return
+        ts, amounts, codes = (column[self.rows:] for column in self.ledger.view())
+        if len(ts) == 1:
+            for table in self.tables.values():
+                table.add(int(ts[0]), int(amounts[0]), int(codes[0]))
+        else:
+            for table in self.tables.values():
+                table.add_many(ts, amounts, codes)
+        self.rows = len(self.ledger)
+        self.categories = len(self.ledger.categories)
+        self.last_row = self.ledger_row(self.rows - 1)
+
+
+    def table(self, granularity):
+        self.sync()
+        return self.tables[granularity]
+
+
+    def totals(self, start=None, end=None):
+        """Return {category: total minor units} for days from start to before end (epoch seconds)."""
+        table = self.table("day")
+        first = None if start is None else int(bucket_ids(start, "day"))
+        last = None if end is None else int(bucket_ids(end - 1, "day"))
+        totals = table.range_totals(first, last)
+        return {name: int(totals[code]) for code, name in enumerate(self.ledger.categories)
+                if code < len(totals) and totals[code]}
+
+
+    def total(self, start=None, end=None, category=None):
+        totals = self.totals(start, end)
+        return totals.get(category, 0) if category is not None else sum(totals.values())
+
+
+    def top_categories(self, count, start=None, end=None):
+        """Return the count largest (category, total) pairs over a date range."""
+        return sorted(self.totals(start, end).items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+    def series(self, granularity, start, end, category=None):
+        """Return [(bucket start date, total)] for every bucket between two epoch times."""
+        if end <= start:
+            return []
+        table = self.table(granularity)
+        first, last = int(bucket_ids(start, granularity)), int(bucket_ids(end - 1, granularity))
+        code = None if category is None else self.ledger.codes.get(category, len(self.ledger.categories))
+        values = table.series(first, last, code)
+        return [(bucket_start(first + i, granularity), int(value)) for i, value in enumerate(values)]
+
+
+    def month_over_month(self, months=12, category=None, now=None):
+        """Return [(month, total, change from the previous month or None)] for the last months."""
+        table = self.table("month")
+        current = int(bucket_ids(now if now is not None else np.datetime64("now", "s").astype(np.int64), "month"))
+        code = None if category is None else self.ledger.codes.get(category, len(self.ledger.categories))
+        values = table.series(current - months, current, code)
+        return [(np.datetime64(current - months + i, "M"), int(values[i]),
+                 int(values[i] - values[i - 1]) if i else None) for i in range(1, len(values))]
+
+
+    def save(self):
+        if not self.rollup_file:
+            return
+        arrays = {"meta": np.array([self.VERSION, self.rows, self.categories, time.timezone,
+                                    *(self.last_row or (0, 0, 0))], dtype=np.int64)}
+        for granularity, table in self.tables.items():
+            if table.exact:
+                return  # left to be rebuilt from the ledger; exact cells are not plain arrays
+            arrays[f"{granularity}_origin"] = np.array(table.origin)
+            arrays[f"{granularity}_magnitude"] = np.array(table.magnitude)
+            arrays[f"{granularity}_cells"] = table.cells
+        with self.save_lock:
+            try:
+                with open(f"{self.rollup_file}.tmp", "wb") as f:
+                    np.savez(f, **arrays)
+                os.replace(f"{self.rollup_file}.tmp", self.rollup_file)
+            except OSError as e:
+                logging.error(f"Failed to save expense rollups: {e}")
+
+
+    def load(self):
+        try:
+            with np.load(self.rollup_file) as data:
+                meta = [int(value) for value in data["meta"]]
+                if meta[0] != self.VERSION or meta[3] != time.timezone:
+                    return
+                for granularity, table in self.tables.items():
+                    table.origin = int(data[f"{granularity}_origin"])
+                    table.magnitude = int(data[f"{granularity}_magnitude"])
+                    table.cells = data[f"{granularity}_cells"]
+                self.rows, self.categories = meta[1], meta[2]
+                self.last_row = tuple(meta[4:7]) if self.rows else None
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable expense rollups: {e}")
+            self.reset()
@@ -0,0 +1,302 @@
+import json
+import asyncio
+import logging
+import threading
+from urllib.parse import urlsplit, parse_qs
+from ExpenseRollups import GRANULARITIES
+
+HOST = "127.0.0.1"
+PORT = 8765
+BATCH_MAX_RECORDS = 20_000
+FLUSH_INTERVAL_S = 1.0  # committed batches reach the disk at least this often
+MAX_BODY_BYTES = 64 * 1024 * 1024
+MAX_MONTHS = 1200
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 431: "Request Header Fields Too Large",
+           500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ExpenseServer:
+    """Loopback HTTP/JSON API in front of an ExpenseCore.
+
+    POST /expenses takes one expense object or a list of them. Posted
+    records are queued and a single writer task commits everything that
+    queued up while the previous commit was running as one ledger append,
+    so under load many small posts cost one vectorized write. The commit
+    runs on a worker thread, queries run on the loop's default executor so
+    a commit holding the core lock never stalls other connections, and the
+    ledger is flushed to disk every FLUSH_INTERVAL_S:
+
+        GET /totals?start=&end=     category totals (epoch seconds, whole days)
+        GET /top?n=5&start=&end=    largest categories
+        GET /series?granularity=month&start=&end=[&category=]
+        GET /months?months=12[&category=]
+
+    Connections are kept alive, and amounts are returned in minor units.
+    """
+
+    def __init__(self, core, host=HOST, port=PORT):
+        self.core = core
+        self.host = host
+        self.port = port
+        self.server = None
+        self.pending = None
+        self.writer_task = None
+        self.flush_task = None
+        self.dirty = False
+        self.loop = None
+        self.thread = None
+
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.pending = asyncio.Queue()
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.writer_task = asyncio.create_task(self.write_batches())
+        self.flush_task = asyncio.create_task(self.flush_periodically())
+        self.port = self.server.sockets[0].getsockname()[1]
+        logging.info(f"Expense API listening on http://{self.host}:{self.port}")
+
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.writer_task.cancel()
+        self.flush_task.cancel()
+        await asyncio.gather(self.writer_task, self.flush_task, return_exceptions=True)
+        self.core.flush()
+
+
+    def start_in_thread(self):
+        """Run the server on its own event loop thread; returns once it is listening.
+
+        Errors from binding the socket are raised here rather than on the thread.
+        """
+        ready = threading.Event()
+        failure = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self.start())
+            except Exception as e:
+                failure.append(e)
+                loop.close()
+                return
+            finally:
+                ready.set()
+            loop.run_forever()
+            loop.run_until_complete(self.stop())
+            loop.close()
+        self.thread = threading.Thread(target=run, name="expense-api", daemon=True)
+        self.thread.start()
+        ready.wait()
+        if failure:
+            self.thread.join()
+            self.thread = None
+            raise failure[0]
+        return self
+
+
+    def stop_thread(self):
+        if self.thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.thread = None
+
+
+    async def write_batches(self):
+        """Commit queued records in batches; each poster gets its own share of the result."""
+        while True:
+            batch = [await self.pending.get()]
+            size = len(batch[0][0])
+            #One pass of the event loop lets every connection with a request ready queue it
+            await asyncio.sleep(0)
+            while size < BATCH_MAX_RECORDS and not self.pending.empty():
+                item = self.pending.get_nowait()
+                batch.append(item)
+                size += len(item[0])
+            records = [record for item in batch for record in item[0]]
+            try:
+                _, rejected = await self.loop.run_in_executor(None, self.core.add_records, records, False)
+                self.dirty = True
+            except Exception as e:
+                logging.error(f"Batch commit failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            rejected = set(rejected)
+            offset = 0
+            for item_records, future in batch:
+                mine = [i - offset for i in range(offset, offset + len(item_records)) if i in rejected]
+                offset += len(item_records)
+                if not future.done():
+                    future.set_result(mine)
+
+
+    async def flush_periodically(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL_S)
+            if self.dirty:
+                self.dirty = False
+                await self.loop.run_in_executor(None, self.core.flush)
+
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    #The rest of an oversized head is still unread, so the connection cannot continue
+                    writer.write(response(431, {"error": "Request head too large"}, False))
+                    await writer.drain()
+                    break
+                keep_alive = True
+                try:
+                    method, target, headers = parse_head(head)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    length = content_length(headers)
+                    if length > MAX_BODY_BYTES:
+                        raise HttpError(413, "Body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = 200, await self.dispatch(method, target, body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as e:
+                    logging.error(f"Request failed: {e}")
+                    status, payload = 500, {"error": str(e)}
+                writer.write(response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path == "/expenses":
+            if method != "POST":
+                raise HttpError(405, "Use POST")
+            return await self.post_expenses(body)
+        if method != "GET":
+            raise HttpError(405, "Use GET")
+        start, end = int_param(query, "start"), int_param(query, "end")
+        if start is not None and end is not None and start >= end:
+            raise HttpError(400, "start must be before end")
+        if url.path == "/totals":
+            return {"totals": await self.query(self.core.totals, start, end)}
+        if url.path == "/top":
+            return {"top": await self.query(self.core.top_categories, int_param(query, "n", 5), start, end)}
+        if url.path == "/series":
+            if start is None or end is None:
+                raise HttpError(400, "start and end are required")
+            granularity = query.get("granularity", "month")
+            if granularity not in GRANULARITIES:
+                raise HttpError(400, f"granularity must be one of {', '.join(GRANULARITIES)}")
+            series = await self.query(self.core.series, granularity, start, end, query.get("category"))
+            return {"series": [[str(bucket), total] for bucket, total in series]}
+        if url.path == "/months":
+            months = int_param(query, "months", 12)
+            if not 1 <= months <= MAX_MONTHS:
+                raise HttpError(400, f"months must be between 1 and {MAX_MONTHS}")
+            rows = await self.query(self.core.month_over_month, months, query.get("category"))
+            return {"months": [[str(month), total, change] for month, total, change in rows]}
+        raise HttpError(404, f"No route for {url.path}")
+
+
+    async def query(self, func, *args):
+        """Run a core query on a worker thread; it may wait for the core lock."""
+        return await self.loop.run_in_executor(None, func, *args)
+
+
+    async def post_expenses(self, body):
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            raise HttpError(400, f"Invalid JSON: {e}")
+        records = data if isinstance(data, list) else [data]
+        if not all(isinstance(record, dict) for record in records):
+            raise HttpError(400, "Expected an expense object or a list of them")
+        if not records:
+            return {"accepted": 0, "rejected": []}
+        future = self.loop.create_future()
+        await self.pending.put((records, future))
+        rejected = await future
+        return {"accepted": len(records) - len(rejected), "rejected": rejected}
+
+
+def parse_head(head):
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    return method, target, headers
+
+
+def content_length(headers):
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length")
+    if length < 0:
+        raise HttpError(400, "Invalid Content-Length")
+    return length
+
+
+def int_param(query, name, default=None):
+    if name not in query:
+        return default
+    try:
+        return int(query[name])
+    except ValueError:
+        raise HttpError(400, f"{name} must be an integer")
+
+
+def response(status, payload, keep_alive):
+    body = json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+if __name__ == "__main__":
+    import sys
+    from ExpenseCore import ExpenseCore
+    logging.basicConfig(level=logging.INFO)
+    folder = sys.argv[1] if len(sys.argv) > 1 else "expense_ledger"
+    core = ExpenseCore(folder)
+    server = ExpenseServer(core)
+
+    async def main():
+        await server.start()
+        await asyncio.Event().wait()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        core.close()
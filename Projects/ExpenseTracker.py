@@ -1,14 +1,40 @@
+import logging
 import tkinter as tk
-from tkinter import messagebox
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from tkinter import messagebox, filedialog
+from concurrent.futures import ThreadPoolExecutor
+from Money import Money
+from ExpenseCore import ExpenseCore
+from ExpenseServer import ExpenseServer
+from ExpenseImporter import ExpenseImporter, ImportSchema
+from ExpenseChart import ExpenseChart
 
 
 class ExpenseTracker:
+    LEDGER_DIR = "expense_ledger"
+    CURRENCY = "USD"
+    IMPORT_SCHEMA = ImportSchema(amount="Amount", date="Date", category="Category", date_format="%m/%d/%Y", currency=CURRENCY)
+    IMPORT_POLL_MS = 100
+    CHART_MAX_BARS = 8
+    CHART_INTERVAL_MS = 250
+    SUMMARY_POLL_MS = 30
+    SERVER_PORT = 8765  # loopback ingestion API; None to disable
+
     def __init__(self, root):
         self.root = root
         self.root.title("Expense Tracker")
-        self.expenses = {}
+        self.core = ExpenseCore(self.LEDGER_DIR, self.CURRENCY)
+        self.server = None
+        if self.SERVER_PORT is not None:
+            try:
+                self.server = ExpenseServer(self.core, port=self.SERVER_PORT).start_in_thread()
+            except OSError as e:
+                messagebox.showwarning("Warning", f"Expense API not started: {e}")
+        self.importer = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart")
+        self.chart = None
+        self.summary_future = None
+        self.summary_stale = False
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
         # GUI Elements
         tk.Label(root, text="Amount:").grid(row=0, column=0)
@@ -19,37 +45,104 @@ class ExpenseTracker:
         self.category_entry.grid(row=1, column=1)
         tk.Button(root, text="Add Expense", command=self.add_expense).grid(row=2, column=0, columnspan=2)
         tk.Button(root, text="Show Chart", command=self.show_chart).grid(row=3, column=0, columnspan=2)
+        self.import_button = tk.Button(root, text="Import Statement", command=self.import_statement)
+        self.import_button.grid(row=4, column=0, columnspan=2)
+        self.import_label = tk.Label(root, text="")
+        self.import_label.grid(row=5, column=0, columnspan=2)
 
     def add_expense(self):
         amount = self.amount_entry.get()
         category = self.category_entry.get()
         if amount and category:
             try:
-                amount = float(amount)
-                if category in self.expenses:
-                    self.expenses[category] += amount
-                else:
-                    self.expenses[category] = amount
+                self.core.add(amount, category)
+                self.refresh_chart()
                 messagebox.showinfo("Success", "Expense added!")
                 self.amount_entry.delete(0, tk.END)
                 self.category_entry.delete(0, tk.END)
             except ValueError:
-                messagebox.showerror("Error", "Please enter a valid amount.")
+                messagebox.showerror("Error", "Please enter a valid amount and category.")
         else:
             messagebox.showerror("Error", "Please fill all fields.")
 
     def show_chart(self):
-        if self.expenses:
-            categories = list(self.expenses.keys())
-            amounts = list(self.expenses.values())
-            fig, ax = plt.subplots()
-            ax.bar(categories, amounts)
-            ax.set_title("Expenses by Category")
-            canvas = FigureCanvasTkAgg(fig, master=self.root)
-            canvas.draw()
-            canvas.get_tk_widget().grid(row=4, column=0, columnspan=2)
-        else:
+        if not len(self.core):
             messagebox.showinfo("Info", "No expenses to display.")
+            return
+        if self.chart is None:
+            self.chart = ExpenseChart(self.root, self.executor, self.CHART_MAX_BARS, self.CHART_INTERVAL_MS)
+            self.chart.grid(row=6, column=0, columnspan=2)
+            self.summary_label = tk.Label(self.root, text="")
+            self.summary_label.grid(row=7, column=0, columnspan=2)
+        self.refresh_chart()
+
+    def refresh_chart(self):
+        # Category totals and the month summary are read from the rollups on the chart executor,
+        # so the Tk thread never waits for the core lock while a batch is being committed
+        if self.chart is None:
+            return
+        core, currency = self.core, self.CURRENCY
+
+        def category_totals():
+            return {name: float(Money(total, currency)) for name, total in core.totals().items()}
+        self.chart.request(category_totals)
+
+        if self.summary_future is not None:
+            self.summary_stale = True
+            return
+        self.summary_future = self.executor.submit(core.month_over_month, 1)
+        self.poll_summary()
+
+    def poll_summary(self):
+        if not self.summary_future.done():
+            self.root.after(self.SUMMARY_POLL_MS, self.poll_summary)
+            return
+        future, self.summary_future = self.summary_future, None
+        try:
+            (month, total, change), = future.result()
+        except Exception as e:
+            logging.error(f"Month summary failed: {e}")
+        else:
+            self.summary_label.config(text=f"{month}: {self.core.format(total)} ({self.core.format(change)} vs previous month)")
+        if self.summary_stale:
+            self.summary_stale = False
+            self.refresh_chart()
+
+    def import_statement(self):
+        file_path = filedialog.askopenfilename(filetypes=[("Bank statements", "*.csv *.tsv *.txt"), ("All files", "*.*")])
+        if not file_path or self.importer is not None:
+            return
+        self.importer = ExpenseImporter(file_path, self.IMPORT_SCHEMA).start()
+        self.import_button.config(state=tk.DISABLED)
+        self.poll_import()
+
+    def poll_import(self):
+        # Batches are parsed on the importer thread; appending them here keeps the ledger on the Tk thread
+        progress, finished = self.core.poll_import(self.importer)
+        self.refresh_chart()
+        if progress is not None:
+            self.import_label.config(text=f"Importing... {progress:.0%} ({self.importer.imported:,} rows)")
+        if not finished:
+            self.root.after(self.IMPORT_POLL_MS, self.poll_import)
+            return
+        importer, self.importer = self.importer, None
+        self.import_button.config(state=tk.NORMAL)
+        self.import_label.config(text=f"Imported {importer.imported:,} rows, skipped {importer.rejected:,}")
+        if importer.error is not None:
+            messagebox.showerror("Error", f"Import failed: {importer.error}")
+        elif importer.errors:
+            messagebox.showwarning("Warning", "Some rows were skipped:\n" + "\n".join(importer.errors))
+
+    def on_closing(self):
+        if self.importer is not None:
+            self.importer.cancel()
+        if self.server is not None:
+            self.server.stop_thread()
+        self.core.close()
+        if self.chart is not None:
+            self.chart.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,164 @@
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav')
+
+
+class LibraryScanner:
+    """Recursive music folder scanner that remembers directory mtimes between runs.
+
+    For every directory the state keeps its mtime, its subdirectories and its
+    audio files with their size/mtime. On a rescan a directory whose mtime is
+    unchanged reuses the stored listing, so only its subdirectories are
+    stat'ed; changed directories are listed again with os.scandir and their
+    files compared. Directories are processed in parallel on a thread pool.
+
+    Adding or removing a file changes its directory's mtime, but editing a file
+    in place does not. A scan with verify=True lists every directory and
+    compares each file's size/mtime, so in-place edits such as retagging are
+    found too, at the cost of a scandir per directory.
+    """
+
+    VERSION = 1
+
+    def __init__(self, state_file, max_workers=8):
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.roots = []
+        self.dirs = {}
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # one writer of the temp file at a time
+        self.load()
+
+
+    def load(self):
+        """Load roots and directory state from disk."""
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self.roots = data["roots"]
+                self.dirs = data["dirs"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable library state: {e}")
+
+
+    def save(self):
+        """Atomically write roots and directory state to disk; concurrent saves run one at a time."""
+        with self.save_lock:
+            with self.lock:
+                data = json.dumps({"version": self.VERSION, "roots": self.roots, "dirs": self.dirs})
+            try:
+                with open(f"{self.state_file}.tmp", "w", encoding="utf-8") as f:
+                    f.write(data)
+                os.replace(f"{self.state_file}.tmp", self.state_file)
+            except OSError as e:
+                logging.error(f"Failed to save library state: {e}")
+
+
+    def add_root(self, root):
+        """Watch a music folder; returns False if it is already watched."""
+        root = os.path.abspath(root)
+        if root in self.roots:
+            return False
+        self.roots.append(root)
+        return True
+
+
+    def files(self):
+        """Return every known audio file under the watched roots."""
+        with self.lock:
+            return [os.path.join(path, name) for path, entry in self.dirs.items() for name in entry["files"]]
+
+
+    def scan_dir(self, path, verify=False):
+        """Refresh one directory; returns (subdirs, added, changed, removed).
+
+        With verify a directory is listed again even if its mtime is unchanged.
+        """
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return [], [], [], self.forget(path)
+        with self.lock:
+            entry = self.dirs.get(path)
+        if not verify and entry is not None and entry["mtime_ns"] == mtime_ns:
+            return [os.path.join(path, name) for name in entry["subdirs"]], [], [], []
+
+        subdirs, files = [], {}
+        try:
+            with os.scandir(path) as it:
+                for item in it:
+                    try:
+                        if item.is_dir(follow_symlinks=False):
+                            subdirs.append(item.name)
+                        elif item.name.lower().endswith(AUDIO_EXTENSIONS) and item.is_file():
+                            stat = item.stat()
+                            files[item.name] = [stat.st_size, stat.st_mtime_ns]
+                    except OSError:
+                        continue
+        except OSError as e:
+            logging.warning(f"Could not scan {path}: {e}")
+            return [], [], [], self.forget(path)
+
+        old_files = entry["files"] if entry else {}
+        added = [os.path.join(path, name) for name in files if name not in old_files]
+        changed = [os.path.join(path, name) for name, fingerprint in files.items()
+                   if name in old_files and old_files[name] != fingerprint]
+        removed = [os.path.join(path, name) for name in old_files if name not in files]
+        for name in set(entry["subdirs"] if entry else ()) - set(subdirs):
+            removed.extend(self.forget(os.path.join(path, name)))
+        with self.lock:
+            self.dirs[path] = {"mtime_ns": mtime_ns, "subdirs": subdirs, "files": files}
+        return [os.path.join(path, name) for name in subdirs], added, changed, removed
+
+
+    def forget(self, path):
+        """Drop a directory and everything below it; returns the files that were known there."""
+        removed = []
+        with self.lock:
+            prefix = path + os.sep
+            for dir_path in [p for p in self.dirs if p == path or p.startswith(prefix)]:
+                removed.extend(os.path.join(dir_path, name) for name in self.dirs.pop(dir_path)["files"])
+        return removed
+
+
+    def scan(self, on_batch, batch_size=500, verify=False):
+        """Walk every root; calls on_batch(added, changed, removed) as batches fill up.
+
+        Runs on the calling thread (use a background thread for the UI) and
+        returns the total counts when the walk is finished. verify also
+        checks the files of directories whose mtime is unchanged.
+        """
+        added, changed, removed = [], [], []
+        totals = [0, 0, 0]
+
+        def flush(force=False):
+            if len(added) + len(changed) + len(removed) >= batch_size or (force and (added or changed or removed)):
+                on_batch(list(added), list(changed), list(removed))
+                totals[0] += len(added)
+                totals[1] += len(changed)
+                totals[2] += len(removed)
+                added.clear()
+                changed.clear()
+                removed.clear()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scan") as executor:
+            pending = {executor.submit(self.scan_dir, root, verify) for root in self.roots}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    subdirs, new, modified, gone = future.result()
+                    pending.update(executor.submit(self.scan_dir, subdir, verify) for subdir in subdirs)
+                    added.extend(new)
+                    changed.extend(modified)
+                    removed.extend(gone)
+                flush()
+        flush(force=True)
+        self.save()
+        return tuple(totals)
@@ -0,0 +1,240 @@
+import os
+import re
+import sys
+import mmap
+import json
+import time
+import calendar
+from concurrent.futures import ProcessPoolExecutor
+from Telemetry import percentile
+
+CHUNK_BYTES = 32 * 1024 * 1024
+TIMESTAMP_LENGTH = len("2025-06-17 11:39:12,558")
+
+#Each pattern starts with a literal, so the regex engine jumps between
+#candidate lines with a fast substring search instead of trying every byte.
+#Timestamps are only needed for session boundaries and are read back from
+#their fixed position at the start of the line.
+LOAD_MARKER = b" - INFO - Loaded "
+LOAD_PATTERN = re.compile(re.escape(LOAD_MARKER) + rb"(.+) in ([\d.]+)s$", re.MULTILINE)
+SESSION_MARKERS = (b" - INFO - Pygame mixer initialized successfully", b" - ERROR - Audio init failed")
+FAILURE_MARKERS = {
+    "load": b" - ERROR - Load failed for ",
+    "queue": b" - WARNING - Failed to queue next track",
+    "seek": b" - ERROR - Seek failed",
+}
+LEVELS = (b"DEBUG", b"INFO", b"WARNING", b"ERROR", b"CRITICAL")
+
+_day_starts = {}
+
+
+def parse_timestamp(raw):
+    """Turn b"YYYY-MM-DD HH:MM:SS,mmm" into epoch seconds by slicing fixed positions.
+
+    The day part is converted once per distinct date and cached, so per line
+    only the time of day is computed. Times are read as UTC, which keeps
+    differences right regardless of the machine the log came from.
+    """
+    day = raw[:10]
+    start = _day_starts.get(day)
+    if start is None:
+        start = _day_starts[day] = calendar.timegm((int(day[:4]), int(day[5:7]), int(day[8:10]), 0, 0, 0))
+    return start + int(raw[11:13]) * 3600 + int(raw[14:16]) * 60 + int(raw[17:19]) + int(raw[20:23]) / 1000
+
+
+def line_timestamp(mm, line_start):
+    """Parse the timestamp of the line starting at an offset, or None if it has none."""
+    raw = mm[line_start:line_start + TIMESTAMP_LENGTH]
+    if len(raw) < TIMESTAMP_LENGTH or raw[4:5] != b"-" or raw[19:20] != b",":
+        return None
+    try:
+        return parse_timestamp(raw)
+    except ValueError:
+        return None
+
+
+def last_timestamp_before(mm, offset):
+    """Return the timestamp of the last line that ends before offset."""
+    end = offset - 1
+    while end > 0:
+        start = mm.rfind(b"\n", 0, end) + 1
+        timestamp = line_timestamp(mm, start)
+        if timestamp is not None:
+            return timestamp
+        end = start - 1
+    return None
+
+
+def find_all(data, marker):
+    """Yield every offset of marker in data."""
+    position = data.find(marker)
+    while position != -1:
+        yield position
+        position = data.find(marker, position + 1)
+
+
+def split_chunks(file_path, chunk_bytes=CHUNK_BYTES):
+    """Return (start, end) byte ranges of about chunk_bytes that end on line boundaries."""
+    size = os.path.getsize(file_path)
+    if not size:
+        return []
+    chunks = []
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            newline = mm.find(b"\n", min(start + chunk_bytes, size) - 1)
+            end = size if newline == -1 else newline + 1
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def analyze_chunk(file_path, start, end):
+    """Scan one byte range of a log; returns the raw events found in it.
+
+    Loads come back as {track: [seconds]} with undecoded track names, and
+    each session start carries the timestamp of the line before it (which
+    ends the previous session) and the number of loads that preceded it.
+    """
+    loads = {}
+    sessions = []
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        chunk = mm[start:end]
+        levels = {level.decode(): chunk.count(b" - " + level + b" - ") for level in LEVELS}
+        failures = {kind: chunk.count(marker) for kind, marker in FAILURE_MARKERS.items()}
+        for track, seconds in LOAD_PATTERN.findall(chunk):
+            times = loads.get(track)
+            if times is None:
+                times = loads[track] = []
+            times.append(float(seconds))
+        loads_before = counted_to = 0
+        for position in sorted(position for marker in SESSION_MARKERS for position in find_all(chunk, marker)):
+            line_start = chunk.rfind(b"\n", 0, position) + 1
+            timestamp = line_timestamp(chunk, line_start)
+            if timestamp is not None:
+                loads_before += chunk.count(LOAD_MARKER, counted_to, line_start)
+                counted_to = line_start
+                sessions.append((timestamp, last_timestamp_before(mm, start + line_start), loads_before))
+        last_time = last_timestamp_before(mm, end)
+    return {"loads": loads, "load_count": sum(map(len, loads.values())), "sessions": sessions,
+            "failures": failures, "levels": levels, "last_time": last_time}
+
+
+def distribution(values):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "min": values[0],
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": values[-1],
+        "mean": round(sum(values) / len(values), 4),
+    }
+
+
+def merge_file(file_path, results):
+    """Combine the chunk results of one log file, in file order, into its report."""
+    per_track = {}
+    failures = dict.fromkeys(FAILURE_MARKERS, 0)
+    levels = dict.fromkeys((level.decode() for level in LEVELS), 0)
+    sessions = []
+    for result in results:
+        for kind, count in result["failures"].items():
+            failures[kind] += count
+        for level, count in result["levels"].items():
+            levels[level] += count
+        for track, times in result["loads"].items():
+            per_track.setdefault(track, []).extend(times)
+        #Loads in this chunk are split between the sessions that started around them
+        loads_seen = 0
+        for start_time, previous_time, loads_before in result["sessions"]:
+            if sessions:
+                sessions[-1]["tracks_loaded"] += loads_before - loads_seen
+                sessions[-1]["end"] = previous_time
+            loads_seen = loads_before
+            sessions.append({"start": start_time, "end": None, "tracks_loaded": 0})
+        if sessions:
+            sessions[-1]["tracks_loaded"] += result["load_count"] - loads_seen
+    if sessions:
+        sessions[-1]["end"] = results[-1]["last_time"]
+    for session in sessions:
+        session["duration"] = round(session["end"] - session["start"], 3) if session["end"] is not None else None
+
+    return {
+        "file": file_path,
+        "levels": levels,
+        "failures": failures,
+        "per_track": {track.decode("utf-8", "replace"): times for track, times in per_track.items()},
+        "sessions": sessions,
+    }
+
+
+def analyze_logs(file_paths, workers=None, chunk_bytes=CHUNK_BYTES):
+    """Analyze log files in parallel chunks and return one combined report."""
+    jobs = [(path, start, end) for path in file_paths for start, end in split_chunks(path, chunk_bytes)]
+    if len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(analyze_chunk, *zip(*jobs)))
+    else:
+        results = [analyze_chunk(*job) for job in jobs]
+
+    files = []
+    for path in file_paths:
+        files.append(merge_file(path, [result for job, result in zip(jobs, results) if job[0] == path]))
+
+    all_loads = {}
+    failures = dict.fromkeys(FAILURE_MARKERS, 0)
+    for report in files:
+        for track, times in report.pop("per_track").items():
+            all_loads.setdefault(track, []).extend(times)
+        for kind, count in report["failures"].items():
+            failures[kind] += count
+    load_times = [seconds for times in all_loads.values() for seconds in times]
+    return {
+        "load_time": distribution(load_times) if load_times else None,
+        "tracks": {track: distribution(times) for track, times in sorted(all_loads.items())},
+        "failures": failures,
+        "files": files,
+    }
+
+
+def print_report(report, top=10):
+    if report["load_time"]:
+        summary = report["load_time"]
+        print(f"Track loads: {summary['count']}  p50 {summary['p50']:.2f}s  p90 {summary['p90']:.2f}s  "
+              f"p99 {summary['p99']:.2f}s  max {summary['max']:.2f}s")
+    failures = report["failures"]
+    print(f"Failures: {failures['load']} loads, {failures['queue']} queues, {failures['seek']} seeks")
+
+    slowest = sorted(report["tracks"].items(), key=lambda item: item[1]["p90"], reverse=True)[:top]
+    if slowest:
+        print("\nSlowest tracks (p90):")
+        for track, summary in slowest:
+            print(f"  {summary['p90']:6.2f}s  x{summary['count']:<5} {track}")
+
+    for file_report in report["files"]:
+        print(f"\n{file_report['file']}: {len(file_report['sessions'])} sessions, levels {file_report['levels']}")
+        for session in file_report["sessions"]:
+            duration = session["duration"]
+            print(f"  {format_time(session['start'])}  "
+                  f"{'?' if duration is None else f'{duration / 60:.1f}min':>9}  {session['tracks_loaded']} tracks")
+
+
+def format_time(timestamp):
+    return "%04d-%02d-%02d %02d:%02d:%02d" % time.gmtime(timestamp)[:6]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} [--json report.json] music_player.log [more.log ...]")
+        sys.exit(1)
+    args = sys.argv[1:]
+    json_file = None
+    if args[0] == "--json":
+        json_file, args = args[1], args[2:]
+    report = analyze_logs(args)
+    if json_file:
+        with open(json_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print_report(report)
@@ -0,0 +1,274 @@
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN
+import numpy as np
+
+#Digits after the decimal point (ISO 4217 minor unit) per currency
+CURRENCY_EXPONENTS = {
+    "USD": 2, "EUR": 2, "GBP": 2, "BDT": 2, "INR": 2, "CAD": 2, "AUD": 2, "CNY": 2,
+    "JPY": 0, "KRW": 0, "BHD": 3, "KWD": 3, "OMR": 3,
+}
+DEFAULT_CURRENCY = "USD"
+INT64_MAX = np.iinfo(np.int64).max
+FLOAT_EXACT_LIMIT = 2 ** 53  # float64 holds every integer up to here
+POWERS_OF_TEN = np.array([10 ** i for i in range(19)], dtype=np.int64)
+DECIMAL_SCALES = {exponent: Decimal(10) ** exponent for exponent in set(CURRENCY_EXPONENTS.values())}
+#Commas are only read as thousands separators in groups of exactly three digits, e.g. 1,234,567.89
+GROUPED_AMOUNT = re.compile(r"[+-]?\d{1,3}(,\d{3})+(\.\d*)?")
+
+
+def exponent_of(currency):
+    try:
+        return CURRENCY_EXPONENTS[currency]
+    except KeyError:
+        raise ValueError(f"Unknown currency: {currency}") from None
+
+
+class Money:
+    """An exact amount of one currency, held as an integer count of minor units.
+
+    Parsing and formatting go through Decimal, so any string Decimal accepts
+    is accepted here, plus thousands separators in well-formed groups, and
+    str() gives the same text as a quantized Decimal. Parsed amounts must fit
+    in int64 minor units so they can be stored in the ledger. Arithmetic
+    stays on Python ints; multiplying by a non-integer rounds to the
+    currency's minor unit with the given rounding mode.
+    """
+
+    __slots__ = ("minor", "currency")
+
+    def __init__(self, minor, currency=DEFAULT_CURRENCY):
+        if type(minor) is not int:
+            if not isinstance(minor, (int, np.integer)):
+                raise TypeError("Money needs an integer number of minor units; use Money.parse for text")
+            minor = int(minor)
+        if currency not in CURRENCY_EXPONENTS:
+            raise ValueError(f"Unknown currency: {currency}")
+        self.minor = minor
+        self.currency = currency
+
+
+    @classmethod
+    def parse(cls, text, currency=DEFAULT_CURRENCY, rounding=ROUND_HALF_EVEN):
+        """Parse a decimal string (or Decimal/int) into Money, rounding to the minor unit."""
+        if isinstance(text, str) and "," in text:
+            if not GROUPED_AMOUNT.fullmatch(text.strip()):
+                raise ValueError(f"Invalid amount: {text!r}")
+            text = text.replace(",", "")
+        try:
+            value = Decimal(text.strip() if isinstance(text, str) else text)
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount: {text!r}") from None
+        return cls.from_decimal(value, currency, rounding)
+
+
+    @classmethod
+    def from_decimal(cls, value, currency=DEFAULT_CURRENCY, rounding=ROUND_HALF_EVEN):
+        if not value.is_finite():
+            raise ValueError(f"Invalid amount: {value}")
+        #Checked on the exponent first so huge values never reach the multiplication
+        if value and value.adjusted() > 18:
+            raise ValueError(f"Amount out of range: {value}")
+        minor = int((value * DECIMAL_SCALES[exponent_of(currency)]).to_integral_value(rounding))
+        if abs(minor) > INT64_MAX:
+            raise ValueError(f"Amount out of range: {value}")
+        return cls(minor, currency)
+
+
+    def to_decimal(self):
+        return Decimal(self.minor).scaleb(-exponent_of(self.currency))
+
+
+    def __float__(self):
+        return self.minor / 10 ** exponent_of(self.currency)
+
+
+    def __str__(self):
+        return str(self.to_decimal())
+
+
+    def __repr__(self):
+        return f"Money('{self}', '{self.currency}')"
+
+
+    def __format__(self, spec):
+        return format(self.to_decimal(), spec) if spec else str(self)
+
+
+    def check_currency(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        if other.currency != self.currency:
+            raise ValueError(f"Currency mismatch: {self.currency} and {other.currency}")
+        return other
+
+
+    def __add__(self, other):
+        if self.check_currency(other) is NotImplemented:
+            return NotImplemented
+        return Money(self.minor + other.minor, self.currency)
+
+
+    def __sub__(self, other):
+        if self.check_currency(other) is NotImplemented:
+            return NotImplemented
+        return Money(self.minor - other.minor, self.currency)
+
+
+    def __neg__(self):
+        return Money(-self.minor, self.currency)
+
+
+    def __abs__(self):
+        return Money(abs(self.minor), self.currency)
+
+
+    def __bool__(self):
+        return self.minor != 0
+
+
+    def multiply(self, factor, rounding=ROUND_HALF_EVEN):
+        """Multiply by an int or a decimal factor, rounding to the minor unit."""
+        if isinstance(factor, int):
+            return Money(self.minor * factor, self.currency)
+        minor = (Decimal(self.minor) * Decimal(str(factor))).quantize(Decimal(1), rounding=rounding)
+        return Money(int(minor), self.currency)
+
+
+    def __mul__(self, factor):
+        if not isinstance(factor, (int, Decimal, float, str)):
+            return NotImplemented
+        return self.multiply(factor)
+
+    __rmul__ = __mul__
+
+
+    def allocate(self, ratios):
+        """Split into parts proportional to ratios whose minor units add up exactly."""
+        total = sum(ratios)
+        parts = [self.minor * ratio // total for ratio in ratios]
+        for i in range(self.minor - sum(parts)):
+            parts[i % len(parts)] += 1
+        return [Money(part, self.currency) for part in parts]
+
+
+    def __eq__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.minor == other.minor and self.currency == other.currency
+
+
+    def __lt__(self, other):
+        if self.check_currency(other) is NotImplemented:
+            return NotImplemented
+        return self.minor < other.minor
+
+
+    def __le__(self, other):
+        if self.check_currency(other) is NotImplemented:
+            return NotImplemented
+        return self.minor <= other.minor
+
+
+    def __hash__(self):
+        return hash((self.minor, self.currency))
+
+
+def parse_amounts(texts, currency=DEFAULT_CURRENCY):
+    """Parse an array of plain decimal strings into int64 minor units, vectorized.
+
+    Returns (minor, valid). The strings are laid out as a byte matrix and
+    read column by column with Horner's rule, so each step is one NumPy
+    operation over all rows. Rows of the form [-]digits[.digits] take this
+    path; anything else (blanks, exponents, thousands separators, more
+    decimals than the currency has) goes through Money.parse one by one, and
+    rows that still fail are marked invalid with a 0 amount.
+    """
+    exponent = exponent_of(currency)
+    count = len(texts)
+    minor = np.zeros(count, dtype=np.int64)
+    valid = np.zeros(count, dtype=bool)
+    if not count:
+        return minor, valid
+    try:
+        raw = np.asarray(texts, dtype="S")
+    except UnicodeEncodeError:
+        raw = np.array([str(text).encode("ascii", "replace") for text in texts], dtype="S")
+    width = raw.dtype.itemsize
+    columns = np.frombuffer(raw.tobytes(), dtype=np.uint8).reshape(count, width).T.copy()
+
+    values = np.zeros(count, dtype=np.int64)
+    digits = np.zeros(count, dtype=np.int64)
+    decimals = np.zeros(count, dtype=np.int64)
+    seen_point = np.zeros(count, dtype=bool)
+    bad = np.zeros(count, dtype=bool)
+    negative = columns[0] == ord("-")
+    for i, column in enumerate(columns):
+        digit_values = column - np.uint8(ord("0"))
+        is_digit = digit_values < 10
+        is_point = column == ord(".")
+        bad |= ~(is_digit | is_point | (column == 0) | (negative if i == 0 else False))
+        bad |= is_point & seen_point
+        seen_point |= is_point
+        values = np.where(is_digit, values * 10 + digit_values, values)
+        digits += is_digit
+        decimals += is_digit & seen_point
+    bad |= (digits == 0) | (decimals > exponent) | (digits - decimals > 15)
+
+    simple = ~bad
+    scaled = values * POWERS_OF_TEN[np.clip(exponent - decimals, 0, exponent)]
+    minor[simple] = np.where(negative, -scaled, scaled)[simple]
+    valid[simple] = True
+
+    for i in np.flatnonzero(bad):
+        try:
+            minor[i] = Money.parse(raw[i].decode("ascii", "replace"), currency).minor
+            valid[i] = True
+        except (ValueError, OverflowError):
+            pass
+    return minor, valid
+
+
+def sum_minor(amounts):
+    """Exact sum of an int64 array of minor units as a Python int.
+
+    A plain NumPy sum is used when the worst case cannot overflow int64;
+    otherwise the array is summed in blocks that cannot overflow.
+    """
+    amounts = np.asarray(amounts, dtype=np.int64)
+    if not len(amounts):
+        return 0
+    largest = int(max(abs(int(amounts.min())), abs(int(amounts.max()))))
+    if largest * len(amounts) <= INT64_MAX:
+        return int(amounts.sum())
+    block = max(1, INT64_MAX // max(largest, 1))
+    return sum(int(amounts[i:i + block].sum()) for i in range(0, len(amounts), block))
+
+
+def group_sums(groups, amounts, count):
+    """Exact per-group sums of int64 minor units for group ids 0..count-1.
+
+    np.bincount is the fastest grouping but accumulates in float64, so it is
+    only used when no partial sum can reach 2**53; otherwise the amounts are
+    sorted by group and summed with np.add.reduceat in int64. If even int64
+    could overflow, each group is summed with sum_minor and the result is an
+    object array of Python ints.
+    """
+    amounts = np.asarray(amounts, dtype=np.int64)
+    groups = np.asarray(groups)
+    if not len(amounts):
+        return np.zeros(count, dtype=np.int64)
+    largest = int(max(abs(int(amounts.min())), abs(int(amounts.max()))))
+    if largest * len(amounts) < FLOAT_EXACT_LIMIT:
+        return np.bincount(groups, weights=amounts, minlength=count).astype(np.int64)
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    if largest * len(amounts) <= INT64_MAX:
+        totals = np.zeros(count, dtype=np.int64)
+        totals[sorted_groups[starts]] = np.add.reduceat(amounts[order], starts)
+        return totals
+    totals = np.zeros(count, dtype=object)
+    sorted_amounts = amounts[order]
+    for start, stop in zip(starts, np.r_[starts[1:], len(amounts)]):
+        totals[sorted_groups[start]] = sum_minor(sorted_amounts[start:stop])
+    return totals
@@ -0,0 +1,77 @@
+import random
+import timeit
+from decimal import Decimal
+import numpy as np
+from Money import Money, parse_amounts, sum_minor, group_sums
+
+#Summing expense amounts as float, Decimal and int64 minor units
+SIZES = [10_000, 100_000, 1_000_000]
+CATEGORIES = 20
+
+
+def make_amounts(count, seed=7):
+    rng = random.Random(seed)
+    return [f"{rng.randint(1, 500_000) // 100}.{rng.randint(0, 99):02d}" for _ in range(count)]
+
+
+def float_loop(values):
+    total = 0.0
+    for value in values:
+        total += value
+    return total
+
+
+def decimal_loop(values):
+    total = Decimal(0)
+    for value in values:
+        total += value
+    return total
+
+
+def decimal_by_category(values, categories):
+    totals = {}
+    for value, category in zip(values, categories):
+        totals[category] = totals.get(category, Decimal(0)) + value
+    return totals
+
+
+def report(name, count, seconds, baseline=None):
+    speedup = f"{baseline / seconds:8.1f}x" if baseline else ""
+    print(f"{name:<30} n={count:<9} {seconds * 1000:10.3f} ms   {seconds / count * 1e9:8.1f} ns/item {speedup}")
+
+
+def best_of(func, repeat=3):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+if __name__ == "__main__":
+    for count in SIZES:
+        texts = make_amounts(count)
+        floats = [float(text) for text in texts]
+        decimals = [Decimal(text) for text in texts]
+        minor = np.array([Money.parse(text).minor for text in texts], dtype=np.int64)
+        float_array = np.array(floats)
+        categories = np.random.default_rng(7).integers(0, CATEGORIES, count)
+        category_list = categories.tolist()
+
+        exact = decimal_loop(decimals)
+        print(f"Exact total {exact}; float loop {float_loop(floats)!r}; "
+              f"float drift {Decimal(float_loop(floats)) - exact:.3e}; fixed-point {Money(sum_minor(minor))}")
+        assert Money(sum_minor(minor)).to_decimal() == exact
+
+        decimal_time = best_of(lambda: decimal_loop(decimals))
+        report("Decimal loop sum", count, decimal_time)
+        report("float loop sum", count, best_of(lambda: float_loop(floats)), decimal_time)
+        report("float NumPy sum", count, best_of(lambda: float_array.sum()), decimal_time)
+        report("fixed-point sum_minor", count, best_of(lambda: sum_minor(minor)), decimal_time)
+
+        decimal_group_time = best_of(lambda: decimal_by_category(decimals, category_list))
+        report("Decimal by category", count, decimal_group_time)
+        report("fixed-point group_sums", count, best_of(lambda: group_sums(categories, minor, CATEGORIES)),
+               decimal_group_time)
+
+        parse_time = best_of(lambda: [Decimal(text) for text in texts])
+        report("Decimal parse", count, parse_time)
+        report("Money.parse", count, best_of(lambda: [Money.parse(text) for text in texts]), parse_time)
+        report("parse_amounts", count, best_of(lambda: parse_amounts(texts)), parse_time)
+        print()
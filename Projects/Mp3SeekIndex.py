@@ -0,0 +1,234 @@
+import os
+import mmap
+import bisect
+import struct
+from TrackMetadata import FingerprintCache
+
+#Layer III bitrates (kbps) by bitrate index, for MPEG-1 and for MPEG-2/2.5
+BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 25: [11025, 12000, 8000]}
+XING_FRAMES, XING_BYTES, XING_TOC = 1, 2, 4
+
+
+def parse_frame_header(data, pos):
+    """Decode the 4-byte Layer III frame header at pos; returns a dict or None."""
+    if pos + 4 > len(data):
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    if data[pos] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version_bits = (b1 >> 3) & 3
+    layer_bits = (b1 >> 1) & 3
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 3
+    if version_bits == 1 or layer_bits != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    version = {3: 1, 2: 2, 0: 25}[version_bits]
+    table = 1 if version == 1 else 2
+    bitrate = BITRATES[table][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 1
+    samples = 1152 if version == 1 else 576
+    return {
+        "version": version,
+        "mono": (b3 >> 6) == 3,
+        "sample_rate": sample_rate,
+        "samples": samples,
+        "length": samples // 8 * bitrate // sample_rate + padding,
+    }
+
+
+def skip_id3v2(data):
+    """Return the offset of the first byte after a leading ID3v2 tag."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def find_frame(data, pos):
+    """Return the offset of the next header at or after pos that is followed by another frame."""
+    end = len(data) - 4
+    while pos < end:
+        pos = data.find(b"\xff", pos)
+        if pos < 0 or pos >= end:
+            return -1
+        header = parse_frame_header(data, pos)
+        if header:
+            following = pos + header["length"]
+            if following >= end or parse_frame_header(data, following):
+                return pos
+        pos += 1
+    return -1
+
+
+class SeekIndex:
+    """Sorted (seconds, byte offset) points for one MP3 file, aligned to frame starts."""
+
+    def __init__(self, duration, points):
+        self.duration = duration
+        self.points = points
+        self.times = [point[0] for point in points]
+
+
+    def to_dict(self):
+        return {"duration": self.duration, "points": self.points}
+
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["duration"], [tuple(point) for point in data["points"]])
+
+
+    def locate(self, seconds):
+        """Return (frame_start_seconds, byte_offset) of the last point at or before seconds."""
+        i = bisect.bisect_right(self.times, seconds) - 1
+        return self.points[max(i, 0)]
+
+
+def read_toc(data, first, header):
+    """Parse a Xing/Info or VBRI header in the first frame; returns (frames, points) or None."""
+    if header["version"] == 1:
+        side_info = 17 if header["mono"] else 32
+    else:
+        side_info = 9 if header["mono"] else 17
+    xing = first + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags, = struct.unpack(">I", data[xing + 4:xing + 8])
+        pos = xing + 8
+        frames = total_bytes = None
+        if flags & XING_FRAMES:
+            frames, = struct.unpack(">I", data[pos:pos + 4])
+            pos += 4
+        if flags & XING_BYTES:
+            total_bytes, = struct.unpack(">I", data[pos:pos + 4])
+            pos += 4
+        if not frames:
+            return None
+        if not flags & XING_TOC:
+            return frames, None
+        total_bytes = total_bytes or len(data) - first
+        toc = data[pos:pos + 100]
+        return frames, [(percent / 100, first + toc[percent] * total_bytes // 256) for percent in range(100)]
+
+    vbri = first + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI":
+        total_bytes, frames, entries, scale, entry_size, frames_per_entry = struct.unpack(
+            ">IIHHHH", data[vbri + 10:vbri + 26])
+        pos, offset, points = vbri + 26, first, [(0.0, first)]
+        for entry in range(entries):
+            offset += int.from_bytes(data[pos:pos + entry_size], "big") * scale
+            pos += entry_size
+            points.append(((entry + 1) * frames_per_entry / frames, offset))
+        return frames, points
+    return None
+
+
+def build_seek_index(file_path, point_interval=0.25):
+    """Build a SeekIndex from the Xing/VBRI table of contents, or by scanning every frame."""
+    with open(file_path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        first = find_frame(data, skip_id3v2(data))
+        if first < 0:
+            return None
+        header = parse_frame_header(data, first)
+        frame_seconds = header["samples"] / header["sample_rate"]
+
+        toc = read_toc(data, first, header)
+        if toc and toc[1]:
+            frames, fractions = toc
+            duration = frames * frame_seconds
+            points = []
+            #TOC offsets are approximate; move each to the next real frame start
+            for fraction, offset in fractions:
+                offset = find_frame(data, offset)
+                if offset >= 0 and (not points or offset > points[-1][1]):
+                    points.append((round(fraction * duration, 4), offset))
+            return SeekIndex(duration, points)
+
+        #No usable table of contents: walk the frames once
+        pos = first + header["length"] if toc else first
+        frame, points, next_point = 0, [], 0.0
+        end = len(data)
+        while pos < end:
+            header = parse_frame_header(data, pos)
+            if header is None:
+                pos = find_frame(data, pos + 1)
+                if pos < 0:
+                    break
+                continue
+            seconds = frame * frame_seconds
+            if seconds >= next_point:
+                points.append((round(seconds, 4), pos))
+                next_point = seconds + point_interval
+            frame += 1
+            pos += header["length"]
+        return SeekIndex(frame * frame_seconds, points)
+    finally:
+        data.close()
+
+
+class SeekIndexer:
+    """Build and cache seek indexes per file, keyed by path, size and mtime.
+
+    New indexes are kept in memory; call save() to write the cache file,
+    which the player does once at shutdown rather than once per track.
+    """
+
+    def __init__(self, cache_file):
+        self.cache = FingerprintCache(cache_file)
+
+
+    def load(self, file_path):
+        """Return the SeekIndex for an MP3 file, building it on a cache miss."""
+        fingerprint = self.cache.fingerprint(file_path)
+        if fingerprint is None or not file_path.lower().endswith('.mp3'):
+            return None
+        data = self.cache.get(file_path, fingerprint)
+        if data is not None:
+            return SeekIndex.from_dict(data)
+        index = build_seek_index(file_path)
+        if index is None:
+            return None
+        self.cache.put(file_path, fingerprint, index.to_dict())
+        return index
+
+
+    def save(self):
+        self.cache.save()
+
+
+class OffsetFile:
+    """Read-only file object that starts at a byte offset, so a decoder sees a shorter stream."""
+
+    def __init__(self, file_path, offset):
+        self.file = open(file_path, "rb")
+        self.base = offset
+        self.size = os.path.getsize(file_path) - offset
+        self.file.seek(offset)
+
+
+    def read(self, size=-1):
+        return self.file.read(size)
+
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            offset += self.base
+        elif whence == os.SEEK_END:
+            offset += self.base + self.size
+            whence = os.SEEK_SET
+        return self.file.seek(offset, whence) - self.base
+
+
+    def tell(self):
+        return self.file.tell() - self.base
+
+
+    def close(self):
+        self.file.close()
@@ -3,21 +3,58 @@ from tkinter import filedialog, ttk, messagebox
 import pygame
 import os
 import time
-from mutagen.mp3 import MP3
-from mutagen.wave import WAVE
-import random
 import logging
+import queue
+from itertools import islice
+from TrackMetadata import MetadataProber
+from PlaybackClock import PlaybackClock
+from Playlist import Playlist
+from PlaylistView import PlaylistView
+from PlaylistFile import PlaylistWriter, read_playlist
+from Mp3SeekIndex import SeekIndexer, OffsetFile
+from DecodeCache import DecodeCache
+from TrackAnalysis import TrackAnalyzer, decode_waveform
+from WaveformView import WaveformView
+from TagSearch import TagIndex
+from LibraryScanner import LibraryScanner
+from AlbumArt import AlbumArtCache
+from Telemetry import Telemetry, setup_logging
 
 
 class MusicPlayer:
     #Constants for GUI styling and audio settings
-    WINDOW_SIZE = "600x500"
+    WINDOW_SIZE = "680x600"
     BUTTON_STYLE = {"font": ("Helvetica", 12), "width": 5}
     UPDATE_INTERVAL_MS = 1000  
     AUDIO_BUFFER = 4096  
     MAX_FILE_SIZE_MB = 50 
     MAX_BITRATE_KBPS = 192  
-    PLAYLIST_FILE = "playlist.txt"
+    PLAYLIST_FILE = "playlist.m3u8"
+    PLAYLIST_LOAD_BATCH = 200
+    LEGACY_PLAYLIST_FILE = "playlist.txt"
+    METADATA_CACHE_FILE = "metadata_cache.json"
+    SEEK_INDEX_CACHE_FILE = "seek_index_cache.json"
+    SEEK_SETTLE_MS = 150
+    DECODE_CACHE_ENABLED = True
+    DECODE_CACHE_DIR = "decode_cache"
+    DECODE_CACHE_MAX_MB = 2048
+    PREFETCH_TRACKS = 3
+    REPEAT_PLAYLIST = True  # start over after the last track instead of stopping
+    ANALYSIS_CACHE_FILE = "analysis_cache.json"
+    NORMALIZE_LOUDNESS = True
+    SEARCH_INDEX_FILE = "search_index.pkl"
+    SEARCH_DELAY_MS = 150
+    MIN_SEARCH_LENGTH = 2
+    LIBRARY_STATE_FILE = "library_state.json"
+    DEFAULT_ART_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "university_art.png")
+    ART_CACHE_DIR = "art_cache"
+    ART_SIZE = (93, 93)
+    LOG_FILE = "music_player.log"
+    LOG_MAX_MB = 5
+    LOG_BACKUPS = 3
+    TELEMETRY_JSON_FILE = "telemetry.json"
+    TELEMETRY_PROM_FILE = "telemetry.prom"
+    BACKGROUND_POLL_MS = 50
 
 
     def __init__(self, root):
@@ -27,9 +64,10 @@ class MusicPlayer:
         self.root.resizable(False, False)
 
 
-        #Setup logging for debugging
-        logging.basicConfig(filename="music_player.log", level=logging.DEBUG,
-                           format="%(asctime)s - %(levelname)s - %(message)s")
+        #Setup logging for debugging; records are written and rotated by a background thread
+        self.log_listener = setup_logging(self.LOG_FILE, logging.DEBUG,
+                                          self.LOG_MAX_MB * 1024 * 1024, self.LOG_BACKUPS)
+        self.telemetry = Telemetry()
 
         #Initialize pygame mixer with optimized settings
         try:
@@ -44,48 +82,88 @@ class MusicPlayer:
 
 
         #State variables
-        self.tracks = []
+        self.tracks = Playlist()
         self.current_track_index = -1
         self.is_playing = False
         self.is_paused = False
         self.track_length = 0
         self.current_position = 0
-        self.playback_start_time = 0
+        self.updating_progress = False
+        self.pending_seek = None
+        self.seek_job = None
+        self.seek_index = None
+        self.stream_source = None
+        self.pcm_file = None
+        self.volume_level = 0.5
+        self.track_gain = 1.0
+        self.repeat = self.REPEAT_PLAYLIST
+
+
+        #Background metadata probing with a persistent cache
+        self.metadata = MetadataProber(self.METADATA_CACHE_FILE, telemetry=self.telemetry)
+        self.playlist_writer = PlaylistWriter(self.PLAYLIST_FILE)
+        self.playlist_entries = None
+        self.seek_indexer = SeekIndexer(self.SEEK_INDEX_CACHE_FILE)
+        self.decode_cache = None
+        if self.DECODE_CACHE_ENABLED:
+            self.decode_cache = DecodeCache(self.DECODE_CACHE_DIR, self.DECODE_CACHE_MAX_MB * 1024 * 1024)
+        self.analyzer = TrackAnalyzer(self.ANALYSIS_CACHE_FILE)
+        self.search_index = TagIndex.load(self.SEARCH_INDEX_FILE)
+        self.search_job = None
+        self.scanner = LibraryScanner(self.LIBRARY_STATE_FILE)
+        self.scan_batches = queue.Queue()
+        self.scan_future = None
+        self.album_art_cache = AlbumArtCache(self.ART_CACHE_DIR, self.ART_SIZE, self.metadata.executor)
 
 
         #Setup GUI
         self.setup_gui()
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
-        self.update_progress()
+
+
+        #Playback clock reads the mixer position and only ticks while playing
+        self.clock = PlaybackClock(self.root, self.update_progress, self.next_track, self.UPDATE_INTERVAL_MS)
+
+
+        #Show the known library right away, then pick up changes in watched music folders,
+        #including files edited in place while the player was closed
+        if self.scanner.roots:
+            self.import_tracks(sorted(self.scanner.files()))
+            self.rescan_library(verify=True)
 
 
     def setup_gui(self):
         """Set up the GUI elements."""
         # Album art
         try:
-            self.album_art = tk.PhotoImage(file="/Users/sagor/Desktop/PythonForDataScience/101/Projects/university_art.png")
-            self.album_label = tk.Label(self.root, image=self.album_art)
+            self.default_art = tk.PhotoImage(file=self.DEFAULT_ART_FILE)
+            self.album_label = tk.Label(self.root, image=self.default_art)
             self.album_label.pack(pady=5)
         except tk.TclError as e:
             messagebox.showwarning("Warning", "Could not load university_art.png. Place it in the same directory.")
             logging.warning(f"Album art load failed: {e}")
+            self.default_art = None
             self.album_label = tk.Label(self.root, text="No album art", font=("Helvetica", 10))
             self.album_label.pack(pady=5)
 
 
+        #Search box filters the playlist as you type
+        self.search_frame = tk.Frame(self.root)
+        self.search_frame.pack(fill=tk.X, padx=10)
+        tk.Label(self.search_frame, text="Search:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", self.on_search_changed)
+        tk.Entry(self.search_frame, textvariable=self.search_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+
+
         #Playlist frame
         self.playlist_frame = tk.Frame(self.root)
         self.playlist_frame.pack(pady=10, padx=10, fill=tk.BOTH, expand=True)
-        self.playlist_scroll = tk.Scrollbar(self.playlist_frame)
-        self.playlist_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        self.playlist = tk.Listbox(
-            self.playlist_frame, bg="#f0f0f0", fg="black",
-            selectbackground="#3498db", selectforeground="white",
-            yscrollcommand=self.playlist_scroll.set
+        self.playlist = PlaylistView(
+            self.playlist_frame, self.tracks, self.on_track_select,
+            bg="#f0f0f0", fg="black",
+            selectbackground="#3498db", selectforeground="white"
         )
-        self.playlist.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.playlist_scroll.config(command=self.playlist.yview)
-        self.playlist.bind('<<ListboxSelect>>', self.on_track_select)
 
 
         #Track info
@@ -98,6 +176,7 @@ class MusicPlayer:
         self.progress_frame.pack(fill=tk.X, padx=20)
         self.time_label = tk.Label(self.progress_frame, text="00:00 / 00:00", font=("Helvetica", 9))
         self.time_label.pack()
+        self.waveform = WaveformView(self.progress_frame)
         self.progress = ttk.Scale(self.progress_frame, from_=0, to=100, orient=tk.HORIZONTAL, command=self.on_seek)
         self.progress.pack(fill=tk.X, pady=5)
 
@@ -115,6 +194,7 @@ class MusicPlayer:
 
         #Playlist management buttons
         tk.Button(self.root, text="Add Tracks", command=self.add_tracks).pack(side=tk.LEFT, padx=10, pady=5)
+        tk.Button(self.root, text="Add Folder", command=self.add_folder).pack(side=tk.LEFT, padx=10, pady=5)
         tk.Button(self.root, text="Clear Playlist", command=self.clear_playlist).pack(side=tk.LEFT, padx=10, pady=5)
         tk.Button(self.root, text="Save Playlist", command=self.save_playlist).pack(side=tk.LEFT, padx=10, pady=5)
         #tk.Button(self.root, text="Load Playlist", command=self.load_playlist).pack(side=tk.LEFT, padx=10, pady=5)
@@ -132,49 +212,197 @@ class MusicPlayer:
     def add_tracks(self):
         """Add audio files to the playlist."""
         files = filedialog.askopenfilenames(filetypes=[("Audio Files", "*.mp3 *.wav")])
+        self.import_tracks(files)
+
+
+    def add_folder(self):
+        """Watch a music folder and add everything found in it."""
+        folder = filedialog.askdirectory()
+        if folder and self.scanner.add_root(folder):
+            self.rescan_library()
+
+
+    def rescan_library(self, verify=False):
+        """Scan the watched folders in the background, handing changes over in batches.
+
+        verify also stats the files of unchanged directories, so in-place edits are found.
+        """
+        if self.scan_future is not None and not self.scan_future.done():
+            return
+        self.scan_future = self.metadata.executor.submit(self.scanner.scan, self.on_scan_batch, verify=verify)
+        self.poll_scan()
+
+
+    def on_scan_batch(self, added, changed, removed):
+        """Called on the scanner thread; hand the batch over to the Tk thread."""
+        self.scan_batches.put((added, changed, removed))
+
+
+    def poll_scan(self):
+        """Apply scanned batches on the Tk thread until the scan finishes."""
+        finished = self.scan_future.done()
+        while True:
+            try:
+                added, changed, removed = self.scan_batches.get_nowait()
+            except queue.Empty:
+                break
+            self.remove_tracks(removed)
+            self.refresh_tracks(sorted(file for file in changed if file in self.tracks))
+            self.import_tracks(sorted(added + [file for file in changed if file not in self.tracks]))
+        if not finished:
+            self.root.after(self.BACKGROUND_POLL_MS, self.poll_scan)
+            return
+        try:
+            added, changed, removed = self.scan_future.result()
+            logging.info(f"Library scan done: {added} added, {changed} changed, {removed} removed")
+        except Exception as e:
+            logging.error(f"Library scan failed: {e}")
+
+
+    def remove_tracks(self, files):
+        """Remove files that disappeared from disk from the playlist and the search index."""
+        files = [file for file in files if file in self.tracks]
+        if not files:
+            return
+        current = self.tracks[self.current_track_index] if self.current_track_index != -1 else None
         for file in files:
-            if file not in self.tracks and self.is_valid_audio_file(file):
+            self.tracks.remove(file)
+            self.search_index.remove(file)
+        if current is not None and current not in self.tracks:
+            self.stop()
+        elif current is not None:
+            self.current_track_index = self.tracks.index(current)
+            self.playlist.selected = self.current_track_index
+        self.apply_search()
+        self.playlist.refresh()
+        logging.info(f"Removed {len(files)} missing tracks")
+
+
+    def refresh_tracks(self, files):
+        """Re-probe playlist tracks that changed on disk, then re-analyze and re-index them."""
+        if files:
+            self.run_when_done(self.metadata.probe_many(files), self.on_tracks_refreshed)
+
+
+    def on_tracks_refreshed(self, results):
+        """Drop tracks that no longer probe as valid audio and refresh the rest."""
+        self.remove_tracks([file for file, info in results
+                            if file in self.tracks and (info.get("missing") or info["error"])])
+        files = [file for file, info in results if file in self.tracks]
+        self.analyzer.analyze(files)
+        future = self.search_index.index_files(files, self.metadata.executor)
+        self.run_when_done(future, lambda count: self.on_tracks_indexed())
+        logging.info(f"Refreshed {len(files)} changed tracks")
+
+
+    def import_tracks(self, files, known=None, then=None):
+        """Probe files in the background and append the valid ones to the playlist.
+
+        then, if given, is called on the Tk thread once they have been appended.
+        """
+        files = [file for file in dict.fromkeys(files) if file not in self.tracks]
+        if not files:
+            if then is not None:
+                then()
+            return
+        start_time = time.time()
+        future = self.metadata.probe_many(files, known)
+
+        def on_probed(results):
+            self.on_tracks_probed(results, start_time)
+            if then is not None:
+                then()
+        self.run_when_done(future, on_probed)
+
+
+    def on_tracks_probed(self, results, start_time):
+        """Append probed tracks on the Tk thread once metadata is available."""
+        added = []
+        for file, info in results:
+            if file not in self.tracks and (info.get("trusted") or self.is_valid_audio_file(file, info)):
                 self.tracks.append(file)
-                self.playlist.insert(tk.END, os.path.basename(file))
-        if files and self.current_track_index == -1:
-            self.current_track_index = 0
-            self.playlist.selection_set(0)
+                added.append(file)
+        self.playlist.refresh()
+        self.analyzer.analyze(added)
+        future = self.search_index.index_files(added, self.metadata.executor)
+        self.run_when_done(future, lambda count: self.on_tracks_indexed())
+        probe_time = time.time() - start_time
+        self.telemetry.record("import_batch", probe_time)
+        logging.info(f"Probed {len(results)} tracks in {probe_time:.2f}s")
+        if self.tracks and self.current_track_index == -1:
+            self.current_track_index = self.tracks.first_index()
+            self.playlist.select(self.current_track_index)
             self.load_and_play()
 
 
-    def is_valid_audio_file(self, file_path):
-        """Validate audio file before adding."""
+    def on_tracks_indexed(self):
+        """Refresh the search results and save the index off the Tk thread."""
+        self.apply_search()
+        self.metadata.executor.submit(self.search_index.save, self.SEARCH_INDEX_FILE)
+
+
+    def on_search_changed(self, *args):
+        """Filter the playlist once typing pauses."""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(self.SEARCH_DELAY_MS, self.apply_search)
+
+
+    def apply_search(self):
+        """Show only tracks matching the search box, or every track if it is (nearly) empty."""
+        self.search_job = None
+        query = self.search_var.get().strip()
+        if len(query) < self.MIN_SEARCH_LENGTH:
+            self.playlist.set_filter(None)
+            return
+        start_time = time.time()
+        paths = self.search_index.search(query) or set()
+        indices = sorted(self.tracks.index(path) for path in paths if path in self.tracks)
+        self.playlist.set_filter(indices)
+        logging.debug(f"Search '{query}' matched {len(indices)} tracks in {(time.time() - start_time) * 1000:.1f}ms")
+
+
+    def run_when_done(self, future, callback):
+        """Call callback with the future's result on the Tk thread once it completes."""
+        if not future.done():
+            self.root.after(self.BACKGROUND_POLL_MS, self.run_when_done, future, callback)
+            return
         try:
-            file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
-            if file_size_mb > self.MAX_FILE_SIZE_MB:
-                messagebox.showwarning("Warning", f"File {os.path.basename(file_path)} is too large ({file_size_mb:.1f}MB). May cause buffering.")
-                logging.warning(f"Large file detected: {file_path} ({file_size_mb:.1f}MB)")
-                return False
-            if file_path.lower().endswith('.mp3'):
-                audio = MP3(file_path)
-                bitrate = audio.info.bitrate // 1000
-                if bitrate > self.MAX_BITRATE_KBPS:
-                    messagebox.showwarning("Warning", f"File {os.path.basename(file_path)} has high bitrate ({bitrate}kbps). May cause playback issues.")
-                    logging.warning(f"High bitrate detected: {file_path} ({bitrate}kbps)")
-            elif file_path.lower().endswith('.wav'):
-                audio = WAVE(file_path)
-            else:
-                return False
-            if audio.info.length > 600:
-                messagebox.showwarning("Warning", f"File {os.path.basename(file_path)} is long ({audio.info.length/60:.1f}min). May cause buffering.")
-                logging.warning(f"Long track detected: {file_path} ({audio.info.length/60:.1f}min)")
-            return True
+            result = future.result()
         except Exception as e:
+            logging.error(f"Background task failed: {e}")
+            return
+        callback(result)
+
+
+    def is_valid_audio_file(self, file_path, info=None):
+        """Validate audio file before adding."""
+        if info is None:
+            info = self.metadata.probe(file_path)
+        if info.get("missing"):
+            logging.warning(f"Missing file skipped: {file_path}")
+            return False
+        if info["error"]:
             messagebox.showwarning("Warning", f"Invalid or corrupted file: {os.path.basename(file_path)}")
-            logging.error(f"Invalid file {file_path}: {e}")
+            logging.error(f"Invalid file {file_path}: {info['error']}")
+            return False
+        file_size_mb = info["size"] / (1024 * 1024)
+        if file_size_mb > self.MAX_FILE_SIZE_MB:
+            messagebox.showwarning("Warning", f"File {os.path.basename(file_path)} is too large ({file_size_mb:.1f}MB). May cause buffering.")
+            logging.warning(f"Large file detected: {file_path} ({file_size_mb:.1f}MB)")
             return False
+        if info["bitrate"] > self.MAX_BITRATE_KBPS:
+            messagebox.showwarning("Warning", f"File {os.path.basename(file_path)} has high bitrate ({info['bitrate']}kbps). May cause playback issues.")
+            logging.warning(f"High bitrate detected: {file_path} ({info['bitrate']}kbps)")
+        if info["length"] > 600:
+            messagebox.showwarning("Warning", f"File {os.path.basename(file_path)} is long ({info['length']/60:.1f}min). May cause buffering.")
+            logging.warning(f"Long track detected: {file_path} ({info['length']/60:.1f}min)")
+        return True
 
 
-    def on_track_select(self, event=None):
+    def on_track_select(self, index):
         """Handle track selection from playlist."""
-        if not self.playlist.curselection():
-            return
-        self.current_track_index = self.playlist.curselection()[0]
+        self.current_track_index = index
         self.load_and_play()
 
 
@@ -186,16 +414,30 @@ class MusicPlayer:
         try:
             track_path = self.tracks[self.current_track_index]
             start_time = time.time()
-            pygame.mixer.music.load(track_path)
-            audio = MP3(track_path) if track_path.lower().endswith('.mp3') else WAVE(track_path)
-            self.track_length = audio.info.length
+            self.pcm_file = self.decode_cache.lookup(track_path) if self.decode_cache else None
+            if self.pcm_file is None:
+                pygame.mixer.music.load(track_path)
+                self.close_stream_source()
+            self.seek_index = None
+            self.track_length = self.metadata.probe(track_path)["length"]
+            self.clock.length = self.track_length
+            if self.pcm_file is None and track_path.lower().endswith('.mp3'):
+                future = self.metadata.executor.submit(self.seek_indexer.load, track_path)
+                self.run_when_done(future, lambda index: self.on_seek_index(track_path, index))
+            self.apply_analysis(self.analyzer.get(track_path))
+            future = self.analyzer.analyze([track_path]).get(track_path)
+            if future is not None:
+                self.run_when_done(future, lambda result: self.on_track_analyzed(track_path, result))
+            self.show_album_art(track_path)
             self.track_label.config(text=os.path.basename(track_path))
             self.progress.config(to=self.track_length)
             self.time_label.config(text=f"00:00 / {self.format_time(self.track_length)}")
             self.play_pause()
             load_time = time.time() - start_time
+            self.telemetry.record("track_load", load_time)
             logging.info(f"Loaded {track_path} in {load_time:.2f}s")
             self.queue_next_track()
+            self.prefetch_upcoming()
         except (pygame.error, Exception) as e:
             messagebox.showerror("Error", f"Failed to load {os.path.basename(track_path)}: {e}")
             logging.error(f"Load failed for {track_path}: {e}")
@@ -203,12 +445,119 @@ class MusicPlayer:
             self.track_label.config(text="No track loaded")
 
 
+    def on_seek_index(self, track_path, index):
+        """Use a freshly built seek index if its track is still the current one."""
+        if index is None or self.current_track_index == -1 or self.tracks[self.current_track_index] != track_path:
+            return
+        self.seek_index = index
+        self.track_length = index.duration
+        self.clock.length = index.duration
+        self.progress.config(to=self.track_length)
+        self.time_label.config(text=f"{self.format_time(self.current_position)} / {self.format_time(self.track_length)}")
+
+
+    def show_album_art(self, track_path):
+        """Show a track's cover from memory, or load it in the background."""
+        found, image = self.album_art_cache.get(track_path)
+        if found:
+            self.set_album_image(image)
+            return
+        self.set_album_image(None)
+        self.preload_album_art(track_path)
+
+
+    def preload_album_art(self, track_path):
+        """Load a track's cover thumbnail in the background and keep it in memory."""
+        request = self.album_art_cache.request(track_path)
+        if request is not None:
+            key, future = request
+            self.run_when_done(future, lambda thumbnail: self.on_album_art(track_path, key, thumbnail))
+
+
+    def on_album_art(self, track_path, key, thumbnail):
+        """Store a loaded thumbnail and show it if its track is playing."""
+        image = self.album_art_cache.store(key, thumbnail)
+        if self.current_track_index != -1 and self.tracks[self.current_track_index] == track_path:
+            self.set_album_image(image)
+
+
+    def set_album_image(self, image):
+        """Show a cover image, falling back to the default art."""
+        image = image or self.default_art
+        if image is None:
+            self.album_label.config(image="", text="No album art")
+        else:
+            self.album_label.config(image=image)
+
+
+    def on_track_analyzed(self, track_path, result):
+        """Apply a finished analysis if its track is still the current one."""
+        if self.current_track_index != -1 and self.tracks[self.current_track_index] == track_path:
+            self.apply_analysis(result)
+
+
+    def apply_analysis(self, result):
+        """Use a track's loudness gain and waveform, or reset them if there is no analysis."""
+        if result and self.NORMALIZE_LOUDNESS:
+            self.track_gain = 10 ** (result["gain_db"] / 20)
+        else:
+            self.track_gain = 1.0
+        self.apply_volume()
+        self.waveform.show(decode_waveform(result) if result else [])
+
+
+    def start_stream(self, position):
+        """Start the mixer at position from cached PCM, or from the nearest indexed frame."""
+        if self.pcm_file is not None:
+            source = self.decode_cache.open(self.pcm_file, position)
+            pygame.mixer.music.load(source, "wav")
+            pygame.mixer.music.play()
+            self.close_stream_source()
+            self.stream_source = source
+            self.queue_next_track()
+            return
+        if self.seek_index is None or self.current_track_index == -1:
+            pygame.mixer.music.play(start=position)
+            return
+        frame_time, offset = self.seek_index.locate(position)
+        source = OffsetFile(self.tracks[self.current_track_index], offset)
+        pygame.mixer.music.load(source, "mp3")
+        pygame.mixer.music.play(start=position - frame_time)
+        self.close_stream_source()
+        self.stream_source = source
+        self.queue_next_track()
+
+
+    def close_stream_source(self):
+        """Close the file object behind the previous offset or PCM stream."""
+        if self.stream_source is not None:
+            self.stream_source.close()
+            self.stream_source = None
+
+
+    def prefetch_upcoming(self):
+        """Decode the next tracks in play order into the PCM cache and preload their covers."""
+        upcoming = []
+        index = self.current_track_index
+        for _ in range(self.PREFETCH_TRACKS):
+            index = self.tracks.next_index(index, wrap=self.repeat)
+            if index == -1 or index == self.current_track_index:
+                break
+            upcoming.append(self.tracks[index])
+        for track_path in upcoming:
+            self.preload_album_art(track_path)
+        if self.decode_cache is not None:
+            self.decode_cache.prefetch(upcoming)
+
+
     def queue_next_track(self):
         """Queue the next track to reduce buffering."""
-        if self.is_playing and self.current_track_index + 1 < len(self.tracks):
+        next_index = self.tracks.next_index(self.current_track_index, wrap=self.repeat)
+        if self.is_playing and next_index != -1:
             try:
-                pygame.mixer.music.queue(self.tracks[self.current_track_index + 1])
-                logging.info(f"Queued next track: {self.tracks[self.current_track_index + 1]}")
+                with self.telemetry.timer("queue"):
+                    pygame.mixer.music.queue(self.tracks[next_index])
+                logging.info(f"Queued next track: {self.tracks[next_index]}")
             except pygame.error as e:
                 logging.warning(f"Failed to queue next track: {e}")
 
@@ -221,9 +570,10 @@ class MusicPlayer:
             if self.is_paused:
                 pygame.mixer.music.unpause()
                 self.is_paused = False
+                self.clock.resume()
             else:
-                pygame.mixer.music.play(start=self.current_position)
-            self.playback_start_time = time.time() - self.current_position
+                self.start_stream(self.current_position)
+                self.clock.start(self.current_position)
             self.is_playing = True
             self.play_pause_button.config(text="⏸")
             logging.info(f"Playing at position: {self.current_position}")
@@ -231,7 +581,8 @@ class MusicPlayer:
             pygame.mixer.music.pause()
             self.is_playing = False
             self.is_paused = True
-            self.current_position = time.time() - self.playback_start_time
+            self.current_position = self.clock.position()
+            self.clock.pause()
             self.play_pause_button.config(text="▶")
             logging.info(f"Paused at position: {self.current_position}")
 
@@ -239,15 +590,18 @@ class MusicPlayer:
     def stop(self, reset_ui=True):
         """Stop playback and optionally reset UI."""
         pygame.mixer.music.stop()
+        self.clock.stop()
+        self.pending_seek = None
         self.is_playing = False
         self.is_paused = False
         self.current_position = 0
-        self.progress.set(0)
+        self.set_progress(0)
+        self.waveform.move_cursor(0)
         self.play_pause_button.config(text="▶")
         if self.track_length > 0:
             self.time_label.config(text=f"00:00 / {self.format_time(self.track_length)}")
         if reset_ui and self.current_track_index != -1:
-            self.playlist.selection_clear(0, tk.END)
+            self.playlist.clear_selection()
             self.current_track_index = -1
             self.track_label.config(text="No track loaded")
             self.time_label.config(text="00:00 / 00:00")
@@ -258,7 +612,11 @@ class MusicPlayer:
         """Play the next track."""
         if not self.tracks:
             return
-        self.current_track_index = (self.current_track_index + 1) % len(self.tracks)
+        next_index = self.tracks.next_index(self.current_track_index, wrap=self.repeat)
+        if next_index == -1:
+            self.stop()
+            return
+        self.current_track_index = next_index
         self.update_playlist_selection()
         self.load_and_play()
 
@@ -267,21 +625,18 @@ class MusicPlayer:
         """Play the previous track."""
         if not self.tracks:
             return
-        self.current_track_index = (self.current_track_index - 1) % len(self.tracks)
+        self.current_track_index = self.tracks.previous_index(self.current_track_index)
         self.update_playlist_selection()
         self.load_and_play()
 
 
     def shuffle_tracks(self):
-        """Shuffle the playlist and start from a random track."""
+        """Shuffle the play order and start from a random track."""
         if not self.tracks:
             return
         self.stop()
-        random.shuffle(self.tracks)
-        self.playlist.delete(0, tk.END)
-        for track in self.tracks:
-            self.playlist.insert(tk.END, os.path.basename(track))
-        self.current_track_index = 0
+        self.tracks.shuffle()
+        self.current_track_index = self.tracks.first_index()
         self.update_playlist_selection()
         self.load_and_play()
 
@@ -289,8 +644,10 @@ class MusicPlayer:
     def clear_playlist(self):
         """Clear the playlist and reset UI."""
         self.stop()
+        self.playlist_entries = None
         self.tracks.clear()
-        self.playlist.delete(0, tk.END)
+        self.apply_search()
+        self.playlist.refresh()
         self.track_label.config(text="No track loaded")
         self.time_label.config(text="00:00 / 00:00")
         logging.info("Playlist cleared")
@@ -299,9 +656,7 @@ class MusicPlayer:
     def save_playlist(self):
         """Save the playlist to a file."""
         try:
-            with open(self.PLAYLIST_FILE, "w") as f:
-                for track in self.tracks:
-                    f.write(f"{track}\n")
+            self.playlist_writer.save(self.tracks, self.metadata.cached)
             messagebox.showinfo("Success", "Playlist saved successfully!")
             logging.info("Playlist saved")
         except Exception as e:
@@ -310,20 +665,16 @@ class MusicPlayer:
 
 
     def load_playlist(self):
-        """Load a playlist from a file."""
+        """Load a playlist from a file, PLAYLIST_LOAD_BATCH entries at a time as the file is read."""
+        playlist_file = self.PLAYLIST_FILE
+        if not os.path.exists(playlist_file):
+            playlist_file = self.LEGACY_PLAYLIST_FILE
         try:
-            with open(self.PLAYLIST_FILE, "r") as f:
-                files = [line.strip() for line in f if line.strip()]
+            entries = read_playlist(playlist_file)
+            first = list(islice(entries, self.PLAYLIST_LOAD_BATCH))
             self.clear_playlist()
-            for file in files:
-                if os.path.exists(file) and self.is_valid_audio_file(file):
-                    self.tracks.append(file)
-                    self.playlist.insert(tk.END, os.path.basename(file))
-            if self.tracks and self.current_track_index == -1:
-                self.current_track_index = 0
-                self.playlist.selection_set(0)
-                self.load_and_play()
-            logging.info("Playlist loaded")
+            self.playlist_entries = entries
+            self.load_playlist_batch(entries, first, playlist_file)
         except FileNotFoundError:
             messagebox.showwarning("Warning", "No playlist file found.")
             logging.warning("Playlist file not found")
@@ -332,48 +683,87 @@ class MusicPlayer:
             logging.error(f"Load playlist failed: {e}")
 
 
+    def load_playlist_batch(self, entries, batch, playlist_file):
+        """Import one batch of entries and read the next once it is in the playlist, keeping file order."""
+        if entries is not self.playlist_entries:
+            return  # the playlist was cleared or reloaded meanwhile
+        if not batch:
+            self.playlist_entries = None
+            logging.info(f"Playlist loaded from {playlist_file}")
+            return
+        known = {entry["path"]: entry for entry in batch}
+
+        def next_batch():
+            try:
+                following = list(islice(entries, self.PLAYLIST_LOAD_BATCH))
+            except (OSError, ValueError) as e:
+                logging.error(f"Load playlist failed: {e}")
+                self.playlist_entries = None
+                return
+            self.load_playlist_batch(entries, following, playlist_file)
+        self.import_tracks(known, known, then=next_batch)
+
+
     def update_playlist_selection(self):
         """Update the playlist selection UI."""
-        self.playlist.selection_clear(0, tk.END)
-        self.playlist.selection_set(self.current_track_index)
-        self.playlist.see(self.current_track_index)
+        self.playlist.select(self.current_track_index)
 
 
     def set_volume(self, value):
         """Set the playback volume."""
-        pygame.mixer.music.set_volume(float(value))
+        self.volume_level = float(value)
+        self.apply_volume()
+
+
+    def apply_volume(self):
+        """Apply the volume slider scaled by the current track's normalization gain."""
+        pygame.mixer.music.set_volume(min(1.0, self.volume_level * self.track_gain))
 
 
     def on_seek(self, value):
-        """Seek to a specific position in the track."""
-        if not (self.is_playing or self.is_paused):
+        """Remember the newest slider position and seek once the slider settles."""
+        if self.updating_progress or not (self.is_playing or self.is_paused):
             return
+        self.pending_seek = float(value)
+        if self.seek_job is not None:
+            self.root.after_cancel(self.seek_job)
+        self.seek_job = self.root.after(self.SEEK_SETTLE_MS, self.apply_seek)
+
+
+    def apply_seek(self):
+        """Seek to the last requested position in the track."""
+        self.seek_job = None
+        if self.pending_seek is None or not (self.is_playing or self.is_paused):
+            return
+        seek_pos, self.pending_seek = self.pending_seek, None
         try:
-            seek_pos = float(value)
-            if abs(seek_pos - self.current_position) < 1:  # Avoid small seeks
-                return
             self.current_position = seek_pos
-            self.playback_start_time = time.time() - seek_pos
-            if self.is_playing:
-                pygame.mixer.music.play(start=seek_pos)
-            elif self.is_paused:
-                pygame.mixer.music.play(start=seek_pos)
-                pygame.mixer.music.pause()
+            with self.telemetry.timer("seek"):
+                self.start_stream(seek_pos)
+                if self.is_paused:
+                    pygame.mixer.music.pause()
+            self.clock.seek(seek_pos)
             logging.info(f"Seeking to position: {seek_pos}")
-        except pygame.error as e:
+        except (pygame.error, OSError) as e:
             logging.error(f"Seek failed: {e}")
 
 
-    def update_progress(self):
+    def set_progress(self, position):
+        """Move the progress slider without triggering a seek."""
+        self.updating_progress = True
+        try:
+            self.progress.set(position)
+        finally:
+            self.updating_progress = False
+
+
+    def update_progress(self, position):
         """Update the progress bar and time label."""
         if self.is_playing and self.track_length > 0:
-            self.current_position = time.time() - self.playback_start_time
-            if self.current_position >= self.track_length:
-                self.next_track()
-            else:
-                self.progress.set(self.current_position)
-                self.time_label.config(text=f"{self.format_time(self.current_position)} / {self.format_time(self.track_length)}")
-        self.root.after(self.UPDATE_INTERVAL_MS, self.update_progress)
+            self.current_position = position
+            self.set_progress(self.current_position)
+            self.waveform.move_cursor(self.current_position / self.track_length)
+            self.time_label.config(text=f"{self.format_time(self.current_position)} / {self.format_time(self.track_length)}")
 
 
     def format_time(self, seconds):
@@ -385,7 +775,19 @@ class MusicPlayer:
 
     def on_closing(self):
         """Clean up and close the application."""
+        self.metadata.shutdown()
+        if self.decode_cache:
+            self.decode_cache.shutdown()
+        self.analyzer.shutdown()
+        self.seek_indexer.save()
+        self.search_index.save(self.SEARCH_INDEX_FILE)
         pygame.mixer.quit()
+        self.close_stream_source()
+        try:
+            self.telemetry.export(self.TELEMETRY_JSON_FILE, self.TELEMETRY_PROM_FILE)
+        except OSError as e:
+            logging.error(f"Telemetry export failed: {e}")
+        self.log_listener.stop()
         self.root.destroy()
 
 
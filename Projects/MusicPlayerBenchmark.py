@@ -0,0 +1,243 @@
+import os
+import sys
+import json
+import time
+import wave
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+#Silent audio device; must be set before pygame opens the mixer
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+import tkinter as tk
+import MusicPlayer as player_module
+from MusicPlayer import MusicPlayer
+from Telemetry import percentile
+
+try:
+    import lameenc
+except ImportError:  # lameenc is optional; without it only WAV fixtures are generated
+    lameenc = None
+
+#Headless benchmarks for the MusicPlayer hot paths against the dummy SDL audio driver
+SAMPLE_RATE = 44100
+VIRTUAL_DISPLAY = ":99"
+IMPORT_TIMEOUT_S = 120
+
+
+def make_tone(seconds, frequency):
+    """Return interleaved stereo int16 samples of a sine tone."""
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    mono = (np.sin(2 * np.pi * frequency * t) * 12000).astype(np.int16)
+    return np.repeat(mono, 2)
+
+
+def write_wav(path, samples):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.tobytes())
+
+
+def write_mp3(path, samples, bitrate=128):
+    encoder = lameenc.Encoder()
+    encoder.set_bit_rate(bitrate)
+    encoder.set_in_sample_rate(SAMPLE_RATE)
+    encoder.set_channels(2)
+    encoder.set_quality(7)
+    with open(path, "wb") as f:
+        f.write(encoder.encode(samples.tobytes()) + encoder.flush())
+
+
+def make_fixtures(folder, count, seconds, formats):
+    """Generate count short tone tracks, alternating between the requested formats."""
+    if "mp3" in formats and lameenc is None:
+        print("lameenc is not installed, generating WAV fixtures only")
+        formats = [fmt for fmt in formats if fmt != "mp3"] or ["wav"]
+    paths = []
+    for i in range(count):
+        fmt = formats[i % len(formats)]
+        path = os.path.join(folder, f"track_{i:05d}.{fmt}")
+        samples = make_tone(seconds, 220 + (i % 24) * 20)
+        if fmt == "mp3":
+            write_mp3(path, samples)
+        else:
+            write_wav(path, samples)
+        paths.append(path)
+    return paths
+
+
+def start_virtual_display():
+    """Start Xvfb when there is no display; returns the process or None."""
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        return None
+    if shutil.which("Xvfb") is None:
+        sys.exit("No display available and Xvfb is not installed")
+    process = subprocess.Popen(["Xvfb", VIRTUAL_DISPLAY, "-screen", "0", "1024x768x24"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = VIRTUAL_DISPLAY
+    time.sleep(0.5)
+    return process
+
+
+def silence_dialogs(files):
+    """Answer file dialogs with the fixtures and turn message boxes into no-ops."""
+    for name in ("showinfo", "showwarning", "showerror"):
+        setattr(player_module.messagebox, name, lambda *args, **kwargs: None)
+    player_module.filedialog.askopenfilenames = lambda **kwargs: list(files)
+
+
+def pump_until(root, condition, timeout=IMPORT_TIMEOUT_S):
+    """Run the Tk event loop until condition() holds."""
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("Timed out waiting for the player")
+        root.update()
+        time.sleep(0.001)
+
+
+def summarize(samples, items=1):
+    """Latency percentiles in milliseconds and throughput in items per second."""
+    samples = sorted(samples)
+    total = sum(samples)
+    return {
+        "runs": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p90_ms": round(percentile(samples, 90) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+        "mean_ms": round(total / len(samples) * 1000, 3),
+        "items_per_s": round(items * len(samples) / total, 1) if total else None,
+    }
+
+
+def drain_background(app, root):
+    """Wait out queued track analysis and decoding so it does not overlap the next timed run."""
+    decode_cache = app.decode_cache
+    pump_until(root, lambda: not app.analyzer.pending and not (decode_cache and decode_cache.pending))
+
+
+def timed(func, repeat, settle=None):
+    """Time repeat calls of func; settle, if given, runs untimed before each call."""
+    samples = []
+    for _ in range(repeat):
+        if settle is not None:
+            settle()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_benchmarks(app, root, files, repeat):
+    results = {}
+    count = len(files)
+
+    def settle():
+        drain_background(app, root)
+
+    def add_tracks():
+        app.clear_playlist()
+        app.add_tracks()
+        pump_until(root, lambda: len(app.tracks) == count)
+    results["add_tracks"] = summarize(timed(add_tracks, repeat, settle), count)
+
+    app.save_playlist()
+
+    def load_playlist():
+        app.load_playlist()
+        pump_until(root, lambda: len(app.tracks) == count)
+    results["load_playlist"] = summarize(timed(load_playlist, repeat, settle), count)
+
+    results["shuffle_tracks"] = summarize(timed(app.shuffle_tracks, repeat, settle), count)
+
+    def load_and_play():
+        app.current_track_index = random.randrange(count)
+        app.load_and_play()
+    results["load_and_play"] = summarize(timed(load_and_play, repeat * 10, settle))
+
+    app.current_track_index = 0
+    app.load_and_play()
+    settle()
+    ticks = 1000
+
+    def update_progress():
+        for i in range(ticks):
+            app.update_progress(i % max(1, int(app.track_length)))
+    results["update_progress"] = summarize(timed(update_progress, repeat, settle), ticks)
+    return results
+
+
+def compare(results, baseline_file):
+    """Print the p50 change of every operation against an earlier run."""
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    print(f"\nAgainst {baseline_file}:")
+    for name, summary in results.items():
+        if name in baseline and baseline[name]["p50_ms"]:
+            change = (summary["p50_ms"] / baseline[name]["p50_ms"] - 1) * 100
+            print(f"  {name:<16} p50 {baseline[name]['p50_ms']:10.3f} -> {summary['p50_ms']:10.3f} ms  ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MusicPlayer operations headlessly")
+    parser.add_argument("--tracks", type=int, default=200, help="number of fixture tracks")
+    parser.add_argument("--seconds", type=float, default=5.0, help="length of each fixture track")
+    parser.add_argument("--formats", default="wav,mp3", help="comma separated fixture formats")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per operation")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file for the results")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+
+    display = start_virtual_display()
+    workdir = tempfile.mkdtemp(prefix="music_player_bench_")
+    cwd = os.getcwd()
+    try:
+        #The player keeps its caches and log next to the working directory
+        os.chdir(workdir)
+        fixture_dir = os.path.join(workdir, "fixtures")
+        os.makedirs(fixture_dir)
+        files = make_fixtures(fixture_dir, args.tracks, args.seconds, args.formats.split(","))
+        silence_dialogs(files)
+
+        root = tk.Tk()
+        root.withdraw()
+        app = MusicPlayer(root)
+        results = run_benchmarks(app, root, files, args.repeat)
+        app.on_closing()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+        if display is not None:
+            display.terminate()
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "config": vars(args),
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for name, summary in results.items():
+        print(f"{name:<16} p50 {summary['p50_ms']:10.3f} ms  p90 {summary['p90_ms']:10.3f} ms  "
+              f"p99 {summary['p99_ms']:10.3f} ms  {summary['items_per_s']} items/s")
+    if baseline:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
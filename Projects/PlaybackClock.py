@@ -0,0 +1,135 @@
+import logging
+import pygame
+
+
+class PlaybackClock:
+    """Report playback position from the mixer and schedule UI ticks only while playing."""
+
+    END_EVENT = pygame.USEREVENT + 1
+    END_MARGIN_MS = 20
+
+    def __init__(self, root, on_tick, on_track_end, tick_ms):
+        self.root = root
+        self.on_tick = on_tick
+        self.on_track_end = on_track_end
+        self.tick_ms = tick_ms
+        self.offset = 0.0
+        self.length = 0.0
+        self.running = False
+        self.tick_job = None
+        self.end_job = None
+
+        #The end event needs the SDL event queue, which lives in the video subsystem
+        pygame.mixer.music.set_endevent(self.END_EVENT)
+        try:
+            pygame.display.init()
+            self.events_enabled = True
+        except pygame.error as e:
+            self.events_enabled = False
+            logging.warning(f"Mixer end events unavailable, using end deadline only: {e}")
+
+
+    def position(self):
+        """Return the playback position in seconds as reported by the mixer."""
+        elapsed_ms = pygame.mixer.music.get_pos()
+        if elapsed_ms < 0:
+            return self.offset
+        return self.offset + elapsed_ms / 1000
+
+
+    def start(self, offset=0.0):
+        """Start ticking after the mixer was (re)started at offset seconds."""
+        self.offset = offset
+        self.discard_end_events()
+        self.resume()
+
+
+    def resume(self):
+        """Resume ticking after an unpause."""
+        self.running = True
+        self.schedule()
+
+
+    def pause(self):
+        """Stop ticking while the mixer is paused."""
+        self.running = False
+        self.cancel()
+
+
+    def stop(self):
+        """Stop ticking and forget the position."""
+        self.running = False
+        self.offset = 0.0
+        self.cancel()
+        self.discard_end_events()
+
+
+    def seek(self, offset):
+        """Record that the mixer was restarted at offset seconds."""
+        self.offset = offset
+        self.discard_end_events()
+        if self.running:
+            self.schedule()
+
+
+    def schedule(self):
+        """Schedule the next UI tick and an end-of-track check at the predicted end."""
+        self.cancel()
+        self.tick_job = self.root.after(self.tick_ms, self.tick)
+        if self.length > 0:
+            remaining_ms = max(0, int((self.length - self.position()) * 1000))
+            self.end_job = self.root.after(remaining_ms + self.END_MARGIN_MS, self.check_end)
+
+
+    def cancel(self):
+        """Cancel any pending tick or end check."""
+        if self.tick_job is not None:
+            self.root.after_cancel(self.tick_job)
+            self.tick_job = None
+        if self.end_job is not None:
+            self.root.after_cancel(self.end_job)
+            self.end_job = None
+
+
+    def tick(self):
+        """Update the UI and watch for the mixer's end event."""
+        self.tick_job = None
+        if not self.running:
+            return
+        if self.track_ended():
+            self.finish()
+            return
+        self.on_tick(self.position())
+        self.tick_job = self.root.after(self.tick_ms, self.tick)
+
+
+    def check_end(self):
+        """Advance if the track finished, otherwise re-arm for the new predicted end."""
+        self.end_job = None
+        if not self.running:
+            return
+        if self.track_ended() or not pygame.mixer.music.get_busy() or self.position() >= self.length:
+            self.finish()
+            return
+        remaining_ms = max(0, int((self.length - self.position()) * 1000))
+        self.end_job = self.root.after(remaining_ms + self.END_MARGIN_MS, self.check_end)
+
+
+    def track_ended(self):
+        """Return True if the mixer posted its end-of-track event."""
+        if not self.events_enabled:
+            return False
+        return bool(pygame.event.get(self.END_EVENT))
+
+
+    def discard_end_events(self):
+        """Drop end events left over from a stopped or restarted track."""
+        if self.events_enabled:
+            pygame.event.clear(self.END_EVENT)
+
+
+    def finish(self):
+        """Stop ticking and notify that the track ended."""
+        self.running = False
+        self.cancel()
+        self.on_track_end()
@@ -0,0 +1,162 @@
+import random
+from array import array
+
+COMPACT_FRACTION = 0.25  # removed slots allowed before remove() compacts on its own
+
+
+class Playlist:
+    """Ordered, de-duplicated track paths with O(1) membership and a separate shuffle order.
+
+    The canonical order is what the playlist view shows and what gets saved.
+    Shuffling never rewrites it; instead a permutation of canonical indices
+    (and its inverse) defines the play order used by next/previous.
+    """
+
+    def __init__(self, paths=()):
+        self.paths = []
+        self.slots = {}
+        self.removed = 0
+        self.order = None
+        self.rank = None
+        self.revision = 0
+        self.extend(paths)
+
+
+    def __len__(self):
+        return len(self.paths) - self.removed
+
+
+    def __contains__(self, path):
+        return path in self.slots
+
+
+    def __iter__(self):
+        return (path for path in self.paths if path is not None)
+
+
+    def __getitem__(self, index):
+        self.compact()
+        return self.paths[index]
+
+
+    def index(self, path):
+        """Return the canonical index of a path."""
+        self.compact()
+        return self.slots[path]
+
+
+    def append(self, path):
+        """Add a path at the end; returns False if it is already present."""
+        if path in self.slots:
+            return False
+        slot = len(self.paths)
+        self.slots[path] = slot
+        self.paths.append(path)
+        if self.order is not None:
+            self.rank.append(len(self.order))
+            self.order.append(slot)
+        return True
+
+
+    def extend(self, paths):
+        """Add several paths; returns how many were new."""
+        return sum(1 for path in paths if self.append(path))
+
+
+    def remove(self, path):
+        """Remove a path in O(1) amortized; its slot is reclaimed on the next compaction."""
+        slot = self.slots.pop(path)
+        self.paths[slot] = None
+        self.removed += 1
+        self.revision += 1
+        if self.removed > len(self.paths) * COMPACT_FRACTION:
+            self.compact()
+
+
+    def clear(self):
+        """Remove every path and drop the shuffle order."""
+        self.paths.clear()
+        self.slots.clear()
+        self.removed = 0
+        self.order = None
+        self.rank = None
+        self.revision += 1
+
+
+    def compact(self):
+        """Close the gaps left by removals, remapping the shuffle order if any."""
+        if not self.removed:
+            return
+        new_index = array('l', [-1]) * len(self.paths)
+        paths = []
+        for slot, path in enumerate(self.paths):
+            if path is not None:
+                new_index[slot] = len(paths)
+                paths.append(path)
+        self.paths = paths
+        self.slots = {path: index for index, path in enumerate(paths)}
+        self.removed = 0
+        if self.order is not None:
+            self.set_order(array('l', (new_index[slot] for slot in self.order if new_index[slot] >= 0)))
+
+
+    @property
+    def shuffled(self):
+        return self.order is not None
+
+
+    def shuffle(self):
+        """Draw a new random play order without touching the canonical order."""
+        self.compact()
+        order = array('l', range(len(self.paths)))
+        random.shuffle(order)
+        self.set_order(order)
+
+
+    def unshuffle(self):
+        """Go back to playing in canonical order."""
+        self.order = None
+        self.rank = None
+
+
+    def set_order(self, order):
+        """Install a play-order permutation and build its inverse."""
+        rank = array('l', [0]) * len(order)
+        for position, index in enumerate(order):
+            rank[index] = position
+        self.order = order
+        self.rank = rank
+
+
+    def first_index(self):
+        """Return the canonical index that starts the play order, or -1 if empty."""
+        if not len(self):
+            return -1
+        self.compact()
+        return self.order[0] if self.order is not None else 0
+
+
+    def next_index(self, index, wrap=True):
+        """Return the canonical index played after index, or -1 past the end without wrap."""
+        return self.step(index, 1, wrap)
+
+
+    def previous_index(self, index, wrap=True):
+        """Return the canonical index played before index, or -1 past the start without wrap."""
+        return self.step(index, -1, wrap)
+
+
+    def step(self, index, delta, wrap):
+        self.compact()
+        count = len(self.paths)
+        if not count:
+            return -1
+        if not 0 <= index < count:
+            return self.first_index()
+        position = self.rank[index] if self.order is not None else index
+        position += delta
+        if not 0 <= position < count:
+            if not wrap:
+                return -1
+            position %= count
+        return self.order[position] if self.order is not None else position
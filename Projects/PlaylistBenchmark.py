@@ -0,0 +1,61 @@
+import random
+import timeit
+from Playlist import Playlist
+
+#Micro-benchmarks for the Playlist model against the plain list it replaced
+SIZES = [1_000, 10_000, 100_000]
+LIST_ADD_LIMIT = 10_000  # the O(n^2) list dedup gets too slow past this
+
+
+def make_paths(count):
+    return [f"/music/artist_{i % 500}/album_{i % 37}/track_{i:06d}.mp3" for i in range(count)]
+
+
+def list_bulk_add(paths):
+    tracks = []
+    for path in paths:
+        if path not in tracks:
+            tracks.append(path)
+    return tracks
+
+
+def walk(playlist, steps):
+    index = playlist.first_index()
+    for _ in range(steps):
+        index = playlist.next_index(index)
+    return index
+
+
+def report(name, count, seconds, ops=1):
+    print(f"{name:<28} n={count:<8} {seconds * 1000:10.3f} ms   {seconds / ops * 1e9:10.1f} ns/op")
+
+
+def best_of(func, repeat=3):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+if __name__ == "__main__":
+    for count in SIZES:
+        paths = make_paths(count)
+        probes = random.sample(paths, min(count, 1000))
+
+        report("Playlist.extend", count, best_of(lambda: Playlist(paths)), count)
+        if count <= LIST_ADD_LIMIT:
+            report("list dedup append", count, best_of(lambda: list_bulk_add(paths)), count)
+
+        playlist = Playlist(paths)
+        tracks = list(paths)
+        report("Playlist membership", count, best_of(lambda: [p in playlist for p in probes]), len(probes))
+        report("list membership", count, best_of(lambda: [p in tracks for p in probes]), len(probes))
+
+        report("Playlist.shuffle", count, best_of(playlist.shuffle))
+        report("list random.shuffle", count, best_of(lambda: random.shuffle(tracks)))
+        report("Playlist next (shuffled)", count, best_of(lambda: walk(playlist, 10_000)), 10_000)
+
+        def remove_and_compact():
+            copy = Playlist(paths)
+            for path in probes:
+                copy.remove(path)
+            copy.compact()
+        report("build, remove 1k, compact", count, best_of(remove_and_compact), len(probes))
+        print()
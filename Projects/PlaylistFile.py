@@ -0,0 +1,106 @@
+import os
+
+#Extended M3U playlists, one entry per track:
+#   #EXTINF:<seconds>,<title>
+#   #EXTFP:<size>,<mtime_ns>,<bitrate>
+#   <path>
+#EXTFP is our own fingerprint tag; players that don't know it skip it as a comment.
+HEADER = "#EXTM3U"
+
+
+def read_playlist(file_path):
+    """Yield entry dicts from an extended M3U or plain one-path-per-line file.
+
+    A last line without its newline is a torn append and is skipped.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        entry = {}
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            line = line.strip()
+            if not line or line == HEADER:
+                continue
+            if line.startswith("#EXTINF:"):
+                length, _, title = line[8:].partition(",")
+                try:
+                    entry["length"] = float(length)
+                except ValueError:
+                    pass
+                entry["title"] = title
+            elif line.startswith("#EXTFP:"):
+                try:
+                    size, mtime_ns, bitrate = line[7:].split(",")
+                    entry.update(size=int(size), mtime_ns=int(mtime_ns), bitrate=int(bitrate))
+                except ValueError:
+                    pass
+            elif line.startswith("#"):
+                continue
+            else:
+                entry["path"] = line
+                yield entry
+                entry = {}
+
+
+def format_entry(path, cached):
+    """Return the lines for one track; cached is (size, mtime_ns, info) or None."""
+    if cached is None:
+        return f"{path}\n"
+    size, mtime_ns, info = cached
+    title = os.path.splitext(os.path.basename(path))[0]
+    return (f"#EXTINF:{info['length']:.3f},{title}\n"
+            f"#EXTFP:{size},{mtime_ns},{info['bitrate']}\n"
+            f"{path}\n")
+
+
+class PlaylistWriter:
+    """Save a Playlist as extended M3U, appending when only new tracks were added."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.saved_revision = None
+        self.saved_count = 0
+        self.saved_size = None
+
+
+    def save(self, playlist, describe):
+        """Write the playlist; describe(path) returns the cached fingerprint or None."""
+        if self.can_append(playlist):
+            self.append(playlist, describe)
+        else:
+            self.rewrite(playlist, describe)
+        self.saved_revision = playlist.revision
+        self.saved_count = len(playlist)
+        self.saved_size = os.path.getsize(self.file_path)
+
+
+    def can_append(self, playlist):
+        """Return True if the file still holds exactly what we last wrote."""
+        if self.saved_revision != playlist.revision or len(playlist) < self.saved_count:
+            return False
+        try:
+            return os.path.getsize(self.file_path) == self.saved_size
+        except OSError:
+            return False
+
+
+    def append(self, playlist, describe):
+        """Write only the tracks added since the last save."""
+        with open(self.file_path, "a", encoding="utf-8") as f:
+            for index in range(self.saved_count, len(playlist)):
+                path = playlist[index]
+                f.write(format_entry(path, describe(path)))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+    def rewrite(self, playlist, describe):
+        """Write the whole playlist to a temporary file and swap it in atomically."""
+        tmp_file = f"{self.file_path}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            f.write(f"{HEADER}\n")
+            for path in playlist:
+                f.write(format_entry(path, describe(path)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.file_path)
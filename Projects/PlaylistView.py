@@ -0,0 +1,156 @@
+import os
+import bisect
+import tkinter as tk
+from tkinter import font as tkfont
+
+
+class PlaylistView:
+    """Listbox that only holds the visible window of rows from a Playlist model.
+
+    Model changes are coalesced into one render on the next idle callback, and
+    a render only rewrites the rows whose text changed, so the cost depends on
+    the window height rather than on the playlist size. An optional filter
+    (a sorted list of model indices) restricts which tracks are shown.
+    """
+
+    def __init__(self, master, playlist, on_select, **listbox_options):
+        self.playlist = playlist
+        self.on_select = on_select
+        self.first = 0
+        self.rows = []
+        self.visible_rows = 1
+        self.selected = -1
+        self.filter = None
+        self.render_job = None
+
+        self.scrollbar = tk.Scrollbar(master, command=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(master, exportselection=False, **listbox_options)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.line_height = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+
+        self.listbox.bind('<<ListboxSelect>>', self.on_listbox_select)
+        self.listbox.bind('<Configure>', self.on_resize)
+        self.listbox.bind('<MouseWheel>', self.on_mousewheel)
+        self.listbox.bind('<Button-4>', lambda event: self.scroll_by(-3))
+        self.listbox.bind('<Button-5>', lambda event: self.scroll_by(3))
+
+
+    def refresh(self):
+        """Schedule a render; repeated calls before the next idle run are merged."""
+        if self.render_job is None:
+            self.render_job = self.listbox.after_idle(self.render)
+
+
+    def set_filter(self, indices):
+        """Show only the given sorted model indices, or every track for None."""
+        self.filter = indices
+        self.first = 0
+        self.refresh()
+
+
+    def row_count(self):
+        return len(self.playlist) if self.filter is None else len(self.filter)
+
+
+    def model_index(self, row):
+        return row if self.filter is None else self.filter[row]
+
+
+    def row_of(self, index):
+        """Return the view row showing a model index, or -1 if it is filtered out."""
+        if self.filter is None:
+            return index
+        row = bisect.bisect_left(self.filter, index)
+        return row if row < len(self.filter) and self.filter[row] == index else -1
+
+
+    def render(self):
+        """Bring the listbox rows, selection and scrollbar in line with the model."""
+        self.render_job = None
+        total = self.row_count()
+        self.first = max(0, min(self.first, total - self.visible_rows))
+        last = min(total, self.first + self.visible_rows)
+        rows = [os.path.basename(self.playlist[self.model_index(row)]) for row in range(self.first, last)]
+
+        changed = [row for row, text in enumerate(rows) if row >= len(self.rows) or self.rows[row] != text]
+        if len(changed) > len(rows) // 2 or len(rows) < len(self.rows):
+            self.listbox.delete(0, tk.END)
+            if rows:
+                self.listbox.insert(tk.END, *rows)
+        else:
+            for row in changed:
+                if row < len(self.rows):
+                    self.listbox.delete(row)
+                self.listbox.insert(row, rows[row])
+        self.rows = rows
+
+        self.listbox.selection_clear(0, tk.END)
+        selected_row = self.row_of(self.selected) if self.selected != -1 else -1
+        if self.first <= selected_row < last:
+            self.listbox.selection_set(selected_row - self.first)
+        if total:
+            self.scrollbar.set(self.first / total, last / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+
+    def select(self, index):
+        """Highlight a model row and scroll it into view."""
+        self.selected = index
+        self.see(index)
+        self.refresh()
+
+
+    def clear_selection(self):
+        """Remove the highlight."""
+        self.selected = -1
+        self.refresh()
+
+
+    def see(self, index):
+        """Scroll so that a model row is inside the window, if it is not filtered out."""
+        row = self.row_of(index)
+        if row == -1:
+            return
+        if row < self.first:
+            self.first = row
+        elif row >= self.first + self.visible_rows:
+            self.first = row - self.visible_rows + 1
+        self.refresh()
+
+
+    def scroll_by(self, rows):
+        """Move the window by a number of rows."""
+        self.first = max(0, self.first + rows)
+        self.refresh()
+        return "break"
+
+
+    def on_scroll(self, action, amount, unit=None):
+        """Handle scrollbar drags and clicks."""
+        if action == "moveto":
+            self.first = int(float(amount) * self.row_count())
+            self.refresh()
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_by(int(amount) * step)
+
+
+    def on_mousewheel(self, event):
+        return self.scroll_by(-1 if event.delta > 0 else 1)
+
+
+    def on_resize(self, event):
+        self.visible_rows = max(1, event.height // self.line_height + 1)
+        self.refresh()
+
+
+    def on_listbox_select(self, event=None):
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        row = self.first + selection[0]
+        if row < self.row_count():
+            self.selected = self.model_index(row)
+            self.on_select(self.selected)
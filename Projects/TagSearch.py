@@ -0,0 +1,274 @@
+import os
+import re
+import gc
+import pickle
+import logging
+import threading
+from array import array
+from concurrent.futures import Future
+import mutagen
+
+TAG_FIELDS = ["title", "artist", "album", "genre"]
+ID3_FRAMES = {"TIT2": "title", "TPE1": "artist", "TALB": "album", "TCON": "genre"}
+TOKEN_PATTERN = re.compile(r"\w+")
+COMPACT_FRACTION = 0.25  # renumber documents once this share of ids belongs to removed tracks
+COMPACT_MIN_REMOVED = 64
+
+
+def read_tags(file_path):
+    """Return {field: text} for the title/artist/album/genre tags of a file."""
+    fields = {}
+    try:
+        audio = mutagen.File(file_path, easy=True)
+    except Exception as e:
+        logging.warning(f"Could not read tags from {file_path}: {e}")
+        return fields
+    if audio is None or audio.tags is None:
+        return fields
+    for key, value in audio.tags.items():
+        field = key if key in TAG_FIELDS else ID3_FRAMES.get(key[:4])
+        if field and field not in fields:
+            text = value.text if hasattr(value, "text") else value
+            fields[field] = " ".join(str(part) for part in text)
+    return fields
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class TagIndex:
+    """Inverted index over track tags with trigram lookup for substring matches.
+
+    Postings map tokens to document ids. Each distinct token is also listed
+    under its trigrams (and its one and two character prefixes), so a query term
+    only has to be compared with the few tokens that share those trigrams.
+    Terms shorter than three characters match token prefixes only.
+
+    Postings are saved as int arrays (and gram lists as tuples) and keep that
+    form after loading until first modified, which keeps startup fast.
+    Removing or re-indexing a track leaves its old id unused; once more than
+    COMPACT_FRACTION of the ids are unused the live documents are renumbered.
+    """
+
+    VERSION = 1
+
+    def __init__(self):
+        self.paths = []
+        self.doc_ids = {}
+        self.doc_texts = []
+        self.fingerprints = []
+        self.postings = {}
+        self.grams = {}
+        self.removed = 0
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # one writer of the temp file at a time
+        self.dirty = False
+
+
+    def __contains__(self, path):
+        return path in self.doc_ids
+
+
+    def add(self, path, fields, fingerprint=None):
+        """Index or re-index a track from its tag fields and file name."""
+        text = " ".join(fields.values()) + " " + os.path.splitext(os.path.basename(path))[0]
+        tokens = set(tokenize(text))
+        with self.lock:
+            self.remove_locked(path)
+            doc_id = len(self.paths)
+            self.paths.append(path)
+            self.doc_texts.append(" ".join(tokens))
+            self.fingerprints.append(fingerprint)
+            self.doc_ids[path] = doc_id
+            for token in tokens:
+                if token not in self.postings:
+                    self.postings[token] = set()
+                    for gram in trigrams(token) | {token[:1], token[:2]}:
+                        self.gram_set(gram).add(token)
+                self.posting_set(token).add(doc_id)
+            self.dirty = True
+
+
+    def remove(self, path):
+        """Drop a track from the index."""
+        with self.lock:
+            self.remove_locked(path)
+
+
+    def remove_locked(self, path):
+        doc_id = self.doc_ids.pop(path, None)
+        if doc_id is None:
+            return
+        for token in self.doc_texts[doc_id].split():
+            posting = self.posting_set(token)
+            posting.discard(doc_id)
+            if not posting:
+                del self.postings[token]
+                for gram in trigrams(token) | {token[:1], token[:2]}:
+                    tokens = self.gram_set(gram)
+                    tokens.discard(token)
+                    if not tokens:
+                        del self.grams[gram]
+        self.paths[doc_id] = None
+        self.doc_texts[doc_id] = ""
+        self.fingerprints[doc_id] = None
+        self.removed += 1
+        self.dirty = True
+        if self.removed >= COMPACT_MIN_REMOVED and self.removed > len(self.paths) * COMPACT_FRACTION:
+            self.compact_locked()
+
+
+    def compact_locked(self):
+        """Renumber the live documents from 0 and rewrite the postings to match."""
+        live = [doc_id for doc_id, path in enumerate(self.paths) if path is not None]
+        new_ids = {old: new for new, old in enumerate(live)}
+        self.paths = [self.paths[doc_id] for doc_id in live]
+        self.doc_texts = [self.doc_texts[doc_id] for doc_id in live]
+        self.fingerprints = [self.fingerprints[doc_id] for doc_id in live]
+        self.doc_ids = {path: doc_id for doc_id, path in enumerate(self.paths)}
+        self.postings = {token: {new_ids[doc_id] for doc_id in posting} for token, posting in self.postings.items()}
+        self.removed = 0
+
+
+    def posting_set(self, token):
+        """Return a token's posting as a mutable set, converting a loaded array."""
+        posting = self.postings[token]
+        if not isinstance(posting, set):
+            posting = self.postings[token] = set(posting)
+        return posting
+
+
+    def gram_set(self, gram):
+        """Return the tokens listed under a gram as a mutable set, converting a loaded tuple."""
+        tokens = self.grams.get(gram)
+        if tokens is None:
+            tokens = self.grams[gram] = set()
+        elif not isinstance(tokens, set):
+            tokens = self.grams[gram] = set(tokens)
+        return tokens
+
+
+    def is_current(self, path, fingerprint):
+        """Return True if a track is indexed at this size/mtime fingerprint."""
+        with self.lock:
+            doc_id = self.doc_ids.get(path)
+            return doc_id is not None and self.fingerprints[doc_id] == fingerprint
+
+
+    def matching_tokens(self, term):
+        """Return indexed tokens that contain term."""
+        if len(term) < 3:
+            return self.grams.get(term, ())
+        candidates = None
+        for gram in trigrams(term):
+            tokens = self.grams.get(gram)
+            if not tokens:
+                return ()
+            candidates = set(tokens) if candidates is None else candidates.intersection(tokens)
+        return [token for token in candidates if term in token]
+
+
+    def search(self, query):
+        """Return the set of paths whose tags or file name contain every query term."""
+        terms = tokenize(query)
+        if not terms:
+            return None
+        result = None
+        with self.lock:
+            #Longer terms tend to be rarer, so starting with them keeps the sets small
+            for term in sorted(set(terms), key=len, reverse=True):
+                docs = set()
+                for token in self.matching_tokens(term):
+                    docs.update(self.postings[token])
+                result = docs if result is None else result & docs
+                if not result:
+                    return set()
+            return {self.paths[doc_id] for doc_id in result}
+
+
+    def index_files(self, file_paths, executor):
+        """Read tags of stale or new files on the executor; returns a Future set when done."""
+        result = Future()
+        file_paths = list(file_paths)
+        remaining = [len(file_paths)]
+        lock = threading.Lock()
+        if not file_paths:
+            result.set_result(0)
+            return result
+
+        def index_one(path):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self.remove(path)
+                return
+            fingerprint = (stat.st_size, stat.st_mtime_ns)
+            if not self.is_current(path, fingerprint):
+                self.add(path, read_tags(path), fingerprint)
+
+        def on_done(future):
+            with lock:
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+            if finished:
+                result.set_result(len(file_paths))
+
+        for path in file_paths:
+            executor.submit(index_one, path).add_done_callback(on_done)
+        return result
+
+
+    def save(self, index_file):
+        """Pickle the whole index, postings included, so loading needs no rebuild.
+
+        Concurrent saves run one at a time from snapshot to rename.
+        """
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                postings = {token: array('l', posting) for token, posting in self.postings.items()}
+                grams = {gram: tuple(tokens) for gram, tokens in self.grams.items()}
+                state = (self.VERSION, self.paths, self.doc_texts, self.fingerprints, postings, grams)
+                data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+                self.dirty = False
+            try:
+                with open(f"{index_file}.tmp", "wb") as f:
+                    f.write(data)
+                os.replace(f"{index_file}.tmp", index_file)
+            except OSError as e:
+                logging.error(f"Failed to save search index: {e}")
+
+
+    @classmethod
+    def load(cls, index_file):
+        """Load a saved index, or return an empty one."""
+        index = cls()
+        #Collection passes over millions of fresh containers only slow the load down
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(index_file, "rb") as f:
+                state = pickle.load(f)
+            if state[0] != cls.VERSION:
+                return index
+            _, paths, doc_texts, fingerprints, postings, grams = state
+            doc_ids = {path: doc_id for doc_id, path in enumerate(paths) if path is not None}
+        except FileNotFoundError:
+            return index
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError, IndexError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable search index: {e}")
+            return index
+        finally:
+            if gc_enabled:
+                gc.enable()
+        index.paths, index.doc_texts, index.fingerprints, index.postings, index.grams = (
+            paths, doc_texts, fingerprints, postings, grams)
+        index.doc_ids = doc_ids
+        index.removed = len(paths) - len(doc_ids)
+        return index
@@ -0,0 +1,146 @@
+import json
+import time
+import queue
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+#Bucket upper bounds in seconds: 0.5ms doubling up to ~65s
+BUCKET_BOUNDS = [0.0005 * 2 ** i for i in range(18)]
+
+
+def setup_logging(log_file, level=logging.DEBUG, max_bytes=5 * 1024 * 1024, backup_count=3):
+    """Route logging through a queue to a rotating file written by a background thread.
+
+    Returns the QueueListener; call stop() on it at exit to flush pending records.
+    """
+    log_queue = queue.SimpleQueue()
+    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+    listener.start()
+    return listener
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a sorted list."""
+    return values[min(len(values) - 1, max(0, int(round(q / 100 * len(values))) - 1))]
+
+
+class LatencyHistogram:
+    """Fixed log-scale latency histogram with count, sum, min and max."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+
+    def percentile(self, q):
+        """Estimate the q-th percentile (0-100) as the upper bound of its bucket."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(BUCKET_BOUNDS[i], self.max) if i < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": dict(zip([str(bound) for bound in BUCKET_BOUNDS] + ["+Inf"], self.counts)),
+        }
+
+
+class Telemetry:
+    """Thread-safe latency histograms per operation, exportable as JSON or Prometheus text."""
+
+    def __init__(self, prefix="music_player"):
+        self.prefix = prefix
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+
+    def record(self, name, seconds):
+        """Record one latency sample for an operation."""
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+
+    @contextmanager
+    def timer(self, name):
+        """Time the body of a with block and record it under name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+
+    def snapshot(self):
+        with self.lock:
+            return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+
+    def to_prometheus(self):
+        """Render all histograms in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for name, histogram in sorted(self.histograms.items()):
+                metric = f"{self.prefix}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, count in zip(BUCKET_BOUNDS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{le="{bound:g}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum {histogram.total:.6f}")
+                lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+    def export(self, json_file=None, prometheus_file=None):
+        """Write the current telemetry to the given files."""
+        if json_file:
+            with open(json_file, "w", encoding="utf-8") as f:
+                f.write(self.to_json())
+        if prometheus_file:
+            with open(prometheus_file, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
@@ -0,0 +1,117 @@
+import os
+import base64
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pygame
+from TrackMetadata import FingerprintCache
+
+TARGET_LEVEL_DB = -18.0  # RMS level that normalized tracks are brought to
+MAX_GAIN_DB = 12.0
+BLOCK_SECONDS = 0.05  # ReplayGain analyses loudness in 50ms blocks
+LOUDNESS_PERCENTILE = 95
+WAVEFORM_POINTS = 256
+
+
+def init_worker(frequency, size, channels):
+    """Give each analysis process its own silent mixer for decoding."""
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    pygame.mixer.init(frequency=frequency, size=size, channels=channels)
+
+
+def analyze_samples(samples, frequency, channels):
+    """Compute ReplayGain-style gain, peak and a downsampled peak waveform from int16 PCM."""
+    frames = samples.reshape(-1, channels).astype(np.float32) / 32768.0
+    if not len(frames):
+        return {"gain_db": 0.0, "peak": 0.0, "waveform": ""}
+
+    #Loudness: 95th percentile of the mean square over 50ms blocks
+    block = max(1, int(frequency * BLOCK_SECONDS))
+    blocks = len(frames) // block
+    if blocks:
+        mean_square = np.square(frames[:blocks * block]).reshape(blocks, -1).mean(axis=1)
+        level = np.percentile(mean_square, LOUDNESS_PERCENTILE)
+    else:
+        level = float(np.square(frames).mean())
+    level_db = 10 * np.log10(max(level, 1e-10))
+    gain_db = float(np.clip(TARGET_LEVEL_DB - level_db, -MAX_GAIN_DB * 2, MAX_GAIN_DB))
+
+    #Waveform: peak of the loudest channel per bucket, scaled to one byte
+    magnitude = np.abs(frames).max(axis=1)
+    points = min(WAVEFORM_POINTS, len(magnitude))
+    edges = np.linspace(0, len(magnitude), points + 1).astype(np.int64)
+    peaks = np.maximum.reduceat(magnitude, edges[:-1])
+    waveform = np.clip(peaks * 255, 0, 255).astype(np.uint8)
+
+    return {
+        "gain_db": round(gain_db, 2),
+        "peak": round(float(magnitude.max()), 4),
+        "waveform": base64.b64encode(waveform.tobytes()).decode("ascii"),
+    }
+
+
+def analyze_track(file_path):
+    """Decode a track with the worker's mixer and analyze it."""
+    frequency, size, channels = pygame.mixer.get_init()
+    raw = pygame.mixer.Sound(file_path).get_raw()
+    return analyze_samples(np.frombuffer(raw, dtype=np.int16), frequency, channels)
+
+
+def decode_waveform(result):
+    """Return the waveform of an analysis result as a list of 0-255 peaks."""
+    return list(base64.b64decode(result["waveform"]))
+
+
+class TrackAnalyzer:
+    """Run loudness and waveform analysis on a process pool and cache the results."""
+
+    def __init__(self, cache_file, workers=None):
+        self.cache = FingerprintCache(cache_file)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                            initializer=init_worker, initargs=pygame.mixer.get_init())
+
+
+    def get(self, file_path):
+        """Return the cached analysis for a file, or None if it is missing or stale."""
+        return self.cache.get(file_path)
+
+
+    def analyze(self, file_paths):
+        """Queue analysis for files without a cached result; returns {path: Future}."""
+        futures = {}
+        for file_path in file_paths:
+            with self.lock:
+                if file_path in self.pending:
+                    futures[file_path] = self.pending[file_path]
+                    continue
+            fingerprint = self.cache.fingerprint(file_path)
+            if fingerprint is None or self.cache.get(file_path, fingerprint) is not None:
+                continue
+            future = self.executor.submit(analyze_track, file_path)
+            with self.lock:
+                self.pending[file_path] = future
+            future.add_done_callback(lambda f, path=file_path, fp=fingerprint: self.on_done(path, fp, f))
+            futures[file_path] = future
+        return futures
+
+
+    def on_done(self, file_path, fingerprint, future):
+        """Store a finished analysis and flush the cache once the queue drains."""
+        try:
+            self.cache.put(file_path, fingerprint, future.result())
+        except Exception as e:
+            logging.warning(f"Analysis failed for {file_path}: {e}")
+        with self.lock:
+            self.pending.pop(file_path, None)
+            drained = not self.pending
+        if drained:
+            self.cache.save()
+
+
+    def shutdown(self):
+        """Stop the worker processes and flush the cache."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.cache.save()
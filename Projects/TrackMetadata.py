@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+from mutagen.mp3 import MP3
+from mutagen.wave import WAVE
+
+
+class FingerprintCache:
+    """Persistent JSON cache keyed by file path and validated by size and mtime."""
+
+    VERSION = 1
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self.entries = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # one writer of the temp file at a time
+        self.load()
+
+
+    @staticmethod
+    def fingerprint(file_path):
+        """Return (size, mtime_ns) for a file, or None if it cannot be read."""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+
+    def load(self):
+        """Load cached entries from disk, ignoring missing or broken files."""
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self.entries = data.get("entries", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable cache {self.cache_file}: {e}")
+
+
+    def save(self):
+        """Atomically write the cache to disk if anything changed.
+
+        Saves from different threads are serialized from snapshot to rename,
+        so they never write the same temp file at once and the newest
+        snapshot is the one left on disk.
+        """
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                data = json.dumps({"version": self.VERSION, "entries": self.entries})
+                self.dirty = False
+            tmp_file = f"{self.cache_file}.tmp"
+            try:
+                with open(tmp_file, "w", encoding="utf-8") as f:
+                    f.write(data)
+                os.replace(tmp_file, self.cache_file)
+            except OSError as e:
+                logging.error(f"Failed to save cache {self.cache_file}: {e}")
+
+
+    def get(self, file_path, fingerprint=None):
+        """Return the cached value if the file is unchanged since it was stored."""
+        if fingerprint is None:
+            fingerprint = self.fingerprint(file_path)
+        if fingerprint is None:
+            return None
+        with self.lock:
+            entry = self.entries.get(file_path)
+        if entry and entry["size"] == fingerprint[0] and entry["mtime_ns"] == fingerprint[1]:
+            return entry["value"]
+        return None
+
+
+    def entry(self, file_path):
+        """Return (size, mtime_ns, value) as stored, without touching the file."""
+        with self.lock:
+            entry = self.entries.get(file_path)
+        if entry is None:
+            return None
+        return entry["size"], entry["mtime_ns"], entry["value"]
+
+
+    def put(self, file_path, fingerprint, value):
+        """Store a value for a file at the given fingerprint."""
+        with self.lock:
+            self.entries[file_path] = {"size": fingerprint[0], "mtime_ns": fingerprint[1], "value": value}
+            self.dirty = True
+
+
+    def discard(self, file_path):
+        """Forget a cached file."""
+        with self.lock:
+            if self.entries.pop(file_path, None) is not None:
+                self.dirty = True
+
+
+def probe_audio_file(file_path, size):
+    """Read length and bitrate of an audio file with mutagen."""
+    info = {"size": size, "length": 0.0, "bitrate": 0, "error": None}
+    try:
+        if file_path.lower().endswith('.mp3'):
+            audio = MP3(file_path)
+            info["bitrate"] = audio.info.bitrate // 1000
+        elif file_path.lower().endswith('.wav'):
+            audio = WAVE(file_path)
+        else:
+            info["error"] = "Unsupported file type"
+            return info
+        info["length"] = audio.info.length
+    except Exception as e:
+        info["error"] = str(e)
+    return info
+
+
+class MetadataProber:
+    """Probe audio files on a thread pool, backed by a persistent cache."""
+
+    def __init__(self, cache_file, max_workers=None, telemetry=None):
+        self.cache = FingerprintCache(cache_file)
+        self.telemetry = telemetry
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or min(32, (os.cpu_count() or 1) * 4),
+                                           thread_name_prefix="metadata")
+
+
+    def probe(self, file_path, known=None):
+        """Return metadata for one file, parsing it only on a cache miss.
+
+        known may hold size, mtime_ns, length and bitrate recorded elsewhere (e.g. a
+        saved playlist); if the file still matches it, the result is marked trusted.
+        """
+        fingerprint = self.cache.fingerprint(file_path)
+        if fingerprint is None:
+            return {"size": 0, "length": 0.0, "bitrate": 0, "error": "File not found", "missing": True}
+        if known and (known.get("size"), known.get("mtime_ns")) == fingerprint and "length" in known:
+            info = self.cache.get(file_path, fingerprint)
+            if info is None:
+                info = {"size": fingerprint[0], "length": known["length"], "bitrate": known["bitrate"], "error": None}
+                self.cache.put(file_path, fingerprint, info)
+            return dict(info, trusted=True)
+        info = self.cache.get(file_path, fingerprint)
+        if info is not None:
+            return info
+        start_time = time.perf_counter()
+        info = probe_audio_file(file_path, fingerprint[0])
+        if self.telemetry is not None:
+            self.telemetry.record("metadata_probe", time.perf_counter() - start_time)
+        self.cache.put(file_path, fingerprint, info)
+        return info
+
+
+    def cached(self, file_path):
+        """Return (size, mtime_ns, info) from the cache without touching the file."""
+        return self.cache.entry(file_path)
+
+
+    def probe_many(self, file_paths, known=None):
+        """Probe files in parallel; returns a Future of [(path, info), ...] in input order."""
+        known = known or {}
+        result = Future()
+        file_paths = list(file_paths)
+        infos = [None] * len(file_paths)
+        remaining = [len(file_paths)]
+        lock = threading.Lock()
+
+        if not file_paths:
+            result.set_result([])
+            return result
+
+        def on_done(index, future):
+            try:
+                infos[index] = future.result()
+            except Exception as e:
+                infos[index] = {"size": 0, "length": 0.0, "bitrate": 0, "error": str(e)}
+            with lock:
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+            if finished:
+                self.cache.save()
+                result.set_result(list(zip(file_paths, infos)))
+
+        for index, file_path in enumerate(file_paths):
+            future = self.executor.submit(self.probe, file_path, known.get(file_path))
+            future.add_done_callback(lambda f, i=index: on_done(i, f))
+        return result
+
+
+    def shutdown(self):
+        """Stop the worker threads and flush the cache."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.cache.save()
@@ -0,0 +1,45 @@
+import tkinter as tk
+
+
+class WaveformView:
+    """Canvas that draws a track's peak waveform with a playback cursor."""
+
+    HEIGHT = 32
+    PLAYED_COLOR = "#3498db"
+    WAVE_COLOR = "#b0b0b0"
+
+    def __init__(self, master):
+        self.canvas = tk.Canvas(master, height=self.HEIGHT, highlightthickness=0, bg="#f0f0f0")
+        self.canvas.pack(fill=tk.X)
+        self.canvas.bind('<Configure>', lambda event: self.redraw())
+        self.peaks = []
+        self.fraction = 0.0
+
+
+    def show(self, peaks):
+        """Draw a new waveform (a list of 0-255 peaks), or clear it with an empty list."""
+        self.peaks = peaks
+        self.fraction = 0.0
+        self.redraw()
+
+
+    def redraw(self):
+        self.canvas.delete("all")
+        width = self.canvas.winfo_width()
+        if not self.peaks or width <= 1:
+            return
+        middle = self.HEIGHT / 2
+        step = width / len(self.peaks)
+        for i, peak in enumerate(self.peaks):
+            x = i * step + step / 2
+            half = max(1.0, peak / 255 * middle)
+            self.canvas.create_line(x, middle - half, x, middle + half, fill=self.WAVE_COLOR, tags="wave")
+        self.canvas.create_line(0, 0, 0, self.HEIGHT, fill=self.PLAYED_COLOR, width=2, tags="cursor")
+        self.move_cursor(self.fraction)
+
+
+    def move_cursor(self, fraction):
+        """Move the cursor to a fraction of the track length."""
+        self.fraction = max(0.0, min(1.0, fraction))
+        x = self.fraction * self.canvas.winfo_width()
+        self.canvas.coords("cursor", x, 0, x, self.HEIGHT)